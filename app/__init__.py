@@ -1,59 +1,119 @@
 import os
+import time
+from typing import Optional
 from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError
+from app.blueprints.admin import create_admin_blueprint
 from app.blueprints.auth import create_auth_blueprint
 from app.blueprints.employee import create_employee_blueprint
 from app.blueprints.product import create_product_blueprint
 from app.blueprints.supervisor import create_supervisor_blueprint
 from app.blueprints.user import create_user_blueprint
+from app.bootstrap import BOOTSTRAP_MODES, STARTUP_BOOTSTRAP, bootstrap, bootstrap_with_lock
+from app.cli import register_cli_commands
 from app.custom_flask import CustomFlask
 from app.repositories.admin_repository import AdminRepository
+from app.repositories.caching_unit_repository import CachingUnitRepository
 from app.repositories.employee_repository import EmployeeRepository
 from app.repositories.product_repository import ProductRepository
+from app.repositories.report_repository import ReportRepository
 from app.repositories.supervisor_repository import SupervisorRepository
 from app.repositories.unit_repository import UnitRepository
+from app.repositories.unit_stats_repository import UnitStatsRepository
 from app.repositories.user_repository import UserRepository
 from app.services.admin_service import AdminService
 from app.services.employee_service import EmployeeService
 from app.services.product_service import ProductService
+from app.services.report_service import ReportService
 from app.services.supervisor_service import SupervisorService
 from app.services.user_service import UserService
+from app.storage.memory_backend import MemoryClient
+from app.storage.storage_backend import MONGO_BACKEND, create_clients
+from app.utils.password_utils import PasswordHasher
+from app.utils.ttl_cache import TTLCache
 
 
-def create_server():
-    server = CustomFlask(__name__)
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value else None
+
+
+def create_server(mongo_client: Optional[MongoClient | MemoryClient] = None) -> CustomFlask:
+    """
+    Create and configure the server.
+
+    Args:
+        mongo_client (MongoClient | MemoryClient | None): The client of the database, for the reads and the writes.
+            If None the clients of the STORAGE_BACKEND config are created (see app.storage.storage_backend).
+
+    Returns:
+        CustomFlask: The configured server.
+    """
+    started = time.perf_counter()
+    server  = CustomFlask(__name__)
 
     server.config["SERVER_HOST"]       = os.environ.get("SERVER_HOST", "localhost")
     server.config["SERVER_PORT"]       = int(os.environ.get("SERVER_PORT", 5000))
     server.config["SERVER_SECRET_KEY"] = os.environ.get("SERVER_SECRET_KEY", os.urandom(24).hex())
+    # "mongo" or "memory", see app.storage.storage_backend
+    server.config["STORAGE_BACKEND"]   = os.environ.get("STORAGE_BACKEND", MONGO_BACKEND)
     server.config["MONGO_DATABASE"]    = os.environ.get("MONGO_DATABASE", "LogisticsDB")
     server.config["MONGO_HOST"]        = os.environ.get("MONGO_HOST", "localhost")
     server.config["MONGO_PORT"]        = int(os.environ.get("MONGO_PORT", 27017))
+    # the connection pool and the timeouts of the MongoClients, the unset ones keep the default of pymongo
+    server.config["MONGO_MAX_POOL_SIZE"]               = int(os.environ.get("MONGO_MAX_POOL_SIZE", 100))
+    server.config["MONGO_MIN_POOL_SIZE"]               = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+    server.config["MONGO_MAX_IDLE_TIME_MS"]            = _optional_int(os.environ.get("MONGO_MAX_IDLE_TIME_MS"))
+    server.config["MONGO_WAIT_QUEUE_TIMEOUT_MS"]       = _optional_int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS"))
+    server.config["MONGO_SERVER_SELECTION_TIMEOUT_MS"] = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000))
+    server.config["MONGO_CONNECT_TIMEOUT_MS"]          = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 20000))
+    server.config["MONGO_SOCKET_TIMEOUT_MS"]           = _optional_int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS"))
+    # e.g. "zstd,snappy,zlib", zstd and snappy need the zstandard and python-snappy packages
+    server.config["MONGO_COMPRESSORS"]                 = os.environ.get("MONGO_COMPRESSORS", "")
+    # the read preference of the product listings, e.g. "secondaryPreferred" to read them from the secondaries
+    server.config["MONGO_READ_PREFERENCE"]             = os.environ.get("MONGO_READ_PREFERENCE", "primary")
+    server.config["MONGO_MAX_STALENESS_SECONDS"]       = _optional_int(os.environ.get("MONGO_MAX_STALENESS_SECONDS"))
+    # "1" to read the product listings as raw BSON, decoded when a view reads them, see ProductRepository
+    server.config["PRODUCT_RAW_LISTINGS"] = os.environ.get("PRODUCT_RAW_LISTINGS", "0") == "1"
+    # "1" to write the products and the counters of their units in one transaction (needs a replica set),
+    # otherwise the counters can drift until `flask rebuild-unit-stats`, see ProductRepository
+    server.config["UNIT_STATS_TRANSACTIONS"] = os.environ.get("UNIT_STATS_TRANSACTIONS", "0") == "1"
+    # the units read by id are cached in each process, see CachingUnitRepository
+    server.config["UNIT_CACHE_SIZE"]   = int(os.environ.get("UNIT_CACHE_SIZE", 1024))
+    server.config["UNIT_CACHE_TTL"]    = float(os.environ.get("UNIT_CACHE_TTL", 60))
+    # the admin reports are cached for a few seconds in each process, 0 to run every report, see ReportService
+    server.config["REPORT_CACHE_SIZE"] = int(os.environ.get("REPORT_CACHE_SIZE", 256))
+    server.config["REPORT_CACHE_TTL"]  = float(os.environ.get("REPORT_CACHE_TTL", 10))
+    # the cost of the password hashes (see PasswordHasher), tune with benchmarks/login_latency.py
+    server.config["PASSWORD_SCRYPT_N"] = int(os.environ.get("PASSWORD_SCRYPT_N", 2 ** 15))
+    server.config["PASSWORD_SCRYPT_R"] = int(os.environ.get("PASSWORD_SCRYPT_R", 8))
+    server.config["PASSWORD_SCRYPT_P"] = int(os.environ.get("PASSWORD_SCRYPT_P", 1))
     # these normally should not be hard coded here,
     # but it is okay for the sake of the exercise
     server.config["ADMIN_USERNAME"]    = os.environ.get("ADMIN_USERNAME", "admin")
     server.config["ADMIN_PASSWORD"]    = os.environ.get("ADMIN_PASSWORD", "admin123")
+    # who creates the indexes and the admin and runs the migrations: "startup", "lock" or "none", see app.bootstrap
+    server.config["SERVER_BOOTSTRAP"]              = os.environ.get("SERVER_BOOTSTRAP", STARTUP_BOOTSTRAP)
+    server.config["SERVER_BOOTSTRAP_LOCK_TIMEOUT"] = float(os.environ.get("SERVER_BOOTSTRAP_LOCK_TIMEOUT", 300))
 
     # to allow sessions
     server.secret_key = server.config["SERVER_SECRET_KEY"]
 
-    # Initialize Mongodb clients
-    client             = MongoClient(server.config["MONGO_HOST"], server.config["MONGO_PORT"])
-    db                 = client[server.config["MONGO_DATABASE"]]
+    # Initialize the clients of the storage backend
+    if mongo_client is None:
+        mongo_client, read_client, pool_stats = create_clients(server.config)
+    else:
+        read_client, pool_stats = mongo_client, {}
+
+    db                 = mongo_client[server.config["MONGO_DATABASE"]]
+    read_db            = read_client[server.config["MONGO_DATABASE"]]
     admin_collection   = db["admin"]
     unit_collection    = db["units"]
     product_collection = db["products"]
     user_collection    = db["users"]
 
-    # Create indexes to avoid duplicates
-    unit_collection.create_index("id", unique=True)
-    product_collection.create_index("id", unique=True)
-    user_collection.create_index("id", unique=True)
-    user_collection.create_index({"username": 1, "unit_id": 1}, unique=True)
-    """ TODO add indexes for product collection """
-
     # Attach to server
     server.db                 = db
+    server.read_db            = read_db
+    server.pool_stats         = pool_stats
     server.admin_collection   = admin_collection
     server.unit_collection    = unit_collection
     server.product_collection = product_collection
@@ -63,31 +123,87 @@ def create_server():
     emp_repo = EmployeeRepository(server.user_collection)
     sup_repo = SupervisorRepository(server.user_collection)
     adm_repo = AdminRepository(server.user_collection)
-    unt_repo = UnitRepository(unit_collection)
-    prd_repo = ProductRepository(server.product_collection)
+    unt_repo = CachingUnitRepository(
+        UnitRepository(unit_collection),
+        server.config["UNIT_CACHE_SIZE"],
+        server.config["UNIT_CACHE_TTL"],
+    )
+    ust_repo = UnitStatsRepository(db["unit_stats"])
+    prd_repo = ProductRepository(
+        server.product_collection,
+        read_db["products"],
+        server.config["PRODUCT_RAW_LISTINGS"],
+        ust_repo,
+        server.config["UNIT_STATS_TRANSACTIONS"],
+    )
     usr_repo = UserRepository(server.user_collection)
+    rpt_repo = ReportRepository(read_db["products"])
+
+    # One hasher per process, it caches the recently verified passwords
+    password_hasher = PasswordHasher(
+        server.config["PASSWORD_SCRYPT_N"],
+        server.config["PASSWORD_SCRYPT_R"],
+        server.config["PASSWORD_SCRYPT_P"],
+    )
 
     # Initialize services
-    employee_service   = EmployeeService(usr_repo, emp_repo, unt_repo)
-    supervisor_service = SupervisorService(usr_repo, emp_repo, sup_repo, unt_repo)
-    admin_service      = AdminService(adm_repo)
-    user_service       = UserService(usr_repo, unt_repo)
-    product_service    = ProductService(prd_repo, unt_repo)
+    employee_service   = EmployeeService(usr_repo, emp_repo, unt_repo, password_hasher)
+    supervisor_service = SupervisorService(usr_repo, emp_repo, sup_repo, unt_repo, password_hasher)
+    admin_service      = AdminService(adm_repo, password_hasher)
+    user_service       = UserService(usr_repo, unt_repo, password_hasher)
+    product_service    = ProductService(prd_repo, unt_repo, ust_repo)
+    report_service     = ReportService(
+        rpt_repo,
+        unt_repo,
+        TTLCache(server.config["REPORT_CACHE_SIZE"], server.config["REPORT_CACHE_TTL"])
+        if server.config["REPORT_CACHE_TTL"] > 0 else None,
+    )
 
+    # the user of each request is loaded once, see app.utils.auth_utils.current_user()
+    server.identity_loader = user_service.get_user_with_unit_name
 
-    # insert one admin into the database
-    try:
-        admin_service.insert_admin(
-            server.config["ADMIN_USERNAME"], server.config["ADMIN_PASSWORD"]
-        )
-    except DuplicateKeyError: # if admin account is already inserted.
-        pass
 
     # Add blueprints for routes
+    server.register_blueprint(create_admin_blueprint(server.pool_stats, server.boot_stats, report_service))
     server.register_blueprint(create_auth_blueprint(user_service))
     server.register_blueprint(create_employee_blueprint(employee_service, user_service))
-    server.register_blueprint(create_user_blueprint(user_service))
+    server.register_blueprint(create_user_blueprint(user_service, product_service))
     server.register_blueprint(create_product_blueprint(product_service))
     server.register_blueprint(create_supervisor_blueprint(supervisor_service, employee_service, user_service))
 
+    # Add maintenance commands to the flask cli
+    register_cli_commands(server, product_service, admin_service)
+
+    # Create the indexes (to avoid duplicates and to serve the queries of the repositories),
+    # insert one admin into the database and migrate the data of older versions
+    bootstrap_started = time.perf_counter()
+    bootstrap_args    = (
+        db, admin_service, product_service, server.config["ADMIN_USERNAME"], server.config["ADMIN_PASSWORD"]
+    )
+    match server.config["SERVER_BOOTSTRAP"]:
+        case "startup":
+            bootstrap(*bootstrap_args)
+            bootstrap_outcome = "ran"
+        case "lock":
+            leader            = bootstrap_with_lock(*bootstrap_args, server.config["SERVER_BOOTSTRAP_LOCK_TIMEOUT"])
+            bootstrap_outcome = "ran" if leader else "skipped"
+        case "none":
+            bootstrap_outcome = "skipped"
+        case mode:
+            raise ValueError(f"Unknown bootstrap mode {mode}, expected one of {', '.join(BOOTSTRAP_MODES)}.")
+
+    finished = time.perf_counter()
+    server.boot_stats.update({
+        "pid":            os.getpid(),
+        "bootstrap_mode": server.config["SERVER_BOOTSTRAP"],
+        "bootstrap":      bootstrap_outcome,
+        "bootstrap_ms":   (finished - bootstrap_started) * 1000,
+        "boot_ms":        (finished - started) * 1000,
+    })
+    server.logger.info(
+        "Worker %d booted in %.1f ms (bootstrap %s: %s in %.1f ms)",
+        os.getpid(), server.boot_stats["boot_ms"], server.config["SERVER_BOOTSTRAP"],
+        bootstrap_outcome, server.boot_stats["bootstrap_ms"],
+    )
+
     return server
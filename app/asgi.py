@@ -0,0 +1,152 @@
+from typing import Optional
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from hypercorn.typing import ASGIReceiveCallable, ASGISendCallable, Scope
+from werkzeug.exceptions import HTTPException
+from app import create_server
+from app.blueprints.auth.async_blueprint import create_async_auth_blueprint
+from app.blueprints.product.async_blueprint import create_async_product_blueprint
+from app.custom_flask import CustomFlask
+from app.custom_quart import CustomQuart
+from app.repositories.async_caching_unit_repository import AsyncCachingUnitRepository
+from app.repositories.async_product_repository import AsyncProductRepository
+from app.repositories.async_unit_repository import AsyncUnitRepository
+from app.repositories.async_unit_stats_repository import AsyncUnitStatsRepository
+from app.repositories.async_user_repository import AsyncUserRepository
+from app.services.async_product_service import AsyncProductService
+from app.services.async_user_service import AsyncUserService
+from app.storage.storage_backend import MEMORY_BACKEND, create_async_clients
+from app.utils.password_utils import PasswordHasher
+from app.utils.ttl_cache import TTLCache
+
+
+"""
+The ASGI server: the product and the auth views run as async views on the event loop
+of the ASGI server, with the async repositories and services over an AsyncMongoClient,
+the other views are served by the Flask server in the threads of the event loop.
+
+Flask runs its async views in a new event loop for every request, and an AsyncMongoClient
+can only be used from one event loop, so the async views are Quart views
+(see app.custom_quart). Both apps share the secret key, so the session cookie set by one
+is read by the other, and the Quart app knows the url rules of every Flask view,
+so url_for() builds the links to them.
+
+Run it with an ASGI server, e.g. `hypercorn asgi:server --workers 4`.
+"""
+
+
+class AsgiDispatcher:
+    """
+    The ASGI app that sends each request to the Quart app if it has a view for it,
+    and otherwise to the Flask app. The lifespan events go to the Quart app.
+    """
+    asgi_app: CustomQuart
+    wsgi_app: CustomFlask
+
+    def __init__(self, asgi_app: CustomQuart, wsgi_app: CustomFlask):
+        self.asgi_app = asgi_app
+        self.wsgi_app = wsgi_app
+        self._wsgi    = AsyncioWSGIMiddleware(wsgi_app)
+        self._adapter = asgi_app.url_map.bind("")
+
+
+    def is_async_view(self, path: str, method: str) -> bool:
+        """
+        Returns:
+            bool: True if the Quart app has a view for `method` and `path`.
+        """
+        try:
+            endpoint, _ = self._adapter.match(path, method)
+        except HTTPException:
+            # not found, method not allowed or redirect to the canonical url
+            return False
+
+        return endpoint in self.asgi_app.view_functions
+
+
+    async def __call__(self, scope: Scope, receive: ASGIReceiveCallable, send: ASGISendCallable) -> None:
+        if scope["type"] == "http" and not self.is_async_view(scope["path"], scope["method"]):
+            await self._wsgi(scope, receive, send)
+            return
+
+        await self.asgi_app(scope, receive, send)
+
+
+def create_asgi_server(wsgi_server: Optional[CustomFlask] = None) -> AsgiDispatcher:
+    """
+    Create and configure the ASGI server.
+
+    Args:
+        wsgi_server (CustomFlask | None): The server of the views that stay synchronous.
+            If None it is created with create_server(). With the "memory" storage backend
+            the async views use its data.
+
+    Returns:
+        AsgiDispatcher: The ASGI app of the server.
+    """
+    if wsgi_server is None:
+        wsgi_server = create_server()
+
+    server = CustomQuart(__name__)
+    for key, value in wsgi_server.config.items():
+        server.config.setdefault(key, value)
+
+    # to read the sessions of the Flask server
+    server.secret_key = wsgi_server.secret_key
+
+    # Initialize the asyncio clients of the storage backend, they connect from the event loop of the first request
+    memory_client = wsgi_server.db.client if server.config["STORAGE_BACKEND"] == MEMORY_BACKEND else None
+    mongo_client, read_client, pool_stats = create_async_clients(server.config, memory_client)
+
+    db      = mongo_client[server.config["MONGO_DATABASE"]]
+    read_db = read_client[server.config["MONGO_DATABASE"]]
+
+    # Initialize repositories
+    unt_repo = AsyncCachingUnitRepository(
+        AsyncUnitRepository(db["units"]),
+        TTLCache(server.config["UNIT_CACHE_SIZE"], server.config["UNIT_CACHE_TTL"]),
+    )
+    prd_repo = AsyncProductRepository(
+        db["products"],
+        read_db["products"],
+        server.config["PRODUCT_RAW_LISTINGS"],
+        AsyncUnitStatsRepository(db["unit_stats"]),
+        server.config["UNIT_STATS_TRANSACTIONS"],
+    )
+    usr_repo = AsyncUserRepository(db["users"])
+
+    password_hasher = PasswordHasher(
+        server.config["PASSWORD_SCRYPT_N"],
+        server.config["PASSWORD_SCRYPT_R"],
+        server.config["PASSWORD_SCRYPT_P"],
+    )
+
+    # Initialize services
+    user_service    = AsyncUserService(usr_repo, password_hasher)
+    product_service = AsyncProductService(prd_repo, unt_repo)
+
+    # the user of each request is loaded once, see app.utils.async_auth_utils.current_user()
+    server.identity_loader = user_service.get_user_with_unit_name
+
+    # the pool statistics of the async clients are shown next to the ones of the Flask server
+    for name, stats in pool_stats.items():
+        wsgi_server.pool_stats[f"async_{name}"] = stats
+
+
+    # Add blueprints for routes
+    server.register_blueprint(create_async_auth_blueprint(user_service))
+    server.register_blueprint(create_async_product_blueprint(product_service))
+
+    # the rules of the Flask views, without a view, so that url_for() can build them
+    async_endpoints = {rule.endpoint for rule in server.url_map.iter_rules()}
+    for rule in wsgi_server.url_map.iter_rules():
+        if rule.endpoint not in async_endpoints:
+            server.add_url_rule(rule.rule, rule.endpoint, methods=rule.methods)
+
+
+    @server.after_serving
+    async def close_clients():
+        await mongo_client.close()
+        if read_client is not mongo_client:
+            await read_client.close()
+
+    return AsgiDispatcher(server, wsgi_server)
@@ -0,0 +1,86 @@
+from typing import Any, Callable, Dict, List, Optional
+from flask import Blueprint, Response, jsonify, request
+from app.blueprints.names import ADMIN_BP
+from app.exceptions.exceptions import UnitNotFoundByIdError
+from app.services.report_service import TOP_SELLERS_LIMIT_ERROR, ReportService
+from app.storage.pool_stats import PoolStatsListener
+from app.utils.auth_utils import login_required, required_role
+
+
+def _report_response(run: Callable[[Optional[str]], List[dict]]) -> Response | tuple:
+    # the reports of one unit take its id as the `unit_id` query parameter
+    unit_id: Optional[str] = request.args.get("unit_id") or None
+
+    try:
+        return jsonify(run(unit_id))
+    except UnitNotFoundByIdError as error:
+        return jsonify(error=str(error)), 404
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+
+
+def create_admin_blueprint(
+    pool_stats: Dict[str, PoolStatsListener], boot_stats: Dict[str, Any], report_service: ReportService
+):
+    admin_bp = Blueprint(ADMIN_BP, __name__, url_prefix="/admin")
+
+
+    @admin_bp.route("/pool-stats", methods=["GET"])
+    @login_required
+    @required_role("admin")
+    def pool_stats_view():
+        # the connection pools of this process only, by client ("write", "read") and server
+        return jsonify({client: listener.stats() for client, listener in pool_stats.items()})
+
+
+
+    @admin_bp.route("/boot-stats", methods=["GET"])
+    @login_required
+    @required_role("admin")
+    def boot_stats_view():
+        # the startup of the worker process that serves the request
+        return jsonify(boot_stats)
+
+
+    @admin_bp.route("/reports/unit-gain", methods=["GET"])
+    @login_required
+    @required_role("admin")
+    def unit_gain_report():
+        return _report_response(report_service.get_gain_by_unit)
+
+
+    @admin_bp.route("/reports/category-margin", methods=["GET"])
+    @login_required
+    @required_role("admin")
+    def category_margin_report():
+        return _report_response(report_service.get_margin_by_category)
+
+
+    @admin_bp.route("/reports/top-sellers", methods=["GET"])
+    @login_required
+    @required_role("admin")
+    def top_sellers_report():
+        # a limit that is not an integer gets the error of a limit out of range
+        try:
+            limit = int(request.args.get("limit", 10))
+        except ValueError:
+            return jsonify(error=TOP_SELLERS_LIMIT_ERROR), 400
+
+        return _report_response(lambda unit_id: report_service.get_top_sellers(limit, unit_id))
+
+
+    @admin_bp.route("/reports/stock-value", methods=["GET"])
+    @login_required
+    @required_role("admin")
+    def stock_value_report():
+        return _report_response(report_service.get_stock_value_by_unit)
+
+
+    @admin_bp.route("/reports/cache-stats", methods=["GET"])
+    @login_required
+    @required_role("admin")
+    def report_cache_stats():
+        # null when the reports are not cached (REPORT_CACHE_TTL=0)
+        return jsonify(report_service.cache_stats())
+
+    return admin_bp
@@ -0,0 +1,52 @@
+from quart import Blueprint, url_for, session, redirect, render_template
+from app.blueprints.names import AUTH_BP, USER_BP
+from app.exceptions.exceptions import UnitNotFoundByIdError, UserNotFoundByCredentialsError
+from app.model.user import User
+from app.services.async_user_service import AsyncUserService
+
+
+def create_async_auth_blueprint(user_service: AsyncUserService) -> Blueprint:
+    """
+    The views of create_auth_blueprint() as async views of the ASGI server (see app.asgi),
+    the password is checked without blocking the event loop.
+    """
+    auth_bp = Blueprint(AUTH_BP, __name__, template_folder="templates")
+
+
+    @auth_bp.route("/login", methods=["GET", "POST"])
+    async def login():
+        # the credentials are hard coded like in the login view of create_auth_blueprint()
+        username = "bw"
+        password = "12"
+        unit_id = "u1"
+
+        user: User
+
+        try:
+            user = await user_service.get_user(username, password, unit_id)
+        except (UserNotFoundByCredentialsError, UnitNotFoundByIdError):
+            return await render_template(f"{AUTH_BP}/login.html", error="Invalid credentials")
+        except ValueError:
+            return await render_template(
+                f"{AUTH_BP}/login.html",
+                error="The user's record in the database is missing required attributes.",
+            )
+
+        session["user_id"] = user.id
+        session["unit_id"] = user.unit_id
+        session["role"]    = user.role
+
+        return redirect(url_for(f"{USER_BP}.dashboard"))
+
+
+    @auth_bp.route("/logout", methods=["GET"])
+    async def logout():
+        session.clear()
+        return redirect(url_for(f"{AUTH_BP}.login"))
+
+
+    @auth_bp.route("/permissions", methods=["GET"])
+    async def missing_permissions():
+        return await render_template(f"{AUTH_BP}/missing_permissions.html")
+
+    return auth_bp
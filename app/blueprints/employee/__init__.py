@@ -2,12 +2,13 @@ from typing import Optional
 from flask import Blueprint, redirect, request, session, render_template, flash
 from app.blueprints.names import EMPLOYEE_BP
 from app.exceptions.exceptions import UnitNotFoundByIdError, UserNotFoundByIdError
+from app.model.user import User
 from app.repositories.employee_repository import EmployeeRepository
 from app.repositories.product_repository import ProductRepository
 from app.repositories.user_repository import UserRepository
 from app.services.employee_service import EmployeeService
 from app.services.user_service import UserService
-from app.utils.auth_utils import login_required, required_role
+from app.utils.auth_utils import current_user, login_required, required_role
 
 
 def create_employee_blueprint(
@@ -20,16 +21,11 @@ def create_employee_blueprint(
     @login_required
     @required_role("employee")
     def show_profile():
-        employee_id: str = session["user_id"]
-        try:
-            employee = emp_service.get_employee_by_id(employee_id)
-        except (UserNotFoundByIdError, UnitNotFoundByIdError):
+        # loaded by login_required, with the name of the unit
+        employee: Optional[User] = current_user()
+
+        if employee is None:
             return render_template("employee/profile.html", error="Could not find employee")
-        except ValueError:
-            return render_template(
-                "employee/profile.html",
-                error="The user's record in the database is missing required attributes.",
-            )
 
         return render_template(
             "employee/profile.html",
@@ -45,7 +41,7 @@ def create_employee_blueprint(
     @login_required
     @required_role("employee")
     def change_password():
-        employee_id = session["user_id"]
+        employee_id: str = session["user_id"]
 
         if request.method != "POST":
             return render_template("employee/change-password.html")
@@ -65,19 +61,14 @@ def create_employee_blueprint(
                 error="Previous password cannot be the same as new password.",
             )
 
-        try:
-            employee = emp_service.get_employee_by_id(employee_id)
-        except (UserNotFoundByIdError, UnitNotFoundByIdError):
+        employee: Optional[User] = current_user()
+
+        if employee is None:
             return render_template(
                 "employee/change-password.html", error="Could not find employee."
             )
-        except ValueError:
-            return render_template(
-                "employee/change-password.html",
-                error="The user's record in the database is missing required attributes.",
-            )
 
-        if employee.password != password_old:
+        if not user_service.verify_password(employee, password_old):
             return render_template(
                 "employee/change-password.html", error="Previous password is incorrect."
             )
@@ -1,26 +1,73 @@
 import re
-from typing import List, Optional, Tuple
-from flask import Blueprint, redirect, request, render_template, session, url_for
+from typing import Any, Dict, List, Optional, Tuple
+from flask import Blueprint, jsonify, redirect, request, render_template, session, url_for
+from pymongo.errors import PyMongoError
 from app.blueprints.names import PRODUCT_BP
 from app.exceptions.exceptions import InsufficientProductQuantity, ProductNotFoundByIdError, UnitNotFoundByIdError
+from app.model.page import Page
 from app.model.product import Product
 from app.repositories.product_repository import ProductRepository
 from app.services.product_service import ProductService
 from app.utils.auth_utils import is_admin_logged_in, login_required, required_role
+from app.utils.pagination_utils import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_page_token, validate_page_size
+
+
+# the fields of the search form of search_products.html
+SEARCH_FIELDS = ("order_field", "order_type", "product_name", "product_id", "start_index", "end_index")
+
+
+def parse_basket(payload: Any) -> Tuple[List[Tuple[str, int]], bool]:
+    """
+    Read the JSON body of the sell_basket views.
+
+    Args:
+        payload (Any): The decoded JSON body, e.g.
+            {"lines": [{"product_id": "p1", "quantity": 2}, ...], "all_or_nothing": false}
+
+    Returns:
+        Tuple[List[Tuple[str, int]], bool]: The (product id, quantity) of every line and `all_or_nothing`.
+
+    Raises:
+        ValueError: If the body is not a JSON object, the lines are not a non empty list,
+            a line has no product_id or no integer quantity, or `all_or_nothing` is not a boolean.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("The basket must be a JSON object.")
+
+    if not isinstance(payload.get("lines"), list) or not payload["lines"]:
+        raise ValueError("The basket must contain a non empty list of lines.")
+
+    lines: List[Tuple[str, int]] = []
+    for line in payload["lines"]:
+        if not isinstance(line, dict) or "product_id" not in line:
+            raise ValueError("Every line needs a product_id and an integer quantity.")
+        # bool is a subclass of int, and a float quantity is not truncated
+        quantity = line.get("quantity")
+        if not isinstance(quantity, int) or isinstance(quantity, bool):
+            raise ValueError("Every line needs a product_id and an integer quantity.")
+        lines.append((str(line["product_id"]), quantity))
+
+    all_or_nothing = payload.get("all_or_nothing", False)
+    if not isinstance(all_or_nothing, bool):
+        raise ValueError("all_or_nothing must be true or false.")
+
+    return lines, all_or_nothing
 
 
 def create_product_blueprint(product_service: ProductService):
     product_bp = Blueprint(PRODUCT_BP, __name__, template_folder="templates")
 
 
-    def _view_products() -> Tuple[Optional[List[Product]], Optional[str]]:
-        products: Optional[List[Product]]
-        error: Optional[str] = None
+    def _view_products(page_size: int, page_token: Optional[str]) -> Tuple[Optional[Page], Optional[str]]:
+        products: Optional[Page] = None
+        error: Optional[str]     = None
         try:
             if is_admin_logged_in():
-                products = product_service.get_products()
+                products = product_service.get_products(page_size, page_token, summary=True)
             else:
-                products = product_service.get_products_from_unit(session["unit_id"])
+                products = product_service.get_products_from_unit(
+                    session["unit_id"], page_size, page_token, summary=True
+                )
         except UnitNotFoundByIdError:
             error = "Could not find your unit."
         except ValueError:
@@ -29,6 +76,35 @@ def create_product_blueprint(product_service: ProductService):
         return products, error
 
 
+    def _page_args_or_error() -> Tuple[int, Optional[str], Optional[str]]:
+        # the page arguments come from the query string of the "Next page" link
+        # or from the search form
+        page_size: int            = DEFAULT_PAGE_SIZE
+        page_token: Optional[str] = request.values.get("page_token") or None
+        error: Optional[str]      = None
+        try:
+            page_size = validate_page_size(int(request.values.get("page_size") or DEFAULT_PAGE_SIZE))
+            if page_token is not None:
+                decode_page_token(page_token)
+        except ValueError:
+            error = f"Invalid page, the page size must be a number between 1 and {MAX_PAGE_SIZE}."
+            page_token = None
+
+        return page_size, page_token, error
+
+
+    def _next_page_url(products: Optional[Page], page_size: int, search_args: Dict[str, str]) -> Optional[str]:
+        if products is None or products.next_page_token is None:
+            return None
+
+        return url_for(
+            "product.search_products",
+            page_token=products.next_page_token,
+            page_size=page_size,
+            **search_args,
+        )
+
+
     def _get_product_or_error(product_id: str, unit_id: Optional[str] = None) -> Tuple[Optional[Product], Optional[str]]:
         product: Optional[Product] = None
         error: Optional[str]       = None
@@ -42,11 +118,13 @@ def create_product_blueprint(product_service: ProductService):
         return product, error
 
 
-    def _sell_product_or_error(product_id:str, quantity_to_sell: float) -> Tuple[Optional[Product], Optional[str]]:
+    def _sell_product_or_error(
+        product_id:str, quantity_to_sell: float, unit_id: Optional[str] = None
+    ) -> Tuple[Optional[Product], Optional[str]]:
         product: Optional[Product] = None
         error: Optional[str]       = None
         try:
-            product = product_service.sell_product(product_id, int(quantity_to_sell))
+            product = product_service.sell_product(product_id, int(quantity_to_sell), unit_id)
         except ProductNotFoundByIdError:
             error="Could not find product."
         except InsufficientProductQuantity:
@@ -60,32 +138,55 @@ def create_product_blueprint(product_service: ProductService):
         return product, error
 
 
+    def _product_before_sale(product: Product, quantity_sold: int) -> Product:
+        # rebuild the product as it was before the sale from the updated document,
+        # instead of reading it from the database before selling
+        product_before = Product.from_dict(product.to_dict())
+        product_before.quantity      = product.quantity + quantity_sold
+        product_before.sold_quantity = product.sold_quantity - quantity_sold
+        product_before.unit_gain     = product.unit_gain - product.calculate_profit(quantity_sold)
+        return product_before
+
+
     @product_bp.route("/search-products", methods=["GET", "POST"])
     @login_required
     @required_role("employee")
     def search_products():
         error: Optional[str]           = ""
-        products: List[Product]        = []
+        products: Optional[Page]       = None
         start_index_int: Optional[int] = None
         end_index_int: Optional[int]   = None
         search_products_page: str      = "product/search_products.html"
 
-        if request.method != "POST":
-            products_list, error = _view_products()
+        page_size, page_token, error = _page_args_or_error()
+        if error:
+            return render_template(search_products_page, error=error)
+
+        # the search fields that were filled, kept to build the link to the next page
+        search_args: Dict[str, str] = {
+            field: request.values[field] for field in SEARCH_FIELDS if request.values.get(field)
+        }
+
+        if not search_args:
+            products, error = _view_products(page_size, page_token)
             if error:
                 return render_template(search_products_page, error=error)
 
-            return render_template(search_products_page, products=products_list)
+            return render_template(
+                search_products_page,
+                products=products,
+                next_page_url=_next_page_url(products, page_size, search_args),
+            )
 
         # if the field is falsy (here it can be empty string "") assign None
         # 0 can be falsy, but this is not a problem because if 0 is entered in form
         # min_quantity will be "0" which is not falsy
-        order_field: Optional[str]  = request.form.get("order_field") or None
-        order_type: Optional[str]   = request.form.get("order_type") or None
-        product_name: Optional[str] = request.form.get("product_name") or None
-        product_id: Optional[str]   = request.form.get("product_id") or None
-        min_quantity: Optional[str] = request.form.get("start_index") or None
-        max_quantity: Optional[str] = request.form.get("end_index") or None
+        order_field: Optional[str]  = search_args.get("order_field")
+        order_type: Optional[str]   = search_args.get("order_type")
+        product_name: Optional[str] = search_args.get("product_name")
+        product_id: Optional[str]   = search_args.get("product_id")
+        min_quantity: Optional[str] = search_args.get("start_index")
+        max_quantity: Optional[str] = search_args.get("end_index")
         unit_id: Optional[str]      = session.get("unit_id")
 
         # are both present?
@@ -95,10 +196,13 @@ def create_product_blueprint(product_service: ProductService):
                 end_index_int   = int(max_quantity)
             except ValueError:
                 error = "From and To fields must be numbers"
-                return render_template(search_products_page, error=error, products=products)
+                return render_template(search_products_page, error=error)
 
         try:
-            products = product_service.search_products(order_field, order_type, product_name, product_id, start_index_int, end_index_int, unit_id)
+            products = product_service.search_products(
+                order_field, order_type, product_name, product_id, start_index_int, end_index_int, unit_id,
+                page_size, page_token, summary=True
+            )
         except ValueError:
             error = "Invalid prices for range fields."
             return render_template(search_products_page, error=error)
@@ -107,7 +211,12 @@ def create_product_blueprint(product_service: ProductService):
             error = "No products found"
             return render_template(search_products_page, error=error)
 
-        return render_template(search_products_page, error=error, products=products)
+        return render_template(
+            search_products_page,
+            error=error,
+            products=products,
+            next_page_url=_next_page_url(products, page_size, search_args),
+        )
 
 
     @product_bp.route("/products", methods=["GET", "POST"])
@@ -178,26 +287,30 @@ def create_product_blueprint(product_service: ProductService):
         if not product_id:
             return render_template(sell_product_page)
 
-        # retrieve product from db
-        product_to_sell, error = _get_product_or_error(product_id, unit_id)
-        if error:
-            return render_template(
-                sell_product_page, product_id=product_id, error=error
-            )
-        products.append(product_to_sell)
-
         # show product and its id
         if not quantity_to_sell:
+            product_to_sell, error = _get_product_or_error(product_id, unit_id)
+            if error:
+                return render_template(
+                    sell_product_page, product_id=product_id, error=error
+                )
             return render_template(
-                sell_product_page, product_id=product_id, products=products
+                sell_product_page, product_id=product_id, products=[product_to_sell]
             )
 
-        # sell product
-        product_after_sell, error = _sell_product_or_error(product_id, int(quantity_to_sell))
+        # sell product, without reading it first
+        product_after_sell, error = _sell_product_or_error(
+            product_id, int(quantity_to_sell), unit_id or None
+        )
         if error:
+            # show the product so that the available quantity is visible
+            product_to_sell, _ = _get_product_or_error(product_id, unit_id)
+            if product_to_sell is not None:
+                products.append(product_to_sell)
             return render_template(
                 sell_product_page, product_id=product_id, products=products, error=error
             )
+        products.append(_product_before_sale(product_after_sell, int(quantity_to_sell)))
         products.append(product_after_sell)
 
         # show product before and after selling
@@ -206,4 +319,30 @@ def create_product_blueprint(product_service: ProductService):
         )
 
 
+    @product_bp.route("/products/sell-basket", methods=["POST"])
+    @login_required
+    @required_role("employee")
+    def sell_basket():
+        # Sell a whole basket with one request. Expects a JSON body read by parse_basket()
+        # and responds with the result of every line (see LineResult.to_dict()).
+        unit_id: Optional[str] = session.get("unit_id") or None
+
+        try:
+            lines, all_or_nothing = parse_basket(request.get_json(silent=True))
+        except ValueError as error:
+            return jsonify(error=str(error)), 400
+
+        try:
+            results = product_service.sell_products(lines, unit_id, all_or_nothing)
+        except PyMongoError:
+            # e.g. a ClientBulkWriteException, some lines may have been sold,
+            # the occupied volume of their units is fixed by reconcile-occupied-volume
+            return jsonify(error="The basket could not be sold, check the products before retrying."), 503
+
+        return jsonify(
+            applied=all(r.applied for r in results),
+            results=[r.to_dict() for r in results],
+        )
+
+
     return product_bp
@@ -0,0 +1,305 @@
+from typing import Dict, List, Optional, Tuple
+from pymongo.errors import PyMongoError
+from quart import Blueprint, jsonify, redirect, request, render_template, session, url_for
+from werkzeug.datastructures import MultiDict
+from app.blueprints.names import PRODUCT_BP
+from app.blueprints.product import SEARCH_FIELDS, parse_basket
+from app.exceptions.exceptions import InsufficientProductQuantity, ProductNotFoundByIdError, UnitNotFoundByIdError
+from app.model.page import Page
+from app.model.product import Product
+from app.services.async_product_service import AsyncProductService
+from app.utils.async_auth_utils import is_admin_logged_in, login_required, required_role
+from app.utils.pagination_utils import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_page_token, validate_page_size
+
+
+def create_async_product_blueprint(product_service: AsyncProductService):
+    """
+    The product views of create_product_blueprint() as async views of the ASGI server (see app.asgi),
+    with the same endpoints, templates and behavior.
+    """
+    product_bp = Blueprint(PRODUCT_BP, __name__, template_folder="templates")
+
+
+    async def _view_products(page_size: int, page_token: Optional[str]) -> Tuple[Optional[Page], Optional[str]]:
+        products: Optional[Page] = None
+        error: Optional[str]     = None
+        try:
+            if await is_admin_logged_in():
+                products = await product_service.get_products(page_size, page_token, summary=True)
+            else:
+                products = await product_service.get_products_from_unit(
+                    session["unit_id"], page_size, page_token, summary=True
+                )
+        except UnitNotFoundByIdError:
+            error = "Could not find your unit."
+        except ValueError:
+            error = "The product's record in the database is missing required attributes."
+
+        return products, error
+
+
+    def _page_args_or_error(values: MultiDict) -> Tuple[int, Optional[str], Optional[str]]:
+        # the page arguments come from the query string of the "Next page" link
+        # or from the search form
+        page_size: int            = DEFAULT_PAGE_SIZE
+        page_token: Optional[str] = values.get("page_token") or None
+        error: Optional[str]      = None
+        try:
+            page_size = validate_page_size(int(values.get("page_size") or DEFAULT_PAGE_SIZE))
+            if page_token is not None:
+                decode_page_token(page_token)
+        except ValueError:
+            error = f"Invalid page, the page size must be a number between 1 and {MAX_PAGE_SIZE}."
+            page_token = None
+
+        return page_size, page_token, error
+
+
+    def _next_page_url(products: Optional[Page], page_size: int, search_args: Dict[str, str]) -> Optional[str]:
+        if products is None or products.next_page_token is None:
+            return None
+
+        return url_for(
+            "product.search_products",
+            page_token=products.next_page_token,
+            page_size=page_size,
+            **search_args,
+        )
+
+
+    async def _get_product_or_error(
+        product_id: str, unit_id: Optional[str] = None
+    ) -> Tuple[Optional[Product], Optional[str]]:
+        product: Optional[Product] = None
+        error: Optional[str]       = None
+        try:
+            product = await product_service.get_product_by_id(product_id, unit_id)
+        except ProductNotFoundByIdError:
+            error="Could not find product."
+        except ValueError:
+            error="The product's record in the database is missing required attributes."
+
+        return product, error
+
+
+    async def _sell_product_or_error(
+        product_id:str, quantity_to_sell: float, unit_id: Optional[str] = None
+    ) -> Tuple[Optional[Product], Optional[str]]:
+        product: Optional[Product] = None
+        error: Optional[str]       = None
+        try:
+            product = await product_service.sell_product(product_id, int(quantity_to_sell), unit_id)
+        except ProductNotFoundByIdError:
+            error="Could not find product."
+        except InsufficientProductQuantity:
+            error="There are not enough items of the product in stock."
+        except ValueError:
+            error=(
+                "The product's record in the database is missing required attributes"
+                "or the quantity to sell is not a number."
+            )
+
+        return product, error
+
+
+    def _product_before_sale(product: Product, quantity_sold: int) -> Product:
+        # rebuild the product as it was before the sale from the updated document,
+        # instead of reading it from the database before selling
+        product_before = Product.from_dict(product.to_dict())
+        product_before.quantity      = product.quantity + quantity_sold
+        product_before.sold_quantity = product.sold_quantity - quantity_sold
+        product_before.unit_gain     = product.unit_gain - product.calculate_profit(quantity_sold)
+        return product_before
+
+
+    @product_bp.route("/search-products", methods=["GET", "POST"])
+    @login_required
+    @required_role("employee")
+    async def search_products():
+        error: Optional[str]           = ""
+        products: Optional[Page]       = None
+        start_index_int: Optional[int] = None
+        end_index_int: Optional[int]   = None
+        search_products_page: str      = "product/search_products.html"
+        values: MultiDict              = await request.values
+
+        page_size, page_token, error = _page_args_or_error(values)
+        if error:
+            return await render_template(search_products_page, error=error)
+
+        # the search fields that were filled, kept to build the link to the next page
+        search_args: Dict[str, str] = {
+            field: values[field] for field in SEARCH_FIELDS if values.get(field)
+        }
+
+        if not search_args:
+            products, error = await _view_products(page_size, page_token)
+            if error:
+                return await render_template(search_products_page, error=error)
+
+            return await render_template(
+                search_products_page,
+                products=products,
+                next_page_url=_next_page_url(products, page_size, search_args),
+            )
+
+        order_field: Optional[str]  = search_args.get("order_field")
+        order_type: Optional[str]   = search_args.get("order_type")
+        product_name: Optional[str] = search_args.get("product_name")
+        product_id: Optional[str]   = search_args.get("product_id")
+        min_quantity: Optional[str] = search_args.get("start_index")
+        max_quantity: Optional[str] = search_args.get("end_index")
+        unit_id: Optional[str]      = session.get("unit_id")
+
+        # are both present?
+        if min_quantity not in ("", None) and max_quantity not in ("", None):
+            try:
+                start_index_int = int(min_quantity)
+                end_index_int   = int(max_quantity)
+            except ValueError:
+                error = "From and To fields must be numbers"
+                return await render_template(search_products_page, error=error)
+
+        try:
+            products = await product_service.search_products(
+                order_field, order_type, product_name, product_id, start_index_int, end_index_int, unit_id,
+                page_size, page_token, summary=True
+            )
+        except ValueError:
+            error = "Invalid prices for range fields."
+            return await render_template(search_products_page, error=error)
+
+        if not products:
+            error = "No products found"
+            return await render_template(search_products_page, error=error)
+
+        return await render_template(
+            search_products_page,
+            error=error,
+            products=products,
+            next_page_url=_next_page_url(products, page_size, search_args),
+        )
+
+
+    @product_bp.route("/products", methods=["GET", "POST"])
+    @product_bp.route("/products/<product_id>", methods=["GET", "POST"])
+    @login_required
+    @required_role("employee")
+    async def view_product(product_id: Optional[str] = None):
+        product: Optional[Product] = None
+        view_product_page: str     = "product/view_product.html"
+        unit_id: Optional[str]     = session.get("unit_id")
+
+        # Case 1: Came here after viewing all products and choosing one
+        if product_id:
+            product, error = await _get_product_or_error(product_id, unit_id)
+            if error:
+                return await render_template(view_product_page, error=error)
+            return await render_template(
+                view_product_page, product=product, product_id=product_id
+            )
+
+        # Case 2: manual search by entering a product's id
+        if request.method != "POST":
+            return await render_template(view_product_page, product_id="")
+
+        product_id = (await request.form).get("product_id")
+
+        if not product_id:
+            return await render_template(view_product_page)
+
+        # retrieve product_id and redirect to Case 1 (to build ulr like: products/<product_id>)
+        return redirect(url_for("product.view_product", product_id=product_id))
+
+
+    @product_bp.route("/products/sell", methods=["GET", "POST"])
+    @product_bp.route("/products/<product_id>/sell", methods=["GET", "POST"])
+    @login_required
+    @required_role("employee")
+    async def sell_product(product_id: Optional[str] = None):
+        products: List[Optional[Product]]        = []
+        error: Optional[str]                     = None
+        product_to_sell: Optional[Product]       = None
+        product_after_sell: Optional[Product]    = None
+        unit_id: Optional[str]                   = session.get("unit_id")
+        sell_product_page                        = "product/sell_product.html"
+
+        if request.method == "GET":
+            # Case 1: Came here from view_product:
+            if product_id:
+                # get old product and show it.
+                product_to_sell, error = await _get_product_or_error(product_id, unit_id)
+                if error:
+                    return await render_template(
+                        sell_product_page, product_id=product_id, error=error
+                    )
+                return await render_template(
+                    sell_product_page, product_id=product_id, products=[product_to_sell]
+                )
+            return await render_template(sell_product_page, product_id="")
+
+        # Case 2: Came here after clicking sell product in dashboard:
+        form             = await request.form
+        product_id       = form.get("product_id")
+        quantity_to_sell = form.get("product_quantity_sell")
+
+        if not product_id:
+            return await render_template(sell_product_page)
+
+        # show product and its id
+        if not quantity_to_sell:
+            product_to_sell, error = await _get_product_or_error(product_id, unit_id)
+            if error:
+                return await render_template(
+                    sell_product_page, product_id=product_id, error=error
+                )
+            return await render_template(
+                sell_product_page, product_id=product_id, products=[product_to_sell]
+            )
+
+        # sell product, without reading it first
+        product_after_sell, error = await _sell_product_or_error(
+            product_id, int(quantity_to_sell), unit_id or None
+        )
+        if error:
+            # show the product so that the available quantity is visible
+            product_to_sell, _ = await _get_product_or_error(product_id, unit_id)
+            if product_to_sell is not None:
+                products.append(product_to_sell)
+            return await render_template(
+                sell_product_page, product_id=product_id, products=products, error=error
+            )
+        products.append(_product_before_sale(product_after_sell, int(quantity_to_sell)))
+        products.append(product_after_sell)
+
+        # show product before and after selling
+        return await render_template(
+            sell_product_page, product_id=product_id, products=products
+        )
+
+
+    @product_bp.route("/products/sell-basket", methods=["POST"])
+    @login_required
+    @required_role("employee")
+    async def sell_basket():
+        # see the sell_basket view of create_product_blueprint()
+        unit_id: Optional[str] = session.get("unit_id") or None
+
+        try:
+            lines, all_or_nothing = parse_basket(await request.get_json(silent=True))
+        except ValueError as error:
+            return jsonify(error=str(error)), 400
+
+        try:
+            results = await product_service.sell_products(lines, unit_id, all_or_nothing)
+        except PyMongoError:
+            # see the sell_basket view of create_product_blueprint()
+            return jsonify(error="The basket could not be sold, check the products before retrying."), 503
+
+        return jsonify(
+            applied=all(r.applied for r in results),
+            results=[r.to_dict() for r in results],
+        )
+
+
+    return product_bp
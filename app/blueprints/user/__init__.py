@@ -2,19 +2,30 @@ from typing import Optional
 from flask import Blueprint, redirect, request, session, render_template, flash
 from app.blueprints.names import EMPLOYEE_BP, USER_BP
 from app.exceptions.exceptions import UnitNotFoundByIdError, UserNotFoundByIdError
+from app.model.unit_stats import LOW_STOCK_THRESHOLD
 from app.services.employee_service import EmployeeService
+from app.services.product_service import ProductService
 from app.services.user_service import UserService
-from app.utils.auth_utils import login_required
+from app.utils.auth_utils import current_user, login_required
 from app.services.user_service import UserService
 
 
-def create_user_blueprint(user_service: UserService):
+def create_user_blueprint(user_service: UserService, product_service: ProductService):
     user_bp = Blueprint(USER_BP, __name__, template_folder="templates")
 
 
     @user_bp.route("/", methods=["GET"])
     @login_required
     def dashboard():
-        return render_template("user/dashboard.html", role=session["role"])
+        user = current_user()
+        # one point read of the counters of the unit, admins are not assigned to any unit
+        unit_stats = product_service.get_unit_stats(user.unit_id) if user.unit_id else None
+        return render_template(
+            "user/dashboard.html",
+            role=user.role,
+            unit_name=user.unit_name,
+            unit_stats=unit_stats,
+            low_stock_threshold=LOW_STOCK_THRESHOLD,
+        )
 
     return user_bp
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import socket
+import time
+from typing import Dict, List, Tuple
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+from app.repositories.indexes import INDEXES, create_indexes
+from app.services.admin_service import AdminService
+from app.services.product_service import ProductService
+
+
+"""
+The one time setup of the database: the indexes of every collection, the admin account
+and the migration of the data written before a new field was kept (see MIGRATIONS).
+
+It is run by the SERVER_BOOTSTRAP mode of create_server():
+    - "startup": by every process when it starts, the default.
+    - "lock": by the one process that takes the bootstrap lock, the other processes
+      start without waiting for it. Use it to start many workers at once.
+    - "none": never at startup, run `flask --app server bootstrap` once per deployment instead.
+"""
+STARTUP_BOOTSTRAP = "startup"
+LOCK_BOOTSTRAP    = "lock"
+NO_BOOTSTRAP      = "none"
+BOOTSTRAP_MODES: Tuple[str, ...] = (STARTUP_BOOTSTRAP, LOCK_BOOTSTRAP, NO_BOOTSTRAP)
+
+# the collection of the bootstrap locks, one document per bootstrap_version()
+BOOTSTRAP_COLLECTION = "bootstrap"
+
+# the data migrations run by bootstrap(), a new one needs a new bootstrap_version()
+MIGRATIONS: Tuple[str, ...] = ("occupied_volume", "unit_stats")
+
+
+def bootstrap(
+    db: Database,
+    admin_service: AdminService,
+    product_service: ProductService,
+    admin_username: str,
+    admin_password: str
+) -> Dict[str, List[str]]:
+    """
+    Create the indexes of INDEXES, insert the admin if it does not exist and run the MIGRATIONS:
+        - "occupied_volume": compute the `occupied_volume` of the units without one
+          (see ProductService.backfill_occupied_volume()).
+        - "unit_stats": rebuild `unit_stats` if a unit with products has no document,
+          before the dashboard reads it (see ProductService.backfill_unit_stats()).
+
+    Every step is idempotent, so it is safe to run more than once and from many processes.
+    The admin password is only hashed if the admin is missing.
+
+    Args:
+        db (Database): The database of the application.
+        admin_service (AdminService): Inserts the admin.
+        product_service (ProductService): Runs the migrations.
+        admin_username (str): The username of the admin.
+        admin_password (str): The password of the admin, used if the admin is inserted.
+
+    Returns:
+        Dict[str, List[str]]: The names of the indexes of each collection.
+    """
+    indexes = create_indexes(db)
+
+    if not admin_service.admin_exists(admin_username):
+        try:
+            admin_service.insert_admin(admin_username, admin_password)
+        except DuplicateKeyError: # if another process inserted the admin in the meantime
+            pass
+
+    product_service.backfill_occupied_volume()
+    product_service.backfill_unit_stats()
+
+    return indexes
+
+
+def bootstrap_version(admin_username: str) -> str:
+    """
+    Returns:
+        str: A digest of INDEXES, of MIGRATIONS and of the admin username, a new index,
+            migration or admin needs a new bootstrap even if the previous one is done.
+    """
+    indexes = {
+        collection: [index.document for index in collection_indexes]
+        for collection, collection_indexes in INDEXES.items()
+    }
+    spec = json.dumps(
+        {"indexes": indexes, "migrations": MIGRATIONS, "admin": admin_username}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(spec.encode()).hexdigest()[:16]
+
+
+def bootstrap_with_lock(
+    db: Database,
+    admin_service: AdminService,
+    product_service: ProductService,
+    admin_username: str,
+    admin_password: str,
+    lock_timeout: float = 300.0
+) -> bool:
+    """
+    Run bootstrap() in only one of the processes that call this at the same time.
+
+    The process that inserts the lock document of bootstrap_version() in BOOTSTRAP_COLLECTION
+    is the leader and runs the bootstrap, the others return at once, without waiting for it
+    (the queries work without the indexes, only slower, until the leader is done).
+    Once a version is done no process runs it again.
+
+    If the leader fails the lock is released, so that the next process to start retries.
+    If the leader dies before it finishes, its lock is taken over
+    after `lock_timeout` seconds by the next process to start.
+
+    Args:
+        db (Database): The database of the application.
+        admin_service (AdminService): Inserts the admin.
+        product_service (ProductService): Runs the migrations.
+        admin_username (str): The username of the admin.
+        admin_password (str): The password of the admin, used if the admin is inserted.
+        lock_timeout (float): The seconds after which a running bootstrap is considered dead.
+
+    Returns:
+        bool: True if this process ran the bootstrap.
+
+    Raises:
+        Any exception raised by bootstrap(), after releasing the lock.
+    """
+    locks   = db[BOOTSTRAP_COLLECTION]
+    version = bootstrap_version(admin_username)
+    now     = time.time()
+    owner   = f"{socket.gethostname()}:{os.getpid()}"
+
+    try:
+        locks.insert_one({"_id": version, "status": "running", "owner": owner, "started_at": now})
+    except DuplicateKeyError:
+        # take over the lock of a dead leader
+        stale = locks.find_one_and_update(
+            {"_id": version, "status": "running", "started_at": {"$lt": now - lock_timeout}},
+            {"$set": {"owner": owner, "started_at": now}},
+        )
+        if stale is None:
+            return False
+
+    try:
+        bootstrap(db, admin_service, product_service, admin_username, admin_password)
+    except Exception:
+        locks.delete_one({"_id": version, "owner": owner})
+        raise
+
+    locks.update_one(
+        {"_id": version, "owner": owner},
+        {"$set": {"status": "done", "finished_at": time.time()}},
+    )
+    return True
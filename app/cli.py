@@ -0,0 +1,123 @@
+from typing import List, Optional
+import click
+from app.bootstrap import bootstrap
+from app.custom_flask import CustomFlask
+from app.exceptions.exceptions import UnitNotFoundByIdError
+from app.repositories.indexes import create_indexes, find_collection_scans
+from app.services.admin_service import AdminService
+from app.services.product_service import ProductService
+
+
+def register_cli_commands(server: CustomFlask, product_service: ProductService, admin_service: AdminService) -> None:
+    """
+    Register the maintenance commands of the application to `server.cli`.
+
+    The commands are run with the flask cli, for example:
+        flask --app server reconcile-occupied-volume --dry-run
+    """
+
+    @server.cli.command("bootstrap")
+    def bootstrap_command():
+        """ Create the indexes and the admin and run the migrations, once per deployment with SERVER_BOOTSTRAP=none. """
+        indexes = bootstrap(
+            server.db, admin_service, product_service, server.config["ADMIN_USERNAME"], server.config["ADMIN_PASSWORD"]
+        )
+        for collection, names in indexes.items():
+            click.echo(f"{collection}: {', '.join(names)}")
+        click.echo(f"Admin: {server.config['ADMIN_USERNAME']}")
+
+
+    @server.cli.command("create-indexes")
+    def create_indexes_command():
+        """ Create the indexes of every collection (see app.repositories.indexes). """
+        for collection, names in create_indexes(server.db).items():
+            click.echo(f"{collection}: {', '.join(names)}")
+
+
+    @server.cli.command("check-query-plans")
+    def check_query_plans():
+        """ Fail if any repository query scans a whole collection. """
+        collection_scans = find_collection_scans(server.db)
+
+        for query in collection_scans:
+            click.echo(f"COLLSCAN: {query}", err=True)
+
+        if collection_scans:
+            raise SystemExit(1)
+
+        click.echo("Every repository query uses an index.")
+
+
+    @server.cli.command("reconcile-occupied-volume")
+    @click.option("--dry-run", is_flag=True, help="Only report the drift, do not fix it.")
+    def reconcile_occupied_volume(dry_run: bool):
+        """ Recompute the occupied volume of every unit from its products. """
+        drift = product_service.reconcile_occupied_volume(dry_run=dry_run)
+
+        for unit in drift:
+            click.echo(
+                f"Unit with id={unit['unit_id']}: "
+                f"stored={unit['stored']} actual={unit['actual']} "
+                f"drift={unit['stored'] - unit['actual']}"
+            )
+
+        action = "Found" if dry_run else "Fixed"
+        click.echo(f"{action} {len(drift)} units with drifted occupied volume.")
+
+
+    def _echo_unit_stats_drift(drift: List[dict], err: bool = False) -> None:
+        for unit in drift:
+            click.echo(f"Unit with id={unit['unit_id']}: stored={unit['stored']} actual={unit['actual']}", err=err)
+
+
+    @server.cli.command("rebuild-unit-stats")
+    def rebuild_unit_stats():
+        """ Recompute the unit_stats counters of every unit from its products. """
+        drift = product_service.reconcile_unit_stats()
+        _echo_unit_stats_drift(drift)
+        click.echo(f"Fixed {len(drift)} units with drifted unit stats.")
+
+
+    @server.cli.command("check-unit-stats")
+    def check_unit_stats():
+        """ Fail if the unit_stats counters of any unit differ from its products. """
+        drift = product_service.reconcile_unit_stats(dry_run=True)
+        _echo_unit_stats_drift(drift, err=True)
+
+        if drift:
+            raise SystemExit(1)
+
+        click.echo("The unit stats of every unit match its products.")
+
+
+    @server.cli.command("product-report")
+    @click.option("--unit-id", help="Only report the products of this unit.")
+    def product_report(unit_id: Optional[str]):
+        """ Report the stock and the sales of the products, computed over a ProductSnapshot. """
+        try:
+            snapshot = product_service.get_product_snapshot(unit_id)
+        except UnitNotFoundByIdError as error:
+            click.echo(str(error), err=True)
+            raise SystemExit(1)
+
+        units    = [
+            unit for unit in product_service.unit_repository.get_all_units()
+            if unit_id is None or unit.id == unit_id
+        ]
+
+        click.echo(f"Products: {len(snapshot)}")
+        click.echo(f"Stock value: {snapshot.stock_value().sum():.2f}")
+        click.echo(f"Profit of the sold quantity: {snapshot.calculate_profit(snapshot.sold_quantity).sum():.2f}")
+
+        unit_gain   = snapshot.unit_gain_by_unit()
+        utilization = snapshot.capacity_utilization(units)
+        for unit in units:
+            # a unit without volume has no utilization
+            click.echo(
+                f"Unit with id={unit.id}: unit_gain={unit_gain.get(unit.id, 0.0):.2f} "
+                f"utilization={'n/a' if utilization[unit.id] is None else format(utilization[unit.id], '.1%')}"
+            )
+
+        stock_value = snapshot.stock_value_by_category()
+        for category, sold_quantity in snapshot.sold_quantity_by_category().items():
+            click.echo(f"Category {category}: sold_quantity={sold_quantity} stock_value={stock_value[category]:.2f}")
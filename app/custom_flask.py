@@ -1,15 +1,41 @@
+from typing import Any, Callable, Dict, Optional
 from flask import Flask
 from pymongo.database import Database 
 from pymongo.collection import Collection
+from app.model.user import User
+from app.storage.pool_stats import PoolStatsListener
 
 
 class CustomFlask(Flask):
     db: Database
+    # the database of the read client, see app.storage.storage_backend.create_clients()
+    read_db: Database
     admin_collection: Collection
     unit_collection: Collection
     product_collection: Collection
     user_collection: Collection
+    # the statistics of the connection pools of the MongoClients, by "write" and "read"
+    pool_stats: Dict[str, PoolStatsListener]
+    # how long create_server() took in this process, see app.bootstrap
+    boot_stats: Dict[str, Any]
+    # loads the user of the session, see app.utils.auth_utils.current_user()
+    identity_loader: Optional[Callable[[str], User]]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.identity_loader = None
+        self.boot_stats      = {}
 
+
+    def load_identity(self, user_id: str) -> User:
+        """
+        Load the user identified by `user_id` with `identity_loader`.
+
+        Raises:
+            RuntimeError: If no identity loader is set.
+            Any exception raised by `identity_loader`.
+        """
+        if self.identity_loader is None:
+            raise RuntimeError("The identity_loader of the server is not set.")
+
+        return self.identity_loader(user_id)
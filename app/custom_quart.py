@@ -0,0 +1,27 @@
+from typing import Awaitable, Callable, Optional
+from quart import Quart
+from app.model.user import User
+
+
+class CustomQuart(Quart):
+    """ The Quart app of the async views of the ASGI server (see app.asgi), like CustomFlask. """
+    # loads the user of the session, see app.utils.async_auth_utils.current_user()
+    identity_loader: Optional[Callable[[str], Awaitable[User]]]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.identity_loader = None
+
+
+    async def load_identity(self, user_id: str) -> User:
+        """
+        Load the user identified by `user_id` with `identity_loader`.
+
+        Raises:
+            RuntimeError: If no identity loader is set.
+            Any exception raised by `identity_loader`.
+        """
+        if self.identity_loader is None:
+            raise RuntimeError("The identity_loader of the server is not set.")
+
+        return await self.identity_loader(user_id)
@@ -4,7 +4,8 @@ from app.model.user import User
 
 
 class Admin(User):
-    role: str = "admin"
+    # the role is always "admin", see __init__
+    __slots__ = ()
 
 
     def __init__(
@@ -38,7 +39,7 @@ class Admin(User):
 
 
     def __repr__(self) -> str:
-        attrs = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        attrs = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
         return f"Admin({attrs})"
 
 
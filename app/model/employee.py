@@ -4,7 +4,8 @@ from app.model.user import User
 
 
 class Employee(User):
-    role: str = "employee"
+    # the role is set by __init__, the attributes are the slots of User
+    __slots__ = ()
 
     def __init__(
         self,
@@ -47,7 +48,7 @@ class Employee(User):
 
 
     def __repr__(self) -> str:
-        attrs = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        attrs = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
         return f"Employee({attrs})"
 
 
@@ -0,0 +1,56 @@
+from typing import Optional
+
+
+class LineResult:
+    product_id: str
+    quantity: int
+    applied: bool
+    error: Optional[Exception]
+
+    def __init__(
+        self,
+        product_id: str,
+        quantity: int,
+        applied: bool,
+        error: Optional[Exception] = None
+    ):
+        self.product_id: str             = product_id
+        self.quantity: int               = quantity
+        # False if the line failed or was rolled back with the rest of its batch
+        self.applied: bool               = applied
+        self.error: Optional[Exception]  = error
+
+
+    def __str__(self) -> str:
+        return ", ".join(map(str, [
+            self.product_id,
+            self.quantity,
+            self.applied,
+            self.error
+        ]))
+
+
+    def __repr__(self) -> str:
+        attrs = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        return f"LineResult({attrs})"
+
+
+    def to_dict(self) -> dict:
+        """
+        Convert the LineResult instance into a dictionary that can be sent as JSON.
+
+        Returns:
+            dict: A dictionary with the keys:
+            - `product_id`
+            - `quantity`
+            - `applied`
+            - `error`: The name of the exception of the line, or None.
+            - `message`: The message of the exception of the line, or None.
+        """
+        return {
+            "product_id": self.product_id,
+            "quantity":   self.quantity,
+            "applied":    self.applied,
+            "error":      type(self.error).__name__ if self.error is not None else None,
+            "message":    str(self.error) if self.error is not None else None,
+        }
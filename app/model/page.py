@@ -0,0 +1,26 @@
+from typing import Any, List, Optional
+
+
+class Page:
+    items: List[Any]
+    page_size: int
+    next_page_token: Optional[str]
+
+    def __init__(self, items: List[Any], page_size: int, next_page_token: Optional[str]):
+        self.items: List[Any]                = items
+        self.page_size: int                  = page_size
+        # None if this is the last page
+        self.next_page_token: Optional[str]  = next_page_token
+
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+    def __repr__(self) -> str:
+        attrs = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        return f"Page({attrs})"
@@ -1,10 +1,36 @@
 from __future__ import annotations  # for pyright typechecking
 import uuid
-from typing import Optional
+from typing import Any, Iterable, List, Mapping, Optional
 from operator import attrgetter
+from app.utils.document_utils import required_getter
 
 
 class Product:
+    """
+    A product stored in a unit.
+
+    The attributes are slots, a Product has no `__dict__`, so the products of a listing take
+    less memory and their attributes are read faster. Decode many documents with from_documents().
+    """
+    __slots__ = (
+        "id",
+        "name",
+        "quantity",
+        "sold_quantity",
+        "weight",
+        "volume",
+        "category",
+        "purchase_price",
+        "selling_price",
+        "manufacturer",
+        "unit_gain",
+        "unit_id",
+    )
+
+    # the attributes that cannot be None, in the order of the arguments of __init__ after `id`
+    REQUIRED_FIELDS = __slots__[1:]
+    _required_values = staticmethod(required_getter(REQUIRED_FIELDS))
+
     id: Optional[str]
     name: str
     quantity: int
@@ -68,7 +94,7 @@ class Product:
 
 
     def __repr__(self) -> str:
-        attrs = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        attrs = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
         return f"Product({attrs})"
 
 
@@ -136,41 +162,28 @@ class Product:
         Raises:
             ValueError: If any required attribute is missing or None.
         """
-        # id can be None so dont include it in the attr list
-        attributes = [
-            "name",
-            "quantity",
-            "sold_quantity",
-            "weight",
-            "volume",
-            "category",
-            "purchase_price",
-            "selling_price",
-            "manufacturer",
-            "unit_gain",
-            "unit_id",
-        ]
-
-        for attr in attributes:
-            if data.get(attr) is None:
-                raise ValueError(f"Attribute {attr} cannot be None")
-
-        product = cls(
-            id             = data.get("id"),
-            name           = data.get("name"),
-            quantity       = data.get("quantity"),
-            sold_quantity  = data.get("sold_quantity"),
-            weight         = data.get("weight"),
-            volume         = data.get("volume"),
-            category       = data.get("category"),
-            purchase_price = data.get("purchase_price"),
-            selling_price  = data.get("selling_price"),
-            manufacturer   = data.get("manufacturer"),
-            unit_gain      = data.get("unit_gain"),
-            unit_id        = data.get("unit_id"),
-        )
-
-        return product
+        return cls(data.get("id"), *cls._required_values(data))
+
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Mapping[str, Any]]) -> List[Product]:
+        """
+        Create the Product instances of a batch of documents, e.g. of a cursor, in one pass.
+
+        Validates the documents like from_dict(), but reads the required attributes of each
+        document with a single lookup (see app.utils.document_utils.required_getter()).
+
+        Args:
+            documents (Iterable[Mapping[str, Any]]): The product documents, see from_dict().
+
+        Returns:
+            List[Product]: The products, in the order of `documents`.
+
+        Raises:
+            ValueError: If any required attribute of a document is missing or None.
+        """
+        required_values = cls._required_values
+        return [cls(data.get("id"), *required_values(data)) for data in documents]
 
 
     def calculate_loss(self, quantity: int) -> float:
@@ -0,0 +1,287 @@
+from __future__ import annotations  # for pyright typechecking
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+from app.model.unit import Unit
+from app.utils.document_utils import required_getter
+
+
+"""
+The fields of many products as NumPy columns, for the reports over the whole catalogue.
+
+A report over Product objects reads every attribute of every product in the interpreter.
+A ProductSnapshot keeps one array per field instead, so the totals and the group-bys of a report
+run in NumPy over whole columns. `unit_id` and `category` are dictionary encoded: the column holds
+the int32 code of each product and the labels list maps a code back to its value.
+"""
+
+# the numeric columns of a snapshot and their dtype
+NUMERIC_FIELDS: Dict[str, type] = {
+    "quantity":       np.int64,
+    "sold_quantity":  np.int64,
+    "volume":         np.float64,
+    "purchase_price": np.float64,
+    "selling_price":  np.float64,
+    "unit_gain":      np.float64,
+}
+
+# the dictionary encoded columns
+ENCODED_FIELDS: Tuple[str, ...] = ("unit_id", "category")
+
+# the getter of each column
+_GETTERS = {field: itemgetter(field) for field in (*ENCODED_FIELDS, *NUMERIC_FIELDS)}
+
+# the documents of a snapshot are read in chunks of this many documents
+DEFAULT_CHUNK_SIZE = 65_536
+
+
+class ProductSnapshot:
+    """
+    The numeric fields, the unit and the category of a set of products, one NumPy array per field.
+
+    Load a snapshot with from_documents() from a cursor that projects FIELDS
+    (see ProductRepository.get_snapshot()). A snapshot is not updated by later writes.
+    """
+    __slots__ = (
+        *NUMERIC_FIELDS,
+        "unit_codes",
+        "unit_ids",
+        "category_codes",
+        "categories",
+    )
+
+    FIELDS     = (*ENCODED_FIELDS, *NUMERIC_FIELDS)
+    PROJECTION = {"_id": 0, **{field: 1 for field in FIELDS}}
+    _required_values = staticmethod(required_getter(FIELDS))
+
+    quantity: NDArray[np.int64]
+    sold_quantity: NDArray[np.int64]
+    volume: NDArray[np.float64]
+    purchase_price: NDArray[np.float64]
+    selling_price: NDArray[np.float64]
+    unit_gain: NDArray[np.float64]
+    # the code of the unit of each product, an index of `unit_ids`
+    unit_codes: NDArray[np.int32]
+    unit_ids: List[str]
+    # the code of the category of each product, an index of `categories`
+    category_codes: NDArray[np.int32]
+    categories: List[str]
+
+    def __init__(self, columns: Mapping[str, np.ndarray], unit_ids: List[str], categories: List[str]):
+        for field in NUMERIC_FIELDS:
+            setattr(self, field, columns[field])
+
+        self.unit_codes     = columns["unit_id"]
+        self.unit_ids       = unit_ids
+        self.category_codes = columns["category"]
+        self.categories     = categories
+
+
+    def __len__(self) -> int:
+        return len(self.quantity)
+
+
+    def __repr__(self) -> str:
+        return f"ProductSnapshot(products={len(self)}, units={len(self.unit_ids)}, categories={len(self.categories)})"
+
+
+    @classmethod
+    def _validate(cls, documents: List[Mapping[str, Any]]) -> None:
+        """ Raise the ValueError of the first document with a missing field, the checks are only run on failure. """
+        for document in documents:
+            cls._required_values(document)
+
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: Iterable[Mapping[str, Any]],
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> ProductSnapshot:
+        """
+        Load the columns of a snapshot from product documents.
+
+        The documents are read `chunk_size` at a time, and each chunk is turned into
+        one array per field before the next one is read, so only the arrays and one chunk
+        of documents are in memory at once. Pass a cursor to stream the documents.
+
+        Args:
+            documents (Iterable[Mapping[str, Any]]): Product documents with at least the fields of FIELDS.
+            chunk_size (int): The number of documents converted at once.
+
+        Returns:
+            ProductSnapshot: The snapshot of the products, in the order of `documents`.
+
+        Raises:
+            ValueError: If a document is missing a field of FIELDS or the field is None.
+        """
+        chunks: Dict[str, List[np.ndarray]] = {field: [] for field in cls.FIELDS}
+        labels: Dict[str, Dict[Any, int]]   = {field: {} for field in ENCODED_FIELDS}
+
+        iterator = iter(documents)
+        while chunk := list(islice(iterator, chunk_size)):
+            try:
+                # one pass of a C level map per field, no Python frame per document
+                for field, dtype in NUMERIC_FIELDS.items():
+                    column = np.fromiter(map(_GETTERS[field], chunk), dtype, len(chunk))
+                    # a float column reads None as NaN instead of failing
+                    if column.dtype.kind == "f" and np.isnan(column).any():
+                        cls._validate(chunk)
+                    chunks[field].append(column)
+
+                for field in ENCODED_FIELDS:
+                    values = list(map(_GETTERS[field], chunk))
+                    if None in values:
+                        cls._validate(chunk)
+
+                    codes = labels[field]
+                    # new labels get the next codes, in the order they first appear
+                    for label in dict.fromkeys(values):
+                        codes.setdefault(label, len(codes))
+                    chunks[field].append(np.fromiter(map(codes.__getitem__, values), np.int32, len(chunk)))
+            except (KeyError, TypeError):
+                # a missing field, or None in an integer column
+                cls._validate(chunk)
+                raise
+
+        arrays = {
+            field: np.concatenate(parts) if parts else np.empty(0, NUMERIC_FIELDS.get(field, np.int32))
+            for field, parts in chunks.items()
+        }
+        return cls(arrays, list(labels["unit_id"]), list(labels["category"]))
+
+
+    ####################################################################################################
+    # Per product columns
+
+    def calculate_profit(self, quantity: ArrayLike) -> NDArray[np.float64]:
+        """
+        Product.calculate_profit() of every product.
+
+        Args:
+            quantity (ArrayLike): The quantity sold, one for all the products or one per product.
+
+        Returns:
+            NDArray[np.float64]: The profit of each product.
+        """
+        return (self.selling_price - self.purchase_price) * quantity
+
+
+    def calculate_loss(self, quantity: ArrayLike) -> NDArray[np.float64]:
+        """
+        Product.calculate_loss() of every product.
+
+        Args:
+            quantity (ArrayLike): The quantity lost, one for all the products or one per product.
+
+        Returns:
+            NDArray[np.float64]: The loss of each product, zero or negative.
+        """
+        return -self.purchase_price * quantity
+
+
+    def stock_value(self) -> NDArray[np.float64]:
+        """
+        Returns:
+            NDArray[np.float64]: The purchase price of the stock of each product.
+        """
+        return self.quantity * self.purchase_price
+
+
+    def occupied_volume(self) -> NDArray[np.float64]:
+        """
+        Returns:
+            NDArray[np.float64]: The volume the stock of each product takes up in its unit.
+        """
+        return self.quantity * self.volume
+
+
+    ####################################################################################################
+    # Group-by aggregations
+
+    @staticmethod
+    def _sum_by(codes: np.ndarray, labels: List[str], values: ArrayLike) -> Dict[str, Any]:
+        values = np.asarray(values)
+        sums   = np.bincount(codes, weights=values, minlength=len(labels))
+        # bincount sums the weights as float64, the sums of integer columns are exact below 2**53
+        if values.dtype.kind in "iu":
+            sums = sums.astype(np.int64)
+
+        return dict(zip(labels, sums.tolist()))
+
+
+    def sum_by_unit(self, values: ArrayLike) -> Dict[str, Any]:
+        """
+        Sum a column per unit.
+
+        Args:
+            values (ArrayLike): One value per product, e.g. a field or the result of calculate_profit().
+
+        Returns:
+            Dict[str, Any]: The sum of `values` of the products of each unit, by `unit_id`.
+                The sums of integer values are int, the other ones are float.
+        """
+        return self._sum_by(self.unit_codes, self.unit_ids, values)
+
+
+    def sum_by_category(self, values: ArrayLike) -> Dict[str, Any]:
+        """
+        Sum a column per category.
+
+        Args:
+            values (ArrayLike): One value per product.
+
+        Returns:
+            Dict[str, Any]: The sum of `values` of the products of each category.
+        """
+        return self._sum_by(self.category_codes, self.categories, values)
+
+
+    def unit_gain_by_unit(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: The total `unit_gain` of the products of each unit.
+        """
+        return self.sum_by_unit(self.unit_gain)
+
+
+    def sold_quantity_by_category(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: The total `sold_quantity` of the products of each category.
+        """
+        return self.sum_by_category(self.sold_quantity)
+
+
+    def stock_value_by_category(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: The purchase price of the stock of each category.
+        """
+        return self.sum_by_category(self.stock_value())
+
+
+    def capacity_utilization(self, units: Iterable[Unit]) -> Dict[str, Optional[float]]:
+        """
+        Calculate the share of the volume of each unit taken up by its products.
+
+        Unlike the `occupied_volume` stored in a unit, the occupied volume is computed
+        from the products of the snapshot.
+
+        Args:
+            units (Iterable[Unit]): The units to report, units without products
+                in the snapshot have a utilization of 0.
+
+        Returns:
+            Dict[str, float | None]: The occupied volume of each unit divided by its volume, by unit id.
+                None for a unit without volume.
+        """
+        occupied = np.bincount(self.unit_codes, weights=self.occupied_volume(), minlength=len(self.unit_ids))
+        codes    = {unit_id: code for code, unit_id in enumerate(self.unit_ids)}
+
+        return {
+            unit.id: (float(occupied[codes[unit.id]]) if unit.id in codes else 0.0) / unit.volume if unit.volume else None
+            for unit in units
+        }
@@ -0,0 +1,153 @@
+from __future__ import annotations  # for pyright typechecking
+from operator import itemgetter
+from typing import Any, Iterable, List, Mapping
+from app.utils.document_utils import required_getter
+
+
+class ProductSummary:
+    """
+    The columns of a product shown in product lists.
+
+    A lighter, read only view of Product for pages that do not need the full record:
+    every field but `unit_id`, which the lists do not show.
+    Like Product, the attributes are slots.
+    """
+    __slots__ = (
+        "id",
+        "name",
+        "quantity",
+        "sold_quantity",
+        "weight",
+        "volume",
+        "category",
+        "purchase_price",
+        "selling_price",
+        "manufacturer",
+        "unit_gain",
+    )
+
+    id: str
+    name: str
+    quantity: int
+    sold_quantity: int
+    weight: float
+    volume: float
+    category: str
+    purchase_price: float
+    selling_price: float
+    manufacturer: str
+    unit_gain: float
+
+    # the fields read from the database, see ProductSummary.projection()
+    FIELDS = __slots__
+    # the fields that cannot be None
+    REQUIRED_FIELDS = ("name", "quantity")
+    _required_values = staticmethod(required_getter(REQUIRED_FIELDS))
+    # reads every field of a projected document with one call
+    _values = staticmethod(itemgetter(*FIELDS))
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        quantity: int,
+        sold_quantity: int,
+        weight: float,
+        volume: float,
+        category: str,
+        purchase_price: float,
+        selling_price: float,
+        manufacturer: str,
+        unit_gain: float
+    ):
+        self.id: str               = id
+        self.name: str             = name
+        self.quantity: int         = quantity
+        self.sold_quantity: int    = sold_quantity
+        self.weight: float         = weight
+        self.volume: float         = volume
+        self.category: str         = category
+        self.purchase_price: float = purchase_price
+        self.selling_price: float  = selling_price
+        self.manufacturer: str     = manufacturer
+        self.unit_gain: float      = unit_gain
+
+
+    def __eq__(self, other: ProductSummary) -> bool:
+        return self.id == other.id
+
+    def __str__(self) -> str:
+        return ", ".join(str(getattr(self, field)) for field in self.FIELDS)
+
+
+    def __repr__(self) -> str:
+        attrs = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.FIELDS)
+        return f"ProductSummary({attrs})"
+
+
+    @classmethod
+    def projection(cls) -> dict:
+        """
+        Returns the projection of a find query that reads only the fields of ProductSummary.
+        """
+        projection = {field: 1 for field in cls.FIELDS}
+        projection["_id"] = 0
+        return projection
+
+
+    @classmethod
+    def from_dict(cls, data: dict) -> ProductSummary:
+        """
+        Create a ProductSummary instance from a (projected) product document.
+
+        Args:
+            data (dict): Dictionary containing at least the keys of ProductSummary.FIELDS.
+
+        Returns:
+            ProductSummary: A ProductSummary instance initialized with the given attributes.
+
+        Raises:
+            ValueError: If `name` or `quantity` is missing or None.
+        """
+        name, quantity = cls._required_values(data)
+
+        return cls(
+            id             = data.get("id"),
+            name           = name,
+            quantity       = quantity,
+            sold_quantity  = data.get("sold_quantity"),
+            weight         = data.get("weight"),
+            volume         = data.get("volume"),
+            category       = data.get("category"),
+            purchase_price = data.get("purchase_price"),
+            selling_price  = data.get("selling_price"),
+            manufacturer   = data.get("manufacturer"),
+            unit_gain      = data.get("unit_gain"),
+        )
+
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Mapping[str, Any]]) -> List[ProductSummary]:
+        """
+        Create the ProductSummary instances of a batch of (projected) product documents, in one pass.
+        See Product.from_documents().
+
+        The fields of a document are read with one itemgetter call, a document
+        without some of them is decoded by ProductSummary.from_dict().
+
+        Raises:
+            ValueError: If `name` or `quantity` of a document is missing or None.
+        """
+        get_values = cls._values
+        summaries  = []
+        for data in documents:
+            try:
+                values = get_values(data)
+            except KeyError:
+                summaries.append(cls.from_dict(data))
+                continue
+            # `name` and `quantity`
+            if values[1] is None or values[2] is None:
+                cls._required_values(data)
+            summaries.append(cls(*values))
+        return summaries
@@ -0,0 +1,112 @@
+from __future__ import annotations  # for pyright typechecking
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+from bson import decode
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from app.model.product import Product
+from app.model.product_summary import ProductSummary
+
+
+"""
+Read only products over the raw BSON of the documents, for the listings of the read only mode
+of ProductRepository (`raw_listings`).
+
+The documents of a listing are read as RawBSONDocument, which keep the bytes sent by the server,
+and a product is only decoded when one of its fields is read. The required fields are validated
+then too, so a listing of a product with a missing field raises ValueError when the view reads it,
+not when the page is read.
+"""
+
+# the codec options of the collection of the raw listings
+RAW_CODEC_OPTIONS: CodecOptions = CodecOptions(document_class=RawBSONDocument)
+
+
+def _field(name: str) -> property:
+    def get(self: RawModel) -> Any:
+        document = self._document
+        if document is None:
+            document = self._decode()
+        return document.get(name)
+
+    return property(get, doc=f"The `{name}` of the document, decoded on the first read of a field.")
+
+
+class RawModel:
+    """
+    The base of the read only models over a RawBSONDocument.
+
+    A subclass sets FIELDS, one read only property is added for each field,
+    and `required_values`, which validates the decoded document.
+    """
+    __slots__ = ("_raw", "_document")
+
+    FIELDS: Tuple[str, ...] = ()
+    required_values: Callable[[Mapping[str, Any]], Tuple[Any, ...]]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for field in cls.FIELDS:
+            setattr(cls, field, _field(field))
+
+
+    def __init__(self, raw: RawBSONDocument):
+        self._raw: RawBSONDocument                = raw
+        self._document: Optional[Dict[str, Any]] = None
+
+
+    def _decode(self) -> Dict[str, Any]:
+        # one pass of the C decoder of bson, faster than reading the fields of the RawBSONDocument one by one
+        document = decode(self._raw.raw)
+        self.required_values(document)
+        self._document = document
+        return document
+
+
+    def __eq__(self, other: RawModel) -> bool:
+        return self.id == other.id  # type: ignore[attr-defined]
+
+
+    def __repr__(self) -> str:
+        attrs = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"{type(self).__name__}({attrs})"
+
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: The decoded fields of FIELDS.
+        """
+        document = self._document if self._document is not None else self._decode()
+        return {field: document.get(field) for field in self.FIELDS}
+
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[RawBSONDocument]) -> List[Any]:
+        """
+        Wrap the raw documents of a cursor, without decoding them.
+        """
+        return [cls(raw) for raw in documents]
+
+
+class RawProduct(RawModel):
+    """ A read only Product, with the fields of Product. """
+    __slots__ = ()
+
+    FIELDS          = Product.__slots__
+    required_values = staticmethod(Product._required_values)
+
+
+    def calculate_profit(self, quantity: int) -> float:
+        return Product.calculate_profit(self, quantity)  # type: ignore[arg-type]
+
+
+    def calculate_loss(self, quantity: int) -> float:
+        return Product.calculate_loss(self, quantity)  # type: ignore[arg-type]
+
+
+class RawProductSummary(RawModel):
+    """ A read only ProductSummary, with the fields of ProductSummary. """
+    __slots__ = ()
+
+    FIELDS          = ProductSummary.FIELDS
+    required_values = staticmethod(ProductSummary._required_values)
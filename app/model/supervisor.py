@@ -4,7 +4,7 @@ from app.model.employee import Employee
 
 
 class Supervisor(Employee):
-    role: str = "supervisor"
+    __slots__ = ()
 
 
     def __init__(
@@ -31,7 +31,7 @@ class Supervisor(Employee):
 
 
     def __repr__(self) -> str:
-        attrs = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        attrs = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
         return f"Supervisor({attrs})"
 
 
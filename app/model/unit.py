@@ -1,28 +1,41 @@
-from typing import Optional
+from __future__ import annotations  # for pyright typechecking
+from typing import Any, Iterable, List, Mapping, Optional
 import uuid
+from app.utils.document_utils import required_getter
 
 
 class Unit:
+    """ A storage unit, its attributes are slots like the ones of Product. """
+    __slots__ = ("id", "name", "volume", "occupied_volume")
+
+    # the attributes that cannot be None
+    REQUIRED_FIELDS = ("name", "volume")
+    _required_values = staticmethod(required_getter(REQUIRED_FIELDS))
+
     id: str
     name: str
     volume: float
+    occupied_volume: float
 
-    def __init__(self, id: Optional[str], name: str, volume: float):
-        self.id: str       = id if id is not None else str(uuid.uuid4())
-        self.name: str     = name
-        self.volume: float = volume
+    def __init__(self, id: Optional[str], name: str, volume: float, occupied_volume: float = 0):
+        self.id: str                = id if id is not None else str(uuid.uuid4())
+        self.name: str              = name
+        self.volume: float          = volume
+        # the volume taken up by all the products stored in the unit
+        self.occupied_volume: float = occupied_volume
 
 
     def __str__(self) -> str:
         return ", ".join(map(str, [
             self.id,
             self.name,
-            self.volume
+            self.volume,
+            self.occupied_volume
         ]))
 
 
     def __repr__(self) -> str:
-        attrs = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        attrs = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
         return f"Unit({attrs})"
 
 
@@ -34,14 +47,15 @@ class Unit:
             dict[str, Any]: A dictionary containing all attributes of the unit.
         """
         return {
-            "id":     self.id,
-            "name":   self.name,
-            "volume": self.volume
+            "id":              self.id,
+            "name":            self.name,
+            "volume":          self.volume,
+            "occupied_volume": self.occupied_volume
         }
 
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data) -> Unit:
         """
         Returns a Unit instance from a dictionary
 
@@ -53,6 +67,8 @@ class Unit:
             The following keys are required:
             - `name`
             - `volume`
+            The key `id` is optional and may be None.
+            The key `occupied_volume` is optional and defaults to 0.
 
         Returns:
             Unit: A Unit instance initialized with the given attributes
@@ -60,17 +76,21 @@ class Unit:
         Raises:
             ValueError: If any required attribute is missing or None.
         """
-        # id can be None so dont include it in the attr list
-        attributes = ["name", "volume"]
+        name, volume = cls._required_values(data)
 
-        for attr in attributes:
-            if data.get(attr) is None:
-                raise Exception(f"Attribute {attr} cannot be None")
+        return cls(data.get("id"), name, volume, data.get("occupied_volume") or 0)
 
-        unit = cls(
-            data.get("id"),
-            data.get("name"),
-            data.get("volume")
-        )
 
-        return unit 
+    @classmethod
+    def from_documents(cls, documents: Iterable[Mapping[str, Any]]) -> List[Unit]:
+        """
+        Create the Unit instances of a batch of documents in one pass, see Product.from_documents().
+
+        Raises:
+            ValueError: If any required attribute of a document is missing or None.
+        """
+        required_values = cls._required_values
+        return [
+            cls(data.get("id"), *required_values(data), data.get("occupied_volume") or 0)
+            for data in documents
+        ]
@@ -0,0 +1,133 @@
+from __future__ import annotations  # for pyright typechecking
+import math
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+
+# a product with fewer items than this is counted in `low_stock`
+LOW_STOCK_THRESHOLD = 10
+
+
+class UnitStats:
+    """
+    The totals of the products of a unit, one document of the `unit_stats` collection per unit.
+
+    The counters are not computed when they are read: every write of ProductRepository that
+    changes a product increments the counters of its unit (see UnitStats.change()),
+    so the dashboard of a unit reads them with one point read.
+    They are recomputed from the products by ProductService.reconcile_unit_stats().
+    """
+    __slots__ = ("unit_id", "products", "items", "stock_value", "unit_gain", "low_stock")
+
+    # the counters, every one but `unit_id`
+    COUNTERS = __slots__[1:]
+
+    unit_id: str
+    # the number of products of the unit
+    products: int
+    # the sum of their `quantity`
+    items: int
+    # the sum of their `quantity * purchase_price`
+    stock_value: float
+    # the sum of their `unit_gain`
+    unit_gain: float
+    # the number of products with less than LOW_STOCK_THRESHOLD items
+    low_stock: int
+
+    def __init__(
+        self,
+        unit_id: str,
+        products: int = 0,
+        items: int = 0,
+        stock_value: float = 0.0,
+        unit_gain: float = 0.0,
+        low_stock: int = 0
+    ):
+        self.unit_id: str       = unit_id
+        self.products: int      = products
+        self.items: int         = items
+        self.stock_value: float = stock_value
+        self.unit_gain: float   = unit_gain
+        self.low_stock: int     = low_stock
+
+
+    def __repr__(self) -> str:
+        attrs = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"UnitStats({attrs})"
+
+
+    def counters(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: The counters of COUNTERS.
+        """
+        return {counter: getattr(self, counter) for counter in self.COUNTERS}
+
+
+    def to_dict(self) -> dict:
+        return {"unit_id": self.unit_id, **self.counters()}
+
+
+    def matches(self, other: UnitStats) -> bool:
+        """
+        Returns:
+            bool: True if every counter of `other` is the same, the float ones up to
+                the rounding of the increments they were summed from.
+        """
+        return all(
+            math.isclose(getattr(self, counter), getattr(other, counter), rel_tol=1e-9, abs_tol=1e-6)
+            for counter in self.COUNTERS
+        )
+
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> UnitStats:
+        """
+        Returns a UnitStats instance from a dictionary.
+
+        Args:
+            data (Mapping[str, Any]): A `unit_stats` document. `unit_id` is required,
+                a missing counter is 0 (it was never incremented).
+
+        Raises:
+            ValueError: If `unit_id` is missing or None.
+        """
+        if data.get("unit_id") is None:
+            raise ValueError("Attribute unit_id cannot be None")
+
+        return cls(data["unit_id"], **{counter: data.get(counter) or 0 for counter in cls.COUNTERS})
+
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Mapping[str, Any]]) -> List[UnitStats]:
+        return [cls.from_dict(data) for data in documents]
+
+
+    @staticmethod
+    def change(
+        before_quantity: Optional[int], after_quantity: int, purchase_price: float, unit_gain: float
+    ) -> Dict[str, Any]:
+        """
+        The increments of the counters of a unit for a write on one of its products.
+
+        Args:
+            before_quantity (int | None): The `quantity` of the product before the write,
+                None if the write inserted the product.
+            after_quantity (int): The `quantity` of the product after the write.
+            purchase_price (float): The `purchase_price` of the product.
+            unit_gain (float): The amount added to the `unit_gain` of the product,
+                all of it if the product was inserted.
+
+        Returns:
+            Dict[str, Any]: The increment of every counter, for a $inc.
+        """
+        before = before_quantity or 0
+        return {
+            "products":    1 if before_quantity is None else 0,
+            "items":       after_quantity - before,
+            "stock_value": (after_quantity - before) * purchase_price,
+            "unit_gain":   unit_gain,
+            "low_stock":   (
+                int(after_quantity < LOW_STOCK_THRESHOLD)
+                - int(before_quantity is not None and before_quantity < LOW_STOCK_THRESHOLD)
+            ),
+        }
@@ -1,18 +1,33 @@
 from  __future__ import annotations # for pyright typechecking
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Type
 import uuid
 
 from app.types import UserOrSubclass
+from app.utils.document_utils import required_getter
 
 class User:
-    id: str                  = ""
-    name: str                = ""
-    surname: str             = ""
-    username: str            = ""
-    password: str            = ""
-    unit_id: str             = ""
-    unit_name: Optional[str] = None
-    role: str                = ""
+    """
+    A user of the application. The attributes are slots like the ones of Product,
+    the subclasses add no attributes and declare empty `__slots__`.
+    """
+    __slots__ = ("id", "name", "surname", "username", "password", "unit_id", "unit_name", "role")
+
+    # reads the attributes that cannot be None, the `unit_name` of a DB document may be missing
+    _required_values = staticmethod(
+        required_getter(("name", "surname", "username", "password", "unit_id", "unit_name"))
+    )
+    _required_persistence_values = staticmethod(
+        required_getter(("name", "surname", "username", "password", "unit_id"))
+    )
+
+    id: str
+    name: str
+    surname: str
+    username: str
+    password: str
+    unit_id: str
+    unit_name: Optional[str]
+    role: str
 
 
     def __init__(
@@ -111,9 +126,8 @@ class User:
         Raises:
             ValueError: If any required attribute is missing or None.
         """
-        # id can be None so dont include it in the attr list
-        required_attrs = ["name", "surname", "username", "password", "unit_id", "unit_name"]
-        return cls._from_dict(data, required_attrs)
+        # id can be None so it is not required
+        return cls._from_dict(data, cls._required_values)
 
 
     @classmethod
@@ -142,12 +156,41 @@ class User:
         Raises:
             ValueError: If any required attribute is missing or None.
         """
-        required_attrs = ["name", "surname", "username", "password", "unit_id"]
-        return cls._from_dict(data, required_attrs)
+        return cls._from_dict(data, cls._required_persistence_values)
 
 
     @classmethod
-    def _from_dict(cls: Type[UserOrSubclass], data: dict[str, Any], required_attrs: List[str]) -> UserOrSubclass:
+    def from_documents(cls: Type[UserOrSubclass], documents: Iterable[Mapping[str, Any]]) -> List[UserOrSubclass]:
+        """
+        Create the users of a batch of documents in one pass, validated like from_dict().
+        See Product.from_documents().
+
+        Raises:
+            ValueError: If any required attribute of a document is missing or None.
+        """
+        return [cls._from_dict(data, cls._required_values) for data in documents]
+
+
+    @classmethod
+    def from_persistence_documents(
+        cls: Type[UserOrSubclass], documents: Iterable[Mapping[str, Any]]
+    ) -> List[UserOrSubclass]:
+        """
+        Create the users of a batch of DB documents in one pass, validated like from_persistence_dict().
+        See Product.from_documents().
+
+        Raises:
+            ValueError: If any required attribute of a document is missing or None.
+        """
+        return [cls._from_dict(data, cls._required_persistence_values) for data in documents]
+
+
+    @classmethod
+    def _from_dict(
+        cls: Type[UserOrSubclass],
+        data: Mapping[str, Any],
+        required_values: Callable[[Mapping[str, Any]], Tuple[Any, ...]]
+    ) -> UserOrSubclass:
         """
         Returns an User instance from a dictionary
 
@@ -156,7 +199,8 @@ class User:
 
         Args:
             data (dict): Dictionary containing the user attributes.
-            require_attrs (List[str]): A list containing the names of all the required attributes.
+            required_values (Callable): Reads the required attributes of `data`,
+                see app.utils.document_utils.required_getter().
 
         Returns:
             User: An User instance initialized with the given attributes
@@ -164,9 +208,7 @@ class User:
         Raises:
             ValueError: If any required attribute is missing or None.
         """
-        for attr in required_attrs:
-            if data.get(attr) is None:
-                raise ValueError(f"Attribute {attr} cannot be None")
+        required_values(data)
 
         user = cls(
             id        = data.get("id"),
@@ -2,6 +2,7 @@ from pymongo.database import Collection
 from pymongo.results import InsertOneResult
 
 from app.model.admin import Admin
+from app.repositories.user_repository import USER_PROJECTION
 
 
 class AdminRepository:
@@ -10,16 +11,16 @@ class AdminRepository:
     def __init__(self, user_collection: Collection):
         self.user_collection = user_collection
 
-    def get_admin(self, username: str, password: str) -> Admin | None:
+    def get_admin_by_username(self, username: str) -> Admin | None:
         """
-        Retrieve an Admin instance from the DB using their credentials.
+        Retrieve an Admin instance from the DB by their username.
 
+        The password is not checked here, the `password` of the returned admin is the stored hash
+        (see PasswordHasher.verify()).
         Note that `unit_name` is not stored in the DB and it will be set to None.
 
         Args:
             username (str): The `username` of the admin.
-            password (str): The `password` of the admin.
-            unit_id (str): The `id` of the unit the admin is assigned to.
 
         Returns:
             Employee | None:
@@ -30,12 +31,13 @@ class AdminRepository:
             ValueError: If the Database record is missing required attributes
             (see User.from_persistence_dict() for details on the required attributes).
         """
+        # all admins have unit_id="" (see AdminService.insert_admin())
         query = {
             "username": username,
-            "password": password,
+            "unit_id": "",
             "role": "admin"
         }
-        result = self.user_collection.find_one(query)
+        result = self.user_collection.find_one(query, USER_PROJECTION)
 
         if result is None:
             return None
@@ -43,6 +45,26 @@ class AdminRepository:
         return Admin.from_persistence_dict(result)
 
 
+    def admin_exists(self, username: str) -> bool:
+        """
+        Check if the admin with `username` exists.
+
+        Only the `_id` of the admin is read from the database.
+
+        Args:
+            username (str): The `username` of the admin.
+
+        Returns:
+            bool: True if the admin exists, otherwise False.
+        """
+        query = {
+            "username": username,
+            "unit_id": "",
+            "role": "admin"
+        }
+        return self.user_collection.find_one(query, projection={"_id": 1}) is not None
+
+
 
     def insert_admin(self, admin: Admin) -> InsertOneResult:
         """
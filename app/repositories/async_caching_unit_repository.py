@@ -0,0 +1,41 @@
+from typing import Dict, Optional
+from app.model.unit import Unit
+from app.repositories.async_unit_repository import AsyncUnitRepository
+from app.utils.ttl_cache import TTLCache
+
+
+class AsyncCachingUnitRepository(AsyncUnitRepository):
+    """
+    An AsyncUnitRepository that keeps the units read by id in a process local TTLCache,
+    like CachingUnitRepository.
+
+    The cache can be shared with the CachingUnitRepository of the same process.
+    """
+    unit_repository: AsyncUnitRepository
+    cache: TTLCache
+
+    def __init__(self, unit_repository: AsyncUnitRepository, cache: TTLCache):
+        super().__init__(unit_repository.unit_collection)
+        self.unit_repository: AsyncUnitRepository = unit_repository
+        self.cache: TTLCache                      = cache
+
+
+    async def get_unit_by_id(self, id: str) -> Optional[Unit]:
+        found, unit = self.cache.get(id)
+        if found:
+            return unit
+
+        unit = await self.unit_repository.get_unit_by_id(id)
+
+        if unit is not None:
+            self.cache.put(id, unit)
+
+        return unit
+
+
+    async def increment_occupied_volume(self, unit_id: str, volume: float) -> bool:
+        return await self.unit_repository.increment_occupied_volume(unit_id, volume)
+
+
+    def cache_stats(self) -> Dict[str, float]:
+        return self.cache.stats()
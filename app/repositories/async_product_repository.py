@@ -0,0 +1,292 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from pymongo import UpdateOne
+from pymongo.asynchronous.client_session import AsyncClientSession
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import InvalidOperation
+from app.model.page import Page
+from app.model.product import Product
+from app.model.product_summary import ProductSummary
+from app.model.raw_product import RAW_CODEC_OPTIONS, RawProduct, RawProductSummary
+from app.model.unit_stats import UnitStats
+from app.repositories.async_unit_stats_repository import AsyncUnitStatsRepository
+from app.repositories.product_repository import ProductRepository
+from app.utils.pagination_utils import DEFAULT_PAGE_SIZE
+
+
+T = TypeVar("T")
+
+
+class AsyncProductRepository:
+    """
+    The asyncio version of the reads and the sales of ProductRepository, on an AsyncMongoClient.
+
+    The queries are built by the same ProductRepository methods, so both repositories
+    send the same commands and use the same indexes. See the ProductRepository method
+    of the same name for the details of each method.
+    """
+    product_collection: AsyncCollection
+    # serves the product listings, see ProductRepository.read_product_collection
+    read_product_collection: AsyncCollection
+    # see ProductRepository.raw_listings
+    raw_listings: bool
+    # see ProductRepository.unit_stats_repository and stats_transactions
+    unit_stats_repository: Optional[AsyncUnitStatsRepository]
+    stats_transactions: bool
+    # see ProductRepository.client_bulk_write
+    client_bulk_write: bool
+
+    def __init__(
+        self,
+        product_collection: AsyncCollection,
+        read_product_collection: Optional[AsyncCollection] = None,
+        raw_listings: bool = False,
+        unit_stats_repository: Optional[AsyncUnitStatsRepository] = None,
+        stats_transactions: bool = False
+    ):
+        self.product_collection      = product_collection
+        self.read_product_collection = (
+            read_product_collection if read_product_collection is not None else product_collection
+        )
+        self.raw_listings = raw_listings
+        if raw_listings:
+            self.read_product_collection = self.read_product_collection.with_options(codec_options=RAW_CODEC_OPTIONS)
+
+        self.unit_stats_repository = unit_stats_repository
+        self.stats_transactions    = stats_transactions
+        self.client_bulk_write     = True
+
+
+    async def _write_with_stats(self, write: Callable[[Optional[AsyncClientSession]], Awaitable[T]]) -> T:
+        """
+        Run `write`, in a transaction if `stats_transactions` is True, see ProductRepository._write_with_stats().
+        """
+        if self.unit_stats_repository is None or not self.stats_transactions:
+            return await write(None)
+
+        async with self.product_collection.database.client.start_session() as session:
+            return await session.with_transaction(write)
+
+
+    async def _increment_stats(
+        self, changes: Dict[str, Dict[str, Any]], session: Optional[AsyncClientSession]
+    ) -> None:
+        if self.unit_stats_repository is not None:
+            await self.unit_stats_repository.increment(changes, session)
+
+
+    async def get_product_by_id(self, id: str, unit_id: Optional[str] = None) -> Product | None:
+        """
+        Get a Product instance from the DB by ID, see ProductRepository.get_product_by_id().
+        """
+        query = {"id": id}
+        if unit_id is not None:
+            query["unit_id"] = unit_id
+        result = await self.product_collection.find_one(query)
+
+        if result is None:
+            return None
+
+        return Product.from_dict(result)
+
+
+    async def _find_page(
+        self,
+        query: dict,
+        sort_field: str,
+        descending: bool,
+        page_size: int,
+        page_token: Optional[str],
+        summary: bool = False
+    ) -> Page:
+        """
+        Find one page of the products matching `query`, see ProductRepository._find_page().
+        """
+        page_query, sort = ProductRepository._build_page_query(query, sort_field, descending, page_token)
+
+        # read one extra product to find out if there is a next page
+        projection = ProductSummary.projection() if summary else None
+        if self.raw_listings:
+            from_documents = RawProductSummary.from_documents if summary else RawProduct.from_documents
+        else:
+            from_documents = ProductSummary.from_documents if summary else Product.from_documents
+
+        cursor    = self.read_product_collection.find(page_query, projection).sort(sort).limit(page_size + 1)
+        documents = await cursor.to_list()
+
+        return ProductRepository._to_page(from_documents(documents), sort_field, page_size)
+
+
+    async def get_products(
+        self, page_size: int = DEFAULT_PAGE_SIZE, page_token: Optional[str] = None, summary: bool = False
+    ) -> Page:
+        return await self._find_page({}, "name", False, page_size, page_token, summary)
+
+
+    async def get_products_from_unit(
+        self,
+        unit_id: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_token: Optional[str] = None,
+        summary: bool = False
+    ) -> Page:
+        return await self._find_page({"unit_id": unit_id}, "name", False, page_size, page_token, summary)
+
+
+    async def search_products(
+        self,
+        order_field: Optional[str],
+        order_type: Optional[str],
+        name: Optional[str],
+        id: Optional[str],
+        min_quantity: Optional[int],
+        max_quantity: Optional[int],
+        unit_id: Optional[str],
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_token: Optional[str] = None,
+        summary: bool = False
+    ) -> Page:
+        return await self._find_page(
+            ProductRepository._build_search_query(name, id, min_quantity, max_quantity, unit_id),
+            order_field or "name", order_type == "descending", page_size, page_token, summary
+        )
+
+
+    async def _sell_product(
+        self, product_id: str, unit_id: Optional[str], sell_quantity: int, profit: Optional[float]
+    ) -> Optional[Product]:
+        """
+        Sell a product with a guarded update, see ProductRepository._sell_product().
+        """
+        async def write(session: Optional[AsyncClientSession]) -> Optional[Product]:
+            sell_result = await self.product_collection.find_one_and_update(
+                ProductRepository._build_sell_filter(product_id, unit_id, sell_quantity),
+                ProductRepository._build_sell_update(sell_quantity, profit),
+                return_document=True,
+                session=session,
+            )
+
+            if sell_result is None:
+                return None
+
+            product = Product.from_dict(sell_result)
+            await self._increment_stats({product.unit_id: UnitStats.change(
+                product.quantity + sell_quantity,
+                product.quantity,
+                product.purchase_price,
+                profit if profit is not None else product.calculate_profit(sell_quantity),
+            )}, session)
+            return product
+
+        return await self._write_with_stats(write)
+
+
+    async def sell_product(self, product_id: str, sell_quantity: int, profit: Optional[float] = None) -> Optional[Product]:
+        return await self._sell_product(product_id, None, sell_quantity, profit)
+
+
+    async def sell_products_from_unit(
+        self, product_id: str, sell_quantity: int, profit: Optional[float], unit_id: str
+    ) -> Optional[Product]:
+        return await self._sell_product(product_id, unit_id, sell_quantity, profit)
+
+
+    async def sell_products(
+        self,
+        lines: List[Tuple[str, int]],
+        unit_id: Optional[str] = None,
+        all_or_nothing: bool = False
+    ) -> List[bool]:
+        """
+        Sell many products with a single bulk write, see ProductRepository.sell_products().
+        """
+        if not lines:
+            return []
+
+        client    = self.product_collection.database.client
+        namespace = self.product_collection.full_name
+        updates   = [
+            (
+                ProductRepository._build_sell_filter(product_id, unit_id, sell_quantity),
+                ProductRepository._build_sell_update(sell_quantity, None),
+            )
+            for product_id, sell_quantity in lines
+        ]
+        models    = [UpdateOne(filter, update, namespace=namespace) for filter, update in updates]
+
+        async def _write(session=None) -> List[bool]:
+            products: Dict[str, dict] = {}
+            if self.unit_stats_repository is not None:
+                cursor   = self.product_collection.find(
+                    {"id": {"$in": list(dict.fromkeys(product_id for product_id, _ in lines))}},
+                    projection=ProductRepository._STATS_INFO_PROJECTION,
+                    session=session,
+                )
+                products = {product["id"]: product for product in await cursor.to_list()}
+
+            applied = await self._client_bulk_write(client, models, session)
+            if applied is None:
+                applied = [
+                    (await self.product_collection.update_one(filter, update, session=session)).matched_count == 1
+                    for filter, update in updates
+                ]
+            await self._increment_stats(ProductRepository._sold_changes(lines, applied, products), session)
+
+            return applied
+
+        if not all_or_nothing:
+            return await self._write_with_stats(_write)
+
+        async def _write_all_or_nothing(session) -> List[bool]:
+            applied = await _write(session)
+            if not all(applied):
+                # with_transaction() returns without committing if the transaction is aborted
+                await session.abort_transaction()
+                return [False] * len(applied)
+            return applied
+
+        async with client.start_session() as session:
+            return await session.with_transaction(_write_all_or_nothing)
+
+
+    async def _client_bulk_write(
+        self, client: Any, models: List[UpdateOne], session: Optional[AsyncClientSession]
+    ) -> Optional[List[bool]]:
+        """
+        Run `models` with AsyncMongoClient.bulk_write(), see ProductRepository._client_bulk_write().
+        """
+        if not self.client_bulk_write:
+            return None
+
+        try:
+            result = await client.bulk_write(
+                models, session=session, ordered=session is not None, verbose_results=True
+            )
+        except InvalidOperation:
+            self.client_bulk_write = False
+            return None
+
+        return [
+            i in result.update_results and result.update_results[i].matched_count == 1
+            for i in range(len(models))
+        ]
+
+
+    async def get_storage_info_by_ids(self, product_ids: List[str], unit_id: Optional[str] = None) -> List[dict]:
+        query: dict = {"id": {"$in": list(product_ids)}}
+        if unit_id is not None:
+            query["unit_id"] = unit_id
+
+        cursor = self.product_collection.find(
+            query,
+            projection={
+                "_id": 0, "id": 1, "unit_id": 1, "quantity": 1, "volume": 1, "purchase_price": 1
+            }
+        )
+        return await cursor.to_list()
+
+
+    async def product_exists(self, product_id: str, unit_id: Optional[str] = None) -> bool:
+        query = {"id": product_id}
+        if unit_id is not None:
+            query["unit_id"] = unit_id
+        return await self.product_collection.find_one(query, projection={"_id": 1}) is not None
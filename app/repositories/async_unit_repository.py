@@ -0,0 +1,36 @@
+from pymongo.asynchronous.collection import AsyncCollection
+from app.model.unit import Unit
+
+
+class AsyncUnitRepository:
+    """
+    The asyncio version of the unit lookups and volume updates of UnitRepository, on an AsyncMongoClient.
+    """
+    unit_collection: AsyncCollection
+
+    def __init__(self, unit_collection: AsyncCollection):
+        self.unit_collection = unit_collection
+
+
+    async def get_unit_by_id(self, id: str) -> Unit | None:
+        """
+        Get a Unit instance from the DB by ID, see UnitRepository.get_unit_by_id().
+        """
+        result = await self.unit_collection.find_one({"id": id})
+
+        if result is None:
+            return None
+
+        return Unit.from_dict(result)
+
+
+    async def increment_occupied_volume(self, unit_id: str, volume: float) -> bool:
+        """
+        Increases the `occupied_volume` of the unit, see UnitRepository.increment_occupied_volume().
+        """
+        result = await self.unit_collection.update_one(
+            # a unit without `occupied_volume` is left to UnitRepository.backfill_occupied_volume()
+            {"id": unit_id, "occupied_volume": {"$ne": None}},
+            {"$inc": {"occupied_volume": volume}}
+        )
+        return result.matched_count == 1
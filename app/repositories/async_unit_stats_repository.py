@@ -0,0 +1,33 @@
+from typing import Any, Dict, Optional
+from pymongo import UpdateOne
+from pymongo.asynchronous.client_session import AsyncClientSession
+from pymongo.asynchronous.collection import AsyncCollection
+
+
+class AsyncUnitStatsRepository:
+    """
+    The asyncio version of the increments of UnitStatsRepository, on an AsyncMongoClient.
+    """
+    unit_stats_collection: AsyncCollection
+
+    def __init__(self, unit_stats_collection: AsyncCollection):
+        self.unit_stats_collection = unit_stats_collection
+
+
+    async def increment(
+        self, changes: Dict[str, Dict[str, Any]], session: Optional[AsyncClientSession] = None
+    ) -> None:
+        """
+        Increment the counters of many units, see UnitStatsRepository.increment().
+        """
+        if not changes:
+            return
+
+        await self.unit_stats_collection.bulk_write(
+            [
+                UpdateOne({"unit_id": unit_id}, {"$inc": change}, upsert=True)
+                for unit_id, change in changes.items()
+            ],
+            ordered=False,
+            session=session,
+        )
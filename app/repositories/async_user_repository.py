@@ -0,0 +1,57 @@
+from typing import Optional
+from pymongo.asynchronous.collection import AsyncCollection
+from app.model.user import User
+from app.repositories.user_repository import UserRepository
+
+
+class AsyncUserRepository:
+    """
+    The asyncio version of the reads of a login and of a request of UserRepository, on an AsyncMongoClient.
+
+    See the UserRepository method of the same name for the details of each method.
+    """
+    user_collection: AsyncCollection
+    unit_collection_name: str
+
+    def __init__(self, user_collection: AsyncCollection, unit_collection_name: str = "units") -> None:
+        self.user_collection      = user_collection
+        # the collection joined to find the `unit_name` of a user
+        self.unit_collection_name = unit_collection_name
+
+
+    async def get_user_with_unit_name(self, id: str) -> User | None:
+        result = await self._find_one_with_unit_name({"id": id})
+
+        if result is None:
+            return None
+
+        return User.from_persistence_dict(result)
+
+
+    async def get_user_by_username(self, username: str, unit_id: Optional[str]) -> User | None:
+        # users that are not assigned to any unit are stored with unit_id=""
+        result = await self._find_one_with_unit_name({
+            "username": username,
+            "unit_id":  unit_id if unit_id is not None else "",
+        })
+
+        if result is None:
+            return None
+
+        return User.from_persistence_dict(result)
+
+
+    async def _find_one_with_unit_name(self, query: dict) -> Optional[dict]:
+        cursor    = await self.user_collection.aggregate(
+            UserRepository._build_unit_name_pipeline(query, self.unit_collection_name)
+        )
+        documents = await cursor.to_list(1)
+        return documents[0] if documents else None
+
+
+    async def update_password_hash(self, id: str, old_hash: str, new_hash: str) -> bool:
+        result = await self.user_collection.update_one(
+            {"id": id, "password": old_hash},
+            {"$set": {"password": new_hash}}
+        )
+        return result.modified_count == 1
@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional
+from pymongo.results import InsertManyResult, InsertOneResult
+from app.model.unit import Unit
+from app.repositories.unit_repository import UnitRepository
+from app.utils.ttl_cache import TTLCache
+
+
+class CachingUnitRepository(UnitRepository):
+    """
+    A UnitRepository that keeps the units read by id in a process local TTLCache.
+
+    Units are looked up on almost every request but are rarely created or changed,
+    so most lookups are served without a round trip to the database.
+
+    Only get_unit_by_id() is cached, the other reads and every write go to `unit_repository`.
+    The `occupied_volume` of a cached unit may be up to `ttl` seconds old,
+    the free space of a unit is always checked in the database by reserve_volume().
+    """
+    unit_repository: UnitRepository
+    cache: TTLCache
+
+    def __init__(self, unit_repository: UnitRepository, max_size: int = 1024, ttl: float = 60.0):
+        super().__init__(unit_repository.unit_collection)
+        self.unit_repository: UnitRepository = unit_repository
+        self.cache: TTLCache                 = TTLCache(max_size, ttl)
+
+
+    def get_all_units(self) -> List[Unit]:
+        return self.unit_repository.get_all_units()
+
+
+    def get_all_units_ids(self) -> List[str]:
+        return self.unit_repository.get_all_units_ids()
+
+
+    def get_unit_by_id(self, id: str) -> Optional[Unit]:
+        """
+        Get a Unit instance by ID, from the cache if possible.
+
+        Missing units are not cached, so a unit is found as soon as it is inserted.
+        See UnitRepository.get_unit_by_id().
+        """
+        found, unit = self.cache.get(id)
+        if found:
+            return unit
+
+        unit = self.unit_repository.get_unit_by_id(id)
+
+        if unit is not None:
+            self.cache.put(id, unit)
+
+        return unit
+
+
+    def increment_occupied_volume(self, unit_id: str, volume: float) -> bool:
+        return self.unit_repository.increment_occupied_volume(unit_id, volume)
+
+
+    def reserve_volume(self, unit_id: str, volume: float) -> bool:
+        return self.unit_repository.reserve_volume(unit_id, volume)
+
+
+    def set_occupied_volume(self, unit_id: str, occupied_volume: float) -> bool:
+        result = self.unit_repository.set_occupied_volume(unit_id, occupied_volume)
+        self.cache.invalidate(unit_id)
+        return result
+
+
+    def get_unit_ids_without_occupied_volume(self) -> List[str]:
+        return self.unit_repository.get_unit_ids_without_occupied_volume()
+
+
+    def backfill_occupied_volume(self, unit_id: str, occupied_volume: float) -> bool:
+        result = self.unit_repository.backfill_occupied_volume(unit_id, occupied_volume)
+        self.cache.invalidate(unit_id)
+        return result
+
+
+    def insert_unit(self, unit: Unit) -> InsertOneResult:
+        # drop the cached unit even if the insertion fails,
+        # the stored unit is then read again on the next lookup
+        try:
+            return self.unit_repository.insert_unit(unit)
+        finally:
+            self.cache.invalidate(unit.id)
+
+
+    def insert_units(self, units: List[Unit], ordered: bool = True) -> InsertManyResult:
+        try:
+            return self.unit_repository.insert_units(units, ordered)
+        finally:
+            for unit in units:
+                self.cache.invalidate(unit.id)
+
+
+    def cache_stats(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: The hits, misses, hit rate and size of the cache (see TTLCache.stats()).
+        """
+        return self.cache.stats()
@@ -2,6 +2,7 @@ from typing import List, Optional
 from pymongo.database import Collection
 from pymongo.results import DeleteResult, InsertManyResult, InsertOneResult
 from app.model.employee import Employee
+from app.repositories.user_repository import USER_PROJECTION
 
 
 """
@@ -40,22 +41,23 @@ class EmployeeRepository:
         return Employee.from_persistence_dict(result)
 
 
-    def get_employee(self, username: str, password: str, unit_id: str) -> Optional[Employee]:
+    def get_employee_by_username(self, username: str, unit_id: str) -> Optional[Employee]:
         """
-        Retrieve an Employee instance from the DB using their credentials.
+        Retrieve an Employee instance from the DB by their username.
 
+        The password is not checked here, the `password` of the returned employee is the stored hash
+        (see PasswordHasher.verify()).
         Note that `unit_name` is not stored in the DB and it will be set to None.
 
         Args:
             username (str): The `username` of the employee.
-            password (str): The `password` of the employee.
             unit_id (str): The `id` of the unit the employee is assigned to.
 
         Returns:
             Employee | None:
             - An Employee object if found.
               Note that `unit_name` is not stored in the database.
-            - None if no employee with the given credentials exists.
+            - None if no employee with the given username exists in the unit.
 
         Raises:
             ValueError: If the Database record is missing required attributes
@@ -64,12 +66,11 @@ class EmployeeRepository:
 
         query = {
             "username": username,
-            "password": password,
             "unit_id":  unit_id,
             "role":     "employee"
         }
 
-        result = self.user_collection.find_one(query)
+        result = self.user_collection.find_one(query, USER_PROJECTION)
 
         if result is None:
             return None
@@ -102,7 +103,7 @@ class EmployeeRepository:
         if cursor is None:
             return []
 
-        return [Employee.from_persistence_dict(e) for e in cursor]
+        return Employee.from_persistence_documents(cursor)
 
 
     def insert_employee(self, employee: Employee) -> InsertOneResult:
@@ -121,7 +122,7 @@ class EmployeeRepository:
         return self.user_collection.insert_one(employee.to_percistance_dict())
 
 
-    def insert_employees(self, employees: List[Employee]) -> InsertManyResult:
+    def insert_employees(self, employees: List[Employee], ordered: bool = True) -> InsertManyResult:
         """
         Inserts employees to the database.
 
@@ -130,11 +131,13 @@ class EmployeeRepository:
 
         Args:
             employees (List[Employee]): A list with the employees to insert.
+            ordered (bool): If False the documents are inserted in any order and the insertion
+                continues after a failed document (see Collection.insert_many()).
 
         Returns:
             pymongo.results.InsertManyResult: The result of the insertion.
         """
-        return self.user_collection.insert_many([e.to_percistance_dict() for e in employees])
+        return self.user_collection.insert_many([e.to_percistance_dict() for e in employees], ordered=ordered)
 
 
     def delete_employee_by_id(self, employee_id: str, unit_id: Optional[str] = None) -> DeleteResult:
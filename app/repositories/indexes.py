@@ -0,0 +1,282 @@
+from typing import Any, Dict, Iterator, List, Optional
+from pymongo import ASCENDING, IndexModel
+from pymongo.database import Database
+
+
+"""
+Every index of the application, by collection.
+
+Each index is listed next to the repository queries it serves,
+so that a new query shape comes with its index.
+"""
+INDEXES: Dict[str, List[IndexModel]] = {
+    "units": [
+        # UnitRepository.get_unit_by_id(), reserve_volume(), increment_occupied_volume()
+        IndexModel([("id", ASCENDING)], unique=True),
+    ],
+    "products": [
+        # ProductRepository.get_product_by_id(), buy_product(), _sell_product(),
+        # product_exists(), get_storage_info_by_ids(). The unique `id` is always the
+        # leading filter, `unit_id` and the quantity guard are checked on the single match.
+        IndexModel([("id", ASCENDING)], unique=True),
+        # ProductRepository.get_products_from_unit(), stream_products(), get_snapshot() and search_products()
+        # filtering on `unit_id` (and `name`) and paging by (`name`, `id`), and unit_has_products().
+        # Also the $match of the ReportRepository pipelines of one unit.
+        IndexModel([("unit_id", ASCENDING), ("name", ASCENDING), ("id", ASCENDING)]),
+        # ProductRepository.search_products() filtering on `unit_id` and a quantity range
+        # and paging by (`quantity`, `id`)
+        IndexModel([("unit_id", ASCENDING), ("quantity", ASCENDING), ("id", ASCENDING)]),
+        # ProductRepository.get_products() and search_products() by `name` across all units,
+        # paging by (`name`, `id`)
+        IndexModel([("name", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "users": [
+        # UserRepository.get_user_by_id(), get_user_with_unit_name(), change_password(),
+        # update_password_hash() and the *_by_id methods of
+        # the Employee and Supervisor repositories
+        IndexModel([("id", ASCENDING)], unique=True),
+        # login: UserRepository.get_user_by_username(), EmployeeRepository.get_employee_by_username(),
+        # SupervisorRepository.get_supervisor_by_username(), AdminRepository.get_admin_by_username()
+        # and AdminRepository.admin_exists()
+        IndexModel([("username", ASCENDING), ("unit_id", ASCENDING)], unique=True),
+        # EmployeeRepository.get_employees_in_unit()
+        IndexModel([("unit_id", ASCENDING), ("role", ASCENDING)]),
+    ],
+    "unit_stats": [
+        # UnitStatsRepository.get_unit_stats(), the $inc upserts of increment() and set_unit_stats().
+        # Unique, so that two concurrent first increments of a unit do not upsert two documents.
+        IndexModel([("unit_id", ASCENDING)], unique=True),
+    ],
+}
+
+
+def create_indexes(db: Database) -> Dict[str, List[str]]:
+    """
+    Create every index of INDEXES.
+
+    Creating an index that already exists with the same options is a no-op,
+    so this is safe to run on every startup.
+
+    Args:
+        db (Database): The database of the application.
+
+    Returns:
+        Dict[str, List[str]]: The names of the indexes of each collection.
+    """
+    return {
+        collection: db[collection].create_indexes(indexes)
+        for collection, indexes in INDEXES.items()
+    }
+
+
+#####################################################################################################
+# Query plan verification
+
+class _RecordedQuery:
+    collection: str
+    command: dict
+
+    def __init__(self, collection: str, command: dict, caller: str):
+        self.collection = collection
+        self.command    = command
+        self.caller     = caller
+
+
+class _RecordingCursor:
+    """ An empty cursor that records the sort applied to it. """
+
+    def __init__(self, command: dict):
+        self.command = command
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> "_RecordingCursor":
+        if isinstance(key_or_list, str):
+            key_or_list = [(key_or_list, direction or ASCENDING)]
+        self.command["sort"] = dict(key_or_list)
+        return self
+
+    def skip(self, skip: int) -> "_RecordingCursor":
+        self.command["skip"] = skip
+        return self
+
+    def limit(self, limit: int) -> "_RecordingCursor":
+        self.command["limit"] = limit
+        return self
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(())
+
+    def close(self) -> None:
+        pass
+
+
+class _NoMatch:
+    matched_count  = 0
+    modified_count = 0
+    acknowledged   = True
+
+
+class _RecordingCollection:
+    """
+    A collection that records the filters of the queries sent to it and matches nothing.
+
+    The repositories are run against it to collect the query shapes they actually issue.
+    """
+
+    def __init__(self, name: str, queries: List[_RecordedQuery]):
+        self.name     = name
+        self._queries = queries
+        self._caller  = ""
+
+    def _record(self, filter: Optional[dict], projection: Any = None) -> dict:
+        command: dict = {"find": self.name, "filter": dict(filter or {})}
+        if isinstance(projection, dict):
+            command["projection"] = projection
+        self._queries.append(_RecordedQuery(self.name, command, self._caller))
+        return command
+
+    def find(self, filter: Optional[dict] = None, projection: Any = None, **kwargs) -> _RecordingCursor:
+        command = self._record(filter, projection)
+        if kwargs.get("sort"):
+            command["sort"] = dict(kwargs["sort"])
+        return _RecordingCursor(command)
+
+    def find_one(self, filter: Optional[dict] = None, projection: Any = None, **kwargs) -> None:
+        self._record(filter, projection)["limit"] = 1
+        return None
+
+    def find_one_and_update(self, filter: dict, update: Any, **kwargs) -> None:
+        self._record(filter)["limit"] = 1
+        return None
+
+    def update_one(self, filter: dict, update: Any, **kwargs) -> _NoMatch:
+        self._record(filter)["limit"] = 1
+        return _NoMatch()
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> Iterator[dict]:
+        # pipelines that do not start with a $match read the whole collection on purpose
+        if pipeline and "$match" in pipeline[0]:
+            self._queries.append(_RecordedQuery(
+                self.name, {"aggregate": self.name, "pipeline": pipeline, "cursor": {}}, self._caller
+            ))
+        return iter(())
+
+
+def _record_repository_queries() -> List[_RecordedQuery]:
+    """
+    Run the read paths of every repository against recording collections.
+
+    Returns:
+        List[_RecordedQuery]: The queries the repositories sent, with the method that sent them.
+    """
+    # imported here to keep the index registry free of import cycles
+    from app.repositories.admin_repository import AdminRepository
+    from app.repositories.employee_repository import EmployeeRepository
+    from app.repositories.product_repository import ProductRepository
+    from app.repositories.report_repository import ReportRepository
+    from app.repositories.supervisor_repository import SupervisorRepository
+    from app.repositories.unit_repository import UnitRepository
+    from app.repositories.unit_stats_repository import UnitStatsRepository
+    from app.repositories.user_repository import UserRepository
+    from app.utils.pagination_utils import encode_page_token
+
+    queries: List[_RecordedQuery] = []
+    units    = _RecordingCollection("units", queries)
+    products = _RecordingCollection("products", queries)
+    users    = _RecordingCollection("users", queries)
+    stats    = _RecordingCollection("unit_stats", queries)
+
+    prd_repo = ProductRepository(products)  # type: ignore[arg-type]
+    unt_repo = UnitRepository(units)  # type: ignore[arg-type]
+    usr_repo = UserRepository(users)  # type: ignore[arg-type]
+    emp_repo = EmployeeRepository(users)  # type: ignore[arg-type]
+    sup_repo = SupervisorRepository(users)  # type: ignore[arg-type]
+    adm_repo = AdminRepository(users)  # type: ignore[arg-type]
+    rpt_repo = ReportRepository(products)  # type: ignore[arg-type]
+    ust_repo = UnitStatsRepository(stats)  # type: ignore[arg-type]
+
+    calls = {
+        "UnitRepository.get_unit_by_id":                    lambda: unt_repo.get_unit_by_id("u"),
+        "UnitRepository.reserve_volume":                    lambda: unt_repo.reserve_volume("u", 1),
+        "UnitRepository.increment_occupied_volume":         lambda: unt_repo.increment_occupied_volume("u", 1),
+        "ProductRepository.get_product_by_id":              lambda: prd_repo.get_product_by_id("p"),
+        "ProductRepository.get_product_by_id(unit)":        lambda: prd_repo.get_product_by_id("p", "u"),
+        "ProductRepository.get_products":                   lambda: prd_repo.get_products(10, encode_page_token("n", "p")),
+        "ProductRepository.get_products_from_unit":         lambda: prd_repo.get_products_from_unit("u"),
+        "ProductRepository.get_products_from_unit(page)":   lambda: prd_repo.get_products_from_unit("u", 10, encode_page_token("n", "p")),
+        "ProductRepository.stream_products":                lambda: list(prd_repo.stream_products("u")),
+        "ProductRepository.get_snapshot":                   lambda: prd_repo.get_snapshot("u"),
+        "ProductRepository.sell_product":                   lambda: prd_repo.sell_product("p", 1),
+        "ProductRepository.sell_products_from_unit":        lambda: prd_repo.sell_products_from_unit("p", 1, None, "u"),
+        "ProductRepository.product_exists":                 lambda: prd_repo.product_exists("p", "u"),
+        "ProductRepository.unit_has_products":              lambda: prd_repo.unit_has_products("u"),
+        "ProductRepository.get_storage_info_by_ids":        lambda: prd_repo.get_storage_info_by_ids(["p"], "u"),
+        "ProductRepository.search_products(name)":          lambda: prd_repo.search_products(None, None, "n", None, None, None, "u"),
+        "ProductRepository.search_products(id)":            lambda: prd_repo.search_products(None, None, None, "p", None, None, "u"),
+        "ProductRepository.search_products(sort name)":     lambda: prd_repo.search_products("name", "descending", None, None, None, None, "u"),
+        "ProductRepository.search_products(quantity)":      lambda: prd_repo.search_products("quantity", None, None, None, 1, 5, "u"),
+        "ProductRepository.search_products(quantity page)": lambda: prd_repo.search_products(
+            "quantity", "descending", None, None, 1, 5, "u", 10, encode_page_token(3, "p")
+        ),
+        "ProductRepository.search_products(all units)":     lambda: prd_repo.search_products("name", None, "n", None, None, None, None),
+        "ReportRepository.get_gain_by_unit":                lambda: rpt_repo.get_gain_by_unit("u"),
+        "ReportRepository.get_margin_by_category":          lambda: rpt_repo.get_margin_by_category("u"),
+        "ReportRepository.get_top_sellers":                 lambda: rpt_repo.get_top_sellers(10, "u"),
+        "ReportRepository.get_stock_value_by_unit":         lambda: rpt_repo.get_stock_value_by_unit("u"),
+        "UnitStatsRepository.get_unit_stats":               lambda: ust_repo.get_unit_stats("u"),
+        "UserRepository.get_user_by_id":                    lambda: usr_repo.get_user_by_id("x"),
+        "UserRepository.update_password_hash":              lambda: usr_repo.update_password_hash("x", "h", "h2"),
+        "UserRepository.get_user_with_unit_name":           lambda: usr_repo.get_user_with_unit_name("x"),
+        "UserRepository.get_user_by_username":              lambda: usr_repo.get_user_by_username("n", "u"),
+        "EmployeeRepository.get_employee_by_id":            lambda: emp_repo.get_employee_by_id("x"),
+        "EmployeeRepository.get_employee_by_username":      lambda: emp_repo.get_employee_by_username("n", "u"),
+        "EmployeeRepository.get_employees_in_unit":         lambda: emp_repo.get_employees_in_unit("u"),
+        "SupervisorRepository.get_supervisor_by_id":        lambda: sup_repo.get_supervisor_by_id("x"),
+        "SupervisorRepository.get_supervisor_by_username":  lambda: sup_repo.get_supervisor_by_username("n", "u"),
+        "AdminRepository.get_admin_by_username":            lambda: adm_repo.get_admin_by_username("n"),
+        "AdminRepository.admin_exists":                     lambda: adm_repo.admin_exists("n"),
+    }
+
+    for caller, call in calls.items():
+        for collection in (units, products, users, stats):
+            collection._caller = caller
+        call()
+
+    return queries
+
+
+def _plan_stages(plan: dict) -> Iterator[str]:
+    yield plan.get("stage", "")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+def find_collection_scans(db: Database) -> List[str]:
+    """
+    Explain every query the repositories issue and report the ones that scan a whole collection.
+
+    The queries are collected by running the repositories against recording collections
+    (see _record_repository_queries()) and are then explained on `db`,
+    so the indexes of INDEXES must already exist in `db`.
+
+    Args:
+        db (Database): The database of the application.
+
+    Returns:
+        List[str]: A description of every query whose winning plan has a COLLSCAN stage.
+            The list is empty if every query uses an index.
+    """
+    collection_scans: List[str] = []
+
+    for query in _record_repository_queries():
+        explanation = db.command({"explain": query.command, "verbosity": "queryPlanner"})
+
+        # aggregations nest the find plan inside their first stage
+        planner = explanation.get("queryPlanner") or explanation["stages"][0]["$cursor"]["queryPlanner"]
+
+        if "COLLSCAN" in _plan_stages(planner["winningPlan"]):
+            collection_scans.append(f"{query.caller} on {query.collection}: {query.command}")
+
+    return collection_scans
@@ -1,15 +1,141 @@
-from typing import List, Literal, Optional
-from pymongo import ASCENDING, DESCENDING
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Tuple, TypeVar
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.client_session import ClientSession
 from pymongo.database import Collection
-from pymongo.results import InsertManyResult, InsertOneResult
+from pymongo.errors import BulkWriteError, InvalidOperation
+from pymongo.results import BulkWriteResult, InsertManyResult, InsertOneResult
+from app.model.page import Page
 from app.model.product import Product
+from app.model.product_snapshot import ProductSnapshot
+from app.model.product_summary import ProductSummary
+from app.model.raw_product import RAW_CODEC_OPTIONS, RawProduct, RawProductSummary
+from app.model.unit_stats import LOW_STOCK_THRESHOLD, UnitStats
+from app.repositories.unit_stats_repository import UnitStatsRepository
+from app.utils.pagination_utils import DEFAULT_PAGE_SIZE, decode_page_token, encode_page_token
+
+
+T = TypeVar("T")
 
 
 class ProductRepository:
     product_collection: Collection
+    # serves the product listings, see ProductRepository._find_page()
+    read_product_collection: Collection
+    # read_product_collection decoded to dicts even with `raw_listings`, for get_snapshot()
+    snapshot_collection: Collection
+    # the listings are read only RawProduct and RawProductSummary instances
+    raw_listings: bool
+    # the counters of the units, incremented by every write of the products
+    unit_stats_repository: Optional[UnitStatsRepository]
+    # the products and the counters of their units are written in one transaction
+    stats_transactions: bool
+    # False once the server rejected MongoClient.bulk_write(), which needs MongoDB 8.0 or newer
+    client_bulk_write: bool
+
+    # the fields of the products that UnitStats.change() needs, read before a bulk write
+    _STATS_INFO_PROJECTION = {"_id": 0, "id": 1, "unit_id": 1, "quantity": 1, "purchase_price": 1, "selling_price": 1}
+
+    def __init__(
+        self,
+        product_collection: Collection,
+        read_product_collection: Optional[Collection] = None,
+        raw_listings: bool = False,
+        unit_stats_repository: Optional[UnitStatsRepository] = None,
+        stats_transactions: bool = False
+    ):
+        """
+        Args:
+            product_collection (Collection): The products, for the writes and the point reads.
+            read_product_collection (Collection | None): The products, read with the read preference
+                of the listings (e.g. from the secondaries of a replica set).
+                If None the listings are read from `product_collection`.
+            raw_listings (bool): If True the listings are read as RawBSONDocument and their products
+                are only decoded when a field is read (see app.model.raw_product).
+                Measured with benchmarks/raw_listings.py.
+            unit_stats_repository (UnitStatsRepository | None): If set, the inserts, purchases and sales
+                of products increment the counters of their units (see app.model.unit_stats).
+            stats_transactions (bool): If True a write of products and the increment of the counters
+                of their units run in one transaction (this requires a replica set).
+                Otherwise the counters are incremented right after the write, and a failure in between
+                leaves them behind until they are rebuilt (see ProductService.reconcile_unit_stats()).
+        """
+        self.product_collection      = product_collection
+        self.read_product_collection = (
+            read_product_collection if read_product_collection is not None else product_collection
+        )
+        self.snapshot_collection = self.read_product_collection
+        self.raw_listings        = raw_listings
+        if raw_listings:
+            self.read_product_collection = self.read_product_collection.with_options(codec_options=RAW_CODEC_OPTIONS)
+
+        self.unit_stats_repository = unit_stats_repository
+        self.stats_transactions    = stats_transactions
+        self.client_bulk_write     = True
+
+
+    def _write_with_stats(self, write: Callable[[Optional[ClientSession]], T]) -> T:
+        """
+        Run `write`, which writes products and increments the counters of their units
+        with the session it is given, in a transaction if `stats_transactions` is True.
+        """
+        if self.unit_stats_repository is None or not self.stats_transactions:
+            return write(None)
+
+        with self.product_collection.database.client.start_session() as session:
+            return session.with_transaction(write)
+
+
+    def _increment_stats(self, changes: Dict[str, Dict[str, Any]], session: Optional[ClientSession]) -> None:
+        if self.unit_stats_repository is not None:
+            self.unit_stats_repository.increment(changes, session)
+
+
+    def _get_stats_info(self, product_ids: List[str], session: Optional[ClientSession]) -> Dict[str, dict]:
+        """
+        Read the fields of the products that UnitStats.change() needs, before a bulk write,
+        which does not return the products it updates.
+
+        Returns:
+            Dict[str, dict]: The `unit_id`, `quantity`, `purchase_price` and `selling_price`
+                of every product found, by `id`. Nothing is read without a `unit_stats_repository`.
+        """
+        if self.unit_stats_repository is None:
+            return {}
+
+        cursor = self.product_collection.find(
+            {"id": {"$in": list(dict.fromkeys(product_ids))}}, projection=self._STATS_INFO_PROJECTION, session=session
+        )
+        return {product["id"]: product for product in cursor}
+
+
+    @staticmethod
+    def _sold_changes(
+        lines: List[Tuple[str, int]], applied: List[bool], products: Dict[str, dict]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        The increments of the counters of the units for the applied lines of ProductRepository.sell_products().
+
+        Args:
+            lines (List[Tuple[str, int]]): The lines of the sale.
+            applied (List[bool]): Whether each line was applied.
+            products (Dict[str, dict]): The products before the sale (see ProductRepository._get_stats_info()),
+                their `quantity` is decremented line after line.
+        """
+        changes: Dict[str, Dict[str, Any]] = {}
+        for (product_id, sell_quantity), is_applied in zip(lines, applied):
+            product = products.get(product_id)
+            if not is_applied or product is None:
+                continue
+            before = product["quantity"]
+            product["quantity"] -= sell_quantity
+            UnitStatsRepository.add_change(changes, product["unit_id"], UnitStats.change(
+                before,
+                product["quantity"],
+                product["purchase_price"],
+                (product["selling_price"] - product["purchase_price"]) * sell_quantity,
+            ))
+        return changes
 
-    def __init__(self, product_collection: Collection):
-        self.product_collection = product_collection
 
     def get_product_by_id(
         self, id: str, unit_id: Optional[str] = None
@@ -41,46 +167,249 @@ class ProductRepository:
         return Product.from_dict(result)
 
 
-    def get_products(self) -> List[Product]:
+    def _find_page(
+        self,
+        query: dict,
+        sort_field: str,
+        descending: bool,
+        page_size: int,
+        page_token: Optional[str],
+        summary: bool = False
+    ) -> Page:
         """
-        Get all the products in the database.
+        Find one page of the products matching `query` using keyset pagination.
+
+        The products are sorted by (`sort_field`, `id`) so that the order is total,
+        and the page starts right after the (`sort_field`, `id`) position stored in `page_token`.
+        Unlike skip based pagination, the cost of reading a page does not grow with its position.
+
+        If `summary` is True only the fields of ProductSummary are read from the database,
+        which avoids transferring and decoding the fields a product list does not show.
+
+        The pages are read from `read_product_collection`, with a read preference other than primary
+        they may lag behind the latest writes.
+
+        Args:
+            query (dict): The filter of the find query.
+            sort_field (str): The field by which to order.
+            descending (bool): If True the products are sorted in descending order.
+            page_size (int): The maximum number of products of the page.
+            page_token (str | None): The next_page_token of the previous page.
+                If None the first page is returned.
+            summary (bool): If True the page contains ProductSummary instances.
 
         Returns:
-            List[Product]: A list of Product instances of all the products inside the database.
+            Page: A page of Product (or ProductSummary) instances, or of RawProduct (or RawProductSummary)
+                instances with `raw_listings`. Its next_page_token is None if this is the last page.
 
         Raises:
-            ValueError: If the product record is missing required attributes
+            ValueError: If `page_token` is invalid or a product record is missing required attributes
+                (see Product.from_documents() and ProductSummary.from_documents()).
+        """
+        page_query, sort = self._build_page_query(query, sort_field, descending, page_token)
+
+        # read one extra product to find out if there is a next page
+        projection = ProductSummary.projection() if summary else None
+        if self.raw_listings:
+            from_documents = RawProductSummary.from_documents if summary else RawProduct.from_documents
+        else:
+            from_documents = ProductSummary.from_documents if summary else Product.from_documents
+
+        cursor = self.read_product_collection.find(page_query, projection).sort(sort).limit(page_size + 1)
+
+        return self._to_page(from_documents(cursor), sort_field, page_size)
+
+
+    @staticmethod
+    def _build_page_query(
+        query: dict, sort_field: str, descending: bool, page_token: Optional[str]
+    ) -> Tuple[dict, List[Tuple[str, int]]]:
+        """
+        Build the filter and the sort of the page that follows `page_token` (see ProductRepository._find_page()).
+
+        Returns:
+            Tuple[dict, List[Tuple[str, int]]]: The filter and the sort of the find query.
+
+        Raises:
+            ValueError: If `page_token` is invalid.
+        """
+        direction = DESCENDING if descending else ASCENDING
+
+        if page_token is not None:
+            sort_value, last_id = decode_page_token(page_token)
+            after = "$lt" if descending else "$gt"
+            from_ = "$lte" if descending else "$gte"
+            query = {"$and": [query, {
+                # the range on `sort_field` alone bounds the index scan,
+                # the $or skips the products of the previous pages that share its last value
+                sort_field: {from_: sort_value},
+                "$or": [
+                    {sort_field: {after: sort_value}},
+                    {sort_field: sort_value, "id": {after: last_id}},
+                ],
+            }]}
+
+        return query, [(sort_field, direction), ("id", direction)]
+
+
+    @staticmethod
+    def _to_page(products: list, sort_field: str, page_size: int) -> Page:
+        """
+        Build the page of the products read with one extra product, which tells if there is a next page.
+        """
+        next_page_token: Optional[str] = None
+        if len(products) > page_size:
+            products = products[:page_size]
+            last     = products[-1]
+            next_page_token = encode_page_token(getattr(last, sort_field), last.id)
+
+        return Page(products, page_size, next_page_token)
+
+
+    def get_products(
+        self, page_size: int = DEFAULT_PAGE_SIZE, page_token: Optional[str] = None, summary: bool = False
+    ) -> Page:
+        """
+        Get one page of all the products in the database, ordered by name.
+
+        Args:
+            page_size (int): The maximum number of products of the page.
+            page_token (str | None): The next_page_token of the previous page.
+                If None the first page is returned.
+            summary (bool): If True only the fields of ProductSummary are read.
+
+        Returns:
+            Page: A page of Product (or ProductSummary) instances.
+
+        Raises:
+            ValueError: If `page_token` is invalid or the product record is missing required attributes
                 (see ProductRepository.from_dict()).
         """
-        cursor = self.product_collection.find()
-        return [Product.from_dict(product) for product in cursor]
+        return self._find_page({}, "name", False, page_size, page_token, summary)
 
 
-    def get_products_from_unit(self, unit_id: str):
+    def get_products_from_unit(
+        self,
+        unit_id: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_token: Optional[str] = None,
+        summary: bool = False
+    ) -> Page:
         """
-        Get all the products inside the unit identified by `unit_id`.
+        Get one page of the products inside the unit identified by `unit_id`, ordered by name.
 
         Args:
             unit_id (str): The id of the unit from which to get the products from.
+            page_size (int): The maximum number of products of the page.
+            page_token (str | None): The next_page_token of the previous page.
+                If None the first page is returned.
+            summary (bool): If True only the fields of ProductSummary are read.
 
         Returns:
-            List[Product]: A list of Product instances of all the products inside the unit
+            Page: A page of Product (or ProductSummary) instances of the products inside the unit
                 identified by `unit_id`.
 
+        Raises:
+            ValueError: If `page_token` is invalid or the product record is missing required attributes
+                (see Product.from_dict()).
+        """
+        return self._find_page({"unit_id": unit_id}, "name", False, page_size, page_token, summary)
+
+
+    def stream_products(self, unit_id: Optional[str] = None, batch_size: int = 1000) -> Iterator[Product]:
+        """
+        Iterate over all the products (of a unit) without loading them all in memory.
+
+        The cursor fetches the products from the database `batch_size` documents at a time.
+
+        Args:
+            unit_id (str | None): The id of the unit of the products. If None all products are returned.
+            batch_size (int): The number of documents of each round trip to the database.
+
+        Yields:
+            Product: The products one at a time.
+
         Raises:
             ValueError: If the product record is missing required attributes
                 (see Product.from_dict()).
         """
-        cursor = self.product_collection.find({"unit_id": unit_id})
-        return [Product.from_dict(product) for product in cursor]
+        query  = {"unit_id": unit_id} if unit_id is not None else {}
+        cursor = self.product_collection.find(query, batch_size=batch_size)
+        try:
+            for product in cursor:
+                yield Product.from_dict(product)
+        finally:
+            cursor.close()
 
 
-    def get_quantity_and_volume_by_unit(self, unit_id: str) -> List[dict]:
-        cursor = self.product_collection.find(
-            {"unit_id": unit_id},
-            projection={"id": 1 ,"quantity": 1, "volume": 1}
+    def get_snapshot(self, unit_id: Optional[str] = None, batch_size: int = 10_000) -> ProductSnapshot:
+        """
+        Load the columns of a ProductSnapshot of all the products (of a unit).
+
+        Only the fields of ProductSnapshot.FIELDS are projected, and the documents
+        are converted to arrays while the cursor streams them.
+
+        Args:
+            unit_id (str | None): The id of the unit of the products. If None all products are loaded.
+            batch_size (int): The number of documents of each round trip to the database.
+
+        Returns:
+            ProductSnapshot: The snapshot of the products.
+
+        Raises:
+            ValueError: If a product record is missing a field of the snapshot
+                (see ProductSnapshot.from_documents()).
+        """
+        query  = {"unit_id": unit_id} if unit_id is not None else {}
+        cursor = self.snapshot_collection.find(
+            query, projection=ProductSnapshot.PROJECTION, batch_size=batch_size
         )
-        return list(cursor)
+        try:
+            return ProductSnapshot.from_documents(cursor)
+        finally:
+            cursor.close()
+
+
+    def get_occupied_volume_by_unit(self) -> Dict[str, float]:
+        """
+        Calculate the volume taken up by the products of every unit.
+
+        The sum of `quantity * volume` is computed by the database
+        with an aggregation grouped by `unit_id`.
+
+        Returns:
+            Dict[str, float]: A dictionary mapping each `unit_id` to the volume
+                its products occupy. Units without products are not included.
+        """
+        cursor = self.product_collection.aggregate([
+            {"$group": {
+                "_id": "$unit_id",
+                "occupied_volume": {"$sum": {"$multiply": ["$quantity", "$volume"]}},
+            }},
+        ])
+        return {doc["_id"]: doc["occupied_volume"] for doc in cursor}
+
+
+    def get_unit_stats_by_unit(self) -> Dict[str, UnitStats]:
+        """
+        Compute the counters of UnitStats of every unit from its products,
+        with an aggregation grouped by `unit_id`.
+
+        Returns:
+            Dict[str, UnitStats]: The counters of each unit, by `unit_id`.
+                Units without products are not included.
+        """
+        cursor = self.product_collection.aggregate([
+            {"$group": {
+                "_id":         "$unit_id",
+                "products":    {"$sum": 1},
+                "items":       {"$sum": "$quantity"},
+                "stock_value": {"$sum": {"$multiply": ["$quantity", "$purchase_price"]}},
+                "unit_gain":   {"$sum": "$unit_gain"},
+                "low_stock":   {"$sum": {"$cond": [{"$lt": ["$quantity", LOW_STOCK_THRESHOLD]}, 1, 0]}},
+            }},
+        ])
+        return {doc["_id"]: UnitStats.from_dict({"unit_id": doc.pop("_id"), **doc}) for doc in cursor}
 
 
     def buy_product(self, product_id: str, quantity: int , unit_gain: float) -> Product:
@@ -101,41 +430,96 @@ class ProductRepository:
                 - If the product is missing required order_fields
                 (see Product.from_dict() for more details
         """
-        result = self.product_collection.find_one_and_update(
-            {"id": product_id},
-            {"$inc": {
-                "quantity": quantity,
-                "unit_gain": unit_gain
-            }},
-            return_document=True
-        )
+        def write(session: Optional[ClientSession]) -> Optional[Product]:
+            result = self.product_collection.find_one_and_update(
+                {"id": product_id},
+                {"$inc": {
+                    "quantity": quantity,
+                    "unit_gain": unit_gain
+                }},
+                return_document=True,
+                session=session,
+            )
 
-        return Product.from_dict(result)
+            if result is None:
+                return None
+
+            product = Product.from_dict(result)
+            self._increment_stats({product.unit_id: UnitStats.change(
+                product.quantity - quantity, product.quantity, product.purchase_price, unit_gain
+            )}, session)
+            return product
+
+        product = self._write_with_stats(write)
 
+        if product is None:
+            raise ValueError(f"Product with id={product_id} does not exist.")
 
-    def _sell_product(self, product_id: str, unit_id: Optional[str], sell_quantity: int, profit: float):
+        return product
+
+
+    def buy_products(self, lines: List[Tuple[str, int, float]]) -> BulkWriteResult:
         """
-        Sell a product and update it in the database 
+        Increases the quantity and the unit_gain of many products with a single bulk write.
 
-        This method decreases the product's quantity by `items_to_sell`
-        and increases its `unit_gain` by the given `profit`.
+        Every line is the same update as ProductRepository.buy_product().
+        With a `unit_stats_repository` the products are read first, for the increments of their units.
+
+        Args:
+            lines (List[Tuple[str, int, float]]): Tuples of
+                (`product_id`, `quantity`, `unit_gain`) for each product to update.
+
+        Returns:
+            pymongo.results.BulkWriteResult: The result of the bulk write.
+        """
+        def write(session: Optional[ClientSession]) -> BulkWriteResult:
+            products = self._get_stats_info([product_id for product_id, _, _ in lines], session)
+            result   = self.product_collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"id": product_id},
+                        {"$inc": {
+                            "quantity": quantity,
+                            "unit_gain": unit_gain
+                        }},
+                    )
+                    for product_id, quantity, unit_gain in lines
+                ],
+                ordered=False,
+                session=session,
+            )
+
+            changes: Dict[str, Dict[str, Any]] = {}
+            for product_id, quantity, unit_gain in lines:
+                product = products.get(product_id)
+                if product is None:
+                    continue
+                before = product["quantity"]
+                product["quantity"] += quantity
+                UnitStatsRepository.add_change(changes, product["unit_id"], UnitStats.change(
+                    before, product["quantity"], product["purchase_price"], unit_gain
+                ))
+            self._increment_stats(changes, session)
+
+            return result
+
+        return self._write_with_stats(write)
+
+
+    @staticmethod
+    def _build_sell_filter(product_id: str, unit_id: Optional[str], sell_quantity: int) -> dict:
+        """
+        Build the filter that matches a product only if it has at least `sell_quantity` items.
 
         Args:
             product_id (str): The id of the product to sell.
             unit_id (str | None): The unit in which the product belongs.
-                If none the method looks at all units.
+                If none the filter matches the product in all units.
             sell_quantity (int): The quantity of items of the product to be sold.
-            profit (float): The profit from selling `sell_quantity` items
 
         Returns:
-            Product | None: If the product was updated return the updated version,
-                else return None
-
-        Raises:
-            ValueError: If the product is missing required attributes
-                (see Product.from_dict() for more details).
+            dict: The filter for the sell update.
         """
-
         filter = {
             "id": product_id,
             # are there enough items to sell?
@@ -144,36 +528,110 @@ class ProductRepository:
         if unit_id is not None:
             filter["unit_id"] = unit_id
 
-        update = {
-            "$inc": {
-                "quantity": -sell_quantity,  # subtract sold quantity
-                "unit_gain": profit,
+        return filter
+
+
+    @staticmethod
+    def _build_sell_update(sell_quantity: int, profit: Optional[float]) -> dict | list:
+        """
+        Build the update that sells `sell_quantity` items of a product:
+        `quantity` is decreased and `sold_quantity` increased by `sell_quantity`.
+
+        If `profit` is None, an aggregation pipeline update is returned that
+        calculates the profit in the database from the stored `selling_price`
+        and `purchase_price` (see Product.calculate_profit()),
+        so the product does not have to be read before it is sold.
+
+        Args:
+            sell_quantity (int): The quantity of items of the product to be sold.
+            profit (float | None): The profit from selling `sell_quantity` items.
+
+        Returns:
+            dict | list: The update document or pipeline.
+        """
+        if profit is not None:
+            return {
+                "$inc": {
+                    "quantity": -sell_quantity,  # subtract sold quantity
+                    "sold_quantity": sell_quantity,
+                    "unit_gain": profit,
+                }
             }
-        }
 
-        sell_result= self.product_collection.find_one_and_update(
-            filter,
-            update,
-            return_document=True,
-        )
+        return [
+            {"$set": {
+                "quantity": {"$subtract": ["$quantity", sell_quantity]},
+                "sold_quantity": {"$add": ["$sold_quantity", sell_quantity]},
+                "unit_gain": {"$add": [
+                    "$unit_gain",
+                    {"$multiply": [
+                        {"$subtract": ["$selling_price", "$purchase_price"]},
+                        sell_quantity,
+                    ]},
+                ]},
+            }},
+        ]
 
-        if sell_result is None:
-            return None
 
-        return Product.from_dict(sell_result)
+    def _sell_product(self, product_id: str, unit_id: Optional[str], sell_quantity: int, profit: Optional[float]):
+        """
+        Sell a product and update it in the database 
+
+        This method decreases the product's quantity by `items_to_sell`,
+        increases its `sold_quantity` by as much and its `unit_gain` by the given `profit`.
+        The product is only updated if it has at least `sell_quantity` items.
 
+        Args:
+            product_id (str): The id of the product to sell.
+            unit_id (str | None): The unit in which the product belongs.
+                If none the method looks at all units.
+            sell_quantity (int): The quantity of items of the product to be sold.
+            profit (float | None): The profit from selling `sell_quantity` items.
+                If None the profit is calculated by the database from the stored prices.
 
-    def sell_product(self, product_id: str, sell_quantity: int, profit: float) -> Optional[Product]:
+        Returns:
+            Product | None: If the product was updated return the updated version,
+                else return None
+
+        Raises:
+            ValueError: If the product is missing required attributes
+                (see Product.from_dict() for more details).
+        """
+        def write(session: Optional[ClientSession]) -> Optional[Product]:
+            sell_result = self.product_collection.find_one_and_update(
+                self._build_sell_filter(product_id, unit_id, sell_quantity),
+                self._build_sell_update(sell_quantity, profit),
+                return_document=True,
+                session=session,
+            )
+
+            if sell_result is None:
+                return None
+
+            product = Product.from_dict(sell_result)
+            self._increment_stats({product.unit_id: UnitStats.change(
+                product.quantity + sell_quantity,
+                product.quantity,
+                product.purchase_price,
+                profit if profit is not None else product.calculate_profit(sell_quantity),
+            )}, session)
+            return product
+
+        return self._write_with_stats(write)
+
+
+    def sell_product(self, product_id: str, sell_quantity: int, profit: Optional[float] = None) -> Optional[Product]:
         """
         Sell a product and update it in the database 
 
-        This method decreases the product's quantity by `items_to_sell`
-        and increases its `unit_gain` by the given `profit`.
+        This method decreases the product's quantity by `items_to_sell`,
+        increases its `sold_quantity` by as much and its `unit_gain` by the given `profit`.
 
         Args:
             product_id (str): The id of the product to sell.
             sell_quantity (int): The quantity of items of the product to be sold.
-            profit (float): The profit from selling `sell_quantity` items
+            profit (float | None): The profit from selling `sell_quantity` items.
+                If None the profit is calculated by the database from the stored prices.
 
         Returns:
             Product | None: If the product was updated return the updated version,
@@ -185,19 +643,20 @@ class ProductRepository:
         return self._sell_product(product_id, None, sell_quantity, profit)
 
 
-    def sell_products_from_unit(self, product_id: str, sell_quantity: int, profit: float, unit_id: str):
+    def sell_products_from_unit(self, product_id: str, sell_quantity: int, profit: Optional[float], unit_id: str):
         """
         Sell a product and update it in the database 
 
-        This method decreases the product's quantity by `items_to_sell`
-        and increases its `unit_gain` by the given `profit`.
+        This method decreases the product's quantity by `items_to_sell`,
+        increases its `sold_quantity` by as much and its `unit_gain` by the given `profit`.
 
         Args:
             product_id (str): The id of the product to sell.
             unit_id (str | None): The unit in which the product belongs.
                 If none the method looks at all units.
             sell_quantity (int): The quantity of items of the product to be sold.
-            profit (float): The profit from selling `sell_quantity` items
+            profit (float | None): The profit from selling `sell_quantity` items.
+                If None the profit is calculated by the database from the stored prices.
 
         Returns:
             Product | None: If the product was updated return the updated version,
@@ -209,6 +668,160 @@ class ProductRepository:
         return self._sell_product(product_id, unit_id, sell_quantity, profit)
 
 
+    def sell_products(
+        self,
+        lines: List[Tuple[str, int]],
+        unit_id: Optional[str] = None,
+        all_or_nothing: bool = False
+    ) -> List[bool]:
+        """
+        Sell many products with a single bulk write.
+
+        Every line is a guarded update like ProductRepository._sell_product()
+        with the profit calculated by the database from the stored prices.
+        A line is only applied if its product has enough items.
+
+        The client level bulk write is used because it reports the result
+        of every line. It requires MongoDB 8.0 or newer: if the server rejects it,
+        this and the next sales fall back to one guarded update per line.
+        If `all_or_nothing` is True the bulk write runs inside a transaction
+        that is aborted if any line could not be applied
+        (this requires a replica set).
+
+        Args:
+            lines (List[Tuple[str, int]]): Pairs of (`product_id`, `sell_quantity`).
+            unit_id (str | None): The unit in which the products belong.
+                If none the method looks at all units.
+            all_or_nothing (bool): If True either every line is applied or none.
+
+        Returns:
+            List[bool]: For each line, True if it was applied, False otherwise.
+                If `all_or_nothing` is True and any line failed, the lines that could
+                have been applied are also False since the transaction was aborted.
+        """
+        if not lines:
+            return []
+
+        client    = self.product_collection.database.client
+        namespace = self.product_collection.full_name
+        updates   = [
+            (self._build_sell_filter(product_id, unit_id, sell_quantity), self._build_sell_update(sell_quantity, None))
+            for product_id, sell_quantity in lines
+        ]
+        models    = [UpdateOne(filter, update, namespace=namespace) for filter, update in updates]
+
+        def _write(session=None) -> List[bool]:
+            products = self._get_stats_info([product_id for product_id, _ in lines], session)
+            applied  = self._client_bulk_write(client, models, session)
+            if applied is None:
+                applied = [
+                    self.product_collection.update_one(filter, update, session=session).matched_count == 1
+                    for filter, update in updates
+                ]
+
+            # in the transaction of all_or_nothing, the increments are aborted with the sales
+            self._increment_stats(self._sold_changes(lines, applied, products), session)
+
+            return applied
+
+        if not all_or_nothing:
+            return self._write_with_stats(_write)
+
+        def _write_all_or_nothing(session) -> List[bool]:
+            applied = _write(session)
+            if not all(applied):
+                # with_transaction() returns without committing if the transaction is aborted
+                session.abort_transaction()
+                return [False] * len(applied)
+            return applied
+
+        with client.start_session() as session:
+            return session.with_transaction(_write_all_or_nothing)
+
+
+    def _client_bulk_write(
+        self, client: Any, models: List[UpdateOne], session: Optional[ClientSession]
+    ) -> Optional[List[bool]]:
+        """
+        Run `models` with MongoClient.bulk_write(), ordered in a transaction.
+
+        Returns:
+            List[bool] | None: For each model, True if it matched a product.
+                None if the server is older than MongoDB 8.0, nothing was written then.
+        """
+        if not self.client_bulk_write:
+            return None
+
+        try:
+            result = client.bulk_write(models, session=session, ordered=session is not None, verbose_results=True)
+        except InvalidOperation:
+            # raised before anything is sent when the server does not support the command
+            self.client_bulk_write = False
+            return None
+
+        return [
+            i in result.update_results and result.update_results[i].matched_count == 1
+            for i in range(len(models))
+        ]
+
+
+    def get_storage_info_by_ids(self, product_ids: List[str], unit_id: Optional[str] = None) -> List[dict]:
+        """
+        Get the `unit_id`, `quantity`, `volume` and `purchase_price`
+        of the products identified by `product_ids`.
+
+        Args:
+            product_ids (List[str]): The ids of the products.
+            unit_id (str | None): The id of the unit where the products are stored.
+                If None the method looks for products in all units.
+
+        Returns:
+            List[dict]: A dictionary with the keys `id`, `unit_id`, `quantity`, `volume`
+                and `purchase_price` for each product that was found.
+        """
+        query: dict = {"id": {"$in": list(product_ids)}}
+        if unit_id is not None:
+            query["unit_id"] = unit_id
+
+        cursor = self.product_collection.find(
+            query,
+            projection={
+                "_id": 0, "id": 1, "unit_id": 1, "quantity": 1, "volume": 1, "purchase_price": 1
+            }
+        )
+        return list(cursor)
+
+
+    def product_exists(self, product_id: str, unit_id: Optional[str] = None) -> bool:
+        """
+        Check if the product identified by `product_id` exists.
+
+        Only the `_id` of the product is read from the database.
+
+        Args:
+            product_id (str): The id of the product.
+            unit_id (str | None): The id of the unit where the product is stored.
+                If None the method looks for the product in all units.
+
+        Returns:
+            bool: True if the product exists, False otherwise.
+        """
+        query = {"id": product_id}
+        if unit_id is not None:
+            query["unit_id"] = unit_id
+
+        return self.product_collection.find_one(query, projection={"_id": 1}) is not None
+
+
+    def unit_has_products(self, unit_id: str) -> bool:
+        """
+        Check if any product is stored in the unit identified by `unit_id`.
+
+        Only the `unit_id` of one product is read, from the index on `unit_id`.
+        """
+        return self.product_collection.find_one({"unit_id": unit_id}, projection={"_id": 0, "unit_id": 1}) is not None
+
+
 
     def insert_product(self, product: Product) -> InsertOneResult:
         """
@@ -220,20 +833,58 @@ class ProductRepository:
         Returns:
             pymongo.results.InsertOneResult: The result of the insertion
         """
-        return self.product_collection.insert_one(product.to_dict())
+        def write(session: Optional[ClientSession]) -> InsertOneResult:
+            result = self.product_collection.insert_one(product.to_dict(), session=session)
+            self._increment_stats(self._inserted_changes([product]), session)
+            return result
+
+        return self._write_with_stats(write)
 
 
-    def insert_products(self, products: List[Product]) -> InsertManyResult:
+    def insert_products(self, products: List[Product], ordered: bool = True) -> InsertManyResult:
         """
         Inserts a products to the database
 
         Args:
             products (List[Product]): A list with the products to insert
+            ordered (bool): If False the documents are inserted in any order and the insertion
+                continues after a failed document (see Collection.insert_many()).
 
         Returns:
             pymongo.results.InsertOneResult: The result of the insertion
+
+        Raises:
+            BulkWriteError: If some products were not inserted, the counters of the units
+                are incremented for the inserted ones.
         """
-        return self.product_collection.insert_many([p.to_dict() for p in products])
+        documents = [p.to_dict() for p in products]
+
+        def write(session: Optional[ClientSession]) -> InsertManyResult:
+            try:
+                result = self.product_collection.insert_many(documents, ordered=ordered, session=session)
+            except BulkWriteError as error:
+                failed = {write_error["index"] for write_error in error.details["writeErrors"]}
+                # an ordered insertion stops at its first failed document
+                last   = min(failed) if ordered and failed else len(products)
+                self._increment_stats(self._inserted_changes(
+                    [p for i, p in enumerate(products[:last]) if i not in failed]
+                ), session)
+                raise
+
+            self._increment_stats(self._inserted_changes(products), session)
+            return result
+
+        return self._write_with_stats(write)
+
+
+    @staticmethod
+    def _inserted_changes(products: List[Product]) -> Dict[str, Dict[str, Any]]:
+        changes: Dict[str, Dict[str, Any]] = {}
+        for product in products:
+            UnitStatsRepository.add_change(changes, product.unit_id, UnitStats.change(
+                None, product.quantity, product.purchase_price, product.unit_gain
+            ))
+        return changes
 
 
     def search_products(
@@ -244,10 +895,13 @@ class ProductRepository:
         id: Optional[str],
         min_quantity: Optional[int],
         max_quantity: Optional[int],
-        unit_id: Optional[str]
-    ) -> List[Product]:
+        unit_id: Optional[str],
+        page_size: int = DEFAULT_PAGE_SIZE,
+        page_token: Optional[str] = None,
+        summary: bool = False
+    ) -> Page:
         """
-        Search the database and order results.
+        Search the database and order results, one page at a time.
 
         This method can search for products based on `name`, `id`,
         or quantity range ([`min_quantity`, `max_quantity`]).
@@ -260,7 +914,8 @@ class ProductRepository:
         1) Checks which of the search fields (`name`, `id`, `min_quantity`, `max_quantity`)
             are specified and applies them to the find query.
         2) Checks if `order_field` is specified.
-            If it is, orders results based on `order_type`.
+            If it is, orders results based on `order_type`, otherwise orders them by name.
+        3) Returns the page that follows `page_token` (see ProductRepository._find_page()).
 
         Args:
             order_field (str | None): The field by which to order.
@@ -271,13 +926,37 @@ class ProductRepository:
             min_quantity (int | None): The minimum product quantity in the database.
             max_quantity (int | None): The maximum product quantity in the database.
             unit_id (str | None): The id of the unit to search. If None all units are searched.
+            page_size (int): The maximum number of products of the page.
+            page_token (str | None): The next_page_token of the previous page of the same search.
+                If None the first page is returned.
+            summary (bool): If True only the fields of ProductSummary are read.
 
         Returns:
-            List[Product]: List of products that match the search query, sorted if requested.
+            Page: A page of the products (or their ProductSummary) that match the search query,
+                sorted if requested.
+
+        Raises:
+            ValueError: If `page_token` is invalid.
         """
 
+        return self._find_page(
+            self._build_search_query(name, id, min_quantity, max_quantity, unit_id),
+            order_field or "name", order_type == "descending", page_size, page_token, summary
+        )
+
+
+    @staticmethod
+    def _build_search_query(
+        name: Optional[str],
+        id: Optional[str],
+        min_quantity: Optional[int],
+        max_quantity: Optional[int],
+        unit_id: Optional[str]
+    ) -> dict:
+        """
+        Build the filter of ProductRepository.search_products() from the search fields that are specified.
+        """
         query: dict = {}
-        cursor = []
 
         if name is not None:
             query["name"] = name
@@ -291,12 +970,4 @@ class ProductRepository:
         if min_quantity is not None and max_quantity is not None:
             query["quantity"] = {"$gte": min_quantity, "$lte": max_quantity}
 
-        cursor = self.product_collection.find(query)
-
-        if order_field is not None:
-            if order_type == "descending":
-                cursor = cursor.sort(order_field, DESCENDING)
-            else:
-                cursor = cursor.sort(order_field, ASCENDING)
-
-        return [Product.from_dict(product) for product in cursor]
+        return query
@@ -0,0 +1,146 @@
+from typing import List, Optional
+from pymongo.database import Collection
+
+
+class ReportRepository:
+    """
+    The aggregation pipelines of the reports over the products.
+
+    Every report is computed by the database, only one document per group (or per top seller)
+    is sent back. A report of one unit starts with a $match on `unit_id`, which is served
+    by the indexes leading with `unit_id`, a report of all the units reads the whole collection.
+    """
+    product_collection: Collection
+
+    def __init__(self, product_collection: Collection):
+        """
+        Args:
+            product_collection (Collection): The products, e.g. with the read preference of the listings,
+                the reports do not need the latest writes.
+        """
+        self.product_collection = product_collection
+
+
+    @staticmethod
+    def _match_unit(unit_id: Optional[str]) -> List[dict]:
+        return [{"$match": {"unit_id": unit_id}}] if unit_id is not None else []
+
+
+    def get_gain_by_unit(self, unit_id: Optional[str] = None) -> List[dict]:
+        """
+        Sum the `unit_gain` and the `sold_quantity` of the products of each unit.
+
+        Args:
+            unit_id (str | None): The unit to report. If None every unit with products is reported.
+
+        Returns:
+            List[dict]: One dictionary per unit, sorted by `unit_id`, with keys:
+            - `unit_id`
+            - `products`: The number of products of the unit.
+            - `unit_gain`: The total `unit_gain` of its products.
+            - `sold_quantity`: The total `sold_quantity` of its products.
+        """
+        cursor = self.product_collection.aggregate([
+            *self._match_unit(unit_id),
+            {"$group": {
+                "_id":           "$unit_id",
+                "products":      {"$sum": 1},
+                "unit_gain":     {"$sum": "$unit_gain"},
+                "sold_quantity": {"$sum": "$sold_quantity"},
+            }},
+            {"$sort": {"_id": 1}},
+        ])
+        return [{"unit_id": doc.pop("_id"), **doc} for doc in cursor]
+
+
+    def get_margin_by_category(self, unit_id: Optional[str] = None) -> List[dict]:
+        """
+        Sum the revenue and the cost of the sold quantity of the products of each category.
+
+        Args:
+            unit_id (str | None): The unit of the products. If None the products of every unit are reported.
+
+        Returns:
+            List[dict]: One dictionary per category, sorted by `category`, with keys:
+            - `category`
+            - `sold_quantity`: The total `sold_quantity` of the category.
+            - `revenue`: The sum of `sold_quantity * selling_price`.
+            - `cost`: The sum of `sold_quantity * purchase_price`.
+            - `margin`: `revenue - cost`.
+        """
+        cursor = self.product_collection.aggregate([
+            *self._match_unit(unit_id),
+            {"$group": {
+                "_id":           "$category",
+                "sold_quantity": {"$sum": "$sold_quantity"},
+                "revenue":       {"$sum": {"$multiply": ["$sold_quantity", "$selling_price"]}},
+                "cost":          {"$sum": {"$multiply": ["$sold_quantity", "$purchase_price"]}},
+            }},
+            {"$set": {"margin": {"$subtract": ["$revenue", "$cost"]}}},
+            {"$sort": {"_id": 1}},
+        ])
+        return [{"category": doc.pop("_id"), **doc} for doc in cursor]
+
+
+    def get_top_sellers(self, limit: int, unit_id: Optional[str] = None) -> List[dict]:
+        """
+        Get the products with the highest `sold_quantity`.
+
+        No index covers the sort on `sold_quantity`, which changes on every sale,
+        the database keeps only the `limit` best products while it sorts (a top-k sort).
+
+        Args:
+            limit (int): The number of products to return.
+            unit_id (str | None): The unit of the products. If None the products of every unit are ranked.
+
+        Returns:
+            List[dict]: The top sellers, by descending `sold_quantity` then by `id`, with keys
+                `id`, `name`, `unit_id`, `category`, `sold_quantity`,
+                `revenue` (`sold_quantity * selling_price`)
+                and `profit` (`sold_quantity * (selling_price - purchase_price)`).
+        """
+        cursor = self.product_collection.aggregate([
+            *self._match_unit(unit_id),
+            {"$sort": {"sold_quantity": -1, "id": 1}},
+            {"$limit": limit},
+            {"$project": {
+                "_id":           0,
+                "id":            1,
+                "name":          1,
+                "unit_id":       1,
+                "category":      1,
+                "sold_quantity": 1,
+                "revenue":       {"$multiply": ["$sold_quantity", "$selling_price"]},
+                "profit":        {"$multiply": [
+                    "$sold_quantity", {"$subtract": ["$selling_price", "$purchase_price"]}
+                ]},
+            }},
+        ])
+        return list(cursor)
+
+
+    def get_stock_value_by_unit(self, unit_id: Optional[str] = None) -> List[dict]:
+        """
+        Value the stock of each unit at its purchase and at its selling price.
+
+        Args:
+            unit_id (str | None): The unit to report. If None every unit with products is reported.
+
+        Returns:
+            List[dict]: One dictionary per unit, sorted by `unit_id`, with keys:
+            - `unit_id`
+            - `quantity`: The items in stock.
+            - `purchase_value`: The sum of `quantity * purchase_price`.
+            - `selling_value`: The sum of `quantity * selling_price`.
+        """
+        cursor = self.product_collection.aggregate([
+            *self._match_unit(unit_id),
+            {"$group": {
+                "_id":            "$unit_id",
+                "quantity":       {"$sum": "$quantity"},
+                "purchase_value": {"$sum": {"$multiply": ["$quantity", "$purchase_price"]}},
+                "selling_value":  {"$sum": {"$multiply": ["$quantity", "$selling_price"]}},
+            }},
+            {"$sort": {"_id": 1}},
+        ])
+        return [{"unit_id": doc.pop("_id"), **doc} for doc in cursor]
@@ -2,6 +2,7 @@ from typing import List, Optional
 from pymongo.database import Collection
 from pymongo.results import InsertManyResult, InsertOneResult
 from app.model.supervisor import Supervisor
+from app.repositories.user_repository import USER_PROJECTION
 
 
 class SupervisorRepository:
@@ -36,22 +37,23 @@ class SupervisorRepository:
         return Supervisor.from_persistence_dict(result)
 
 
-    def get_supervisor(self, username: str, password: str, unit_id: str):
+    def get_supervisor_by_username(self, username: str, unit_id: str):
         """
-        Retrieve a Supervisor instance from the DB using their credentials.
+        Retrieve a Supervisor instance from the DB by their username.
 
+        The password is not checked here, the `password` of the returned supervisor is the stored hash
+        (see PasswordHasher.verify()).
         Note that `unit_name` is not stored in the DB and it will be set to None.
 
         Args:
             username (str): The `username` of the supervisor.
-            password (str): The `password` of the supervisor.
             unit_id (str): The `id` of the unit the supervisor is assigned to.
 
         Returns:
             Supervisor | None:
             - A Supervisor object if found.
               Note that `unit_name` is not stored in the database.
-            - None if no supervisor with the given ID exists.
+            - None if no supervisor with the given username exists in the unit.
 
         Raises:
             ValueError: If the Database record is missing required attributes
@@ -60,12 +62,11 @@ class SupervisorRepository:
 
         query = {
             "username": username,
-            "password": password,
             "unit_id":  unit_id,
             "role":     "supervisor"
         }
 
-        result = self.user_collection.find_one(query)
+        result = self.user_collection.find_one(query, USER_PROJECTION)
 
         if result is None:
             return None
@@ -89,7 +90,7 @@ class SupervisorRepository:
         return self.user_collection.insert_one(supervisor.to_percistance_dict())
 
 
-    def insert_supervisors(self, supervisors: List[Supervisor]) -> InsertManyResult:
+    def insert_supervisors(self, supervisors: List[Supervisor], ordered: bool = True) -> InsertManyResult:
         """
         Inserts supervisors to the database.
 
@@ -98,8 +99,10 @@ class SupervisorRepository:
 
         Args:
             supervisors (List[Supervisor]): A list with the supervisors to insert.
+            ordered (bool): If False the documents are inserted in any order and the insertion
+                continues after a failed document (see Collection.insert_many()).
 
         Returns:
             pymongo.results.InsertManyResult: The result of the insertion.
         """
-        return self.user_collection.insert_many([s.to_percistance_dict() for s in supervisors])
+        return self.user_collection.insert_many([s.to_percistance_dict() for s in supervisors], ordered=ordered)
@@ -19,7 +19,7 @@ class UnitRepository:
         Get all the stored units
         """
         result = self.unit_collection.find()
-        return [Unit.from_dict(unit) for unit in result]
+        return Unit.from_documents(result)
 
 
     def get_all_units_ids(self) -> List[str]:
@@ -59,6 +59,100 @@ class UnitRepository:
         return Unit.from_dict(result)
 
 
+    def increment_occupied_volume(self, unit_id: str, volume: float) -> bool:
+        """
+        Increases the `occupied_volume` of the unit identified by `unit_id`.
+
+        Args:
+            unit_id (str): The id of the unit to update.
+            volume (float): The volume to add. Negative values free up space.
+
+        Returns:
+            bool: True if the unit was found and updated, False otherwise.
+        """
+        result = self.unit_collection.update_one(
+            # a unit without `occupied_volume` is left to backfill_occupied_volume()
+            {"id": unit_id, "occupied_volume": {"$ne": None}},
+            {"$inc": {"occupied_volume": volume}}
+        )
+        return result.matched_count == 1
+
+
+    def reserve_volume(self, unit_id: str, volume: float) -> bool:
+        """
+        Atomically take up `volume` of the free space of the unit identified by `unit_id`.
+
+        The free space is checked and the `occupied_volume` is increased
+        in a single conditional update, so concurrent reservations
+        can never fill the unit beyond its `volume`.
+
+        Args:
+            unit_id (str): The id of the unit.
+            volume (float): The volume to reserve.
+
+        A unit without `occupied_volume`, e.g. of a database created before it was kept,
+        has no volume to reserve until backfill_occupied_volume() computes it.
+
+        Returns:
+            bool: True if the volume was reserved, False if the unit does not exist,
+                does not have enough free space or has no `occupied_volume`.
+        """
+        result = self.unit_collection.update_one(
+            {
+                "id": unit_id,
+                "occupied_volume": {"$ne": None},
+                # is there enough free space?
+                "$expr": {"$lte": [
+                    {"$add": ["$occupied_volume", volume]},
+                    "$volume",
+                ]},
+            },
+            {"$inc": {"occupied_volume": volume}}
+        )
+        return result.matched_count == 1
+
+
+    def set_occupied_volume(self, unit_id: str, occupied_volume: float) -> bool:
+        """
+        Overwrites the `occupied_volume` of the unit identified by `unit_id`.
+
+        Args:
+            unit_id (str): The id of the unit to update.
+            occupied_volume (float): The new occupied volume of the unit.
+
+        Returns:
+            bool: True if the unit was found and updated, False otherwise.
+        """
+        result = self.unit_collection.update_one(
+            {"id": unit_id},
+            {"$set": {"occupied_volume": occupied_volume}}
+        )
+        return result.matched_count == 1
+
+
+    def get_unit_ids_without_occupied_volume(self) -> List[str]:
+        """
+        Get the IDs of the units whose `occupied_volume` is missing or None.
+        """
+        cursor = self.unit_collection.find({"occupied_volume": None}, projection={"_id": 0, "id": 1})
+        return [unit["id"] for unit in cursor]
+
+
+    def backfill_occupied_volume(self, unit_id: str, occupied_volume: float) -> bool:
+        """
+        Sets the `occupied_volume` of the unit identified by `unit_id` if it is missing or None,
+        see get_unit_ids_without_occupied_volume().
+
+        Returns:
+            bool: True if the unit was found without `occupied_volume` and updated, False otherwise.
+        """
+        result = self.unit_collection.update_one(
+            {"id": unit_id, "occupied_volume": None},
+            {"$set": {"occupied_volume": occupied_volume}}
+        )
+        return result.matched_count == 1
+
+
     def insert_unit(self, unit: Unit) -> InsertOneResult:
         """
         Inserts a unit to the database
@@ -72,14 +166,16 @@ class UnitRepository:
         return self.unit_collection.insert_one(unit.to_dict())
 
 
-    def insert_units(self, units: List[Unit]) -> InsertManyResult:
+    def insert_units(self, units: List[Unit], ordered: bool = True) -> InsertManyResult:
         """
         Inserts a units to the database
 
         Args:
             units (List[Unit]): A list with the units to insert
+            ordered (bool): If False the documents are inserted in any order and the insertion
+                continues after a failed document (see Collection.insert_many()).
 
         Returns:
             pymongo.results.InsertManyResult: The result of the insertion
         """
-        return self.unit_collection.insert_many([u.to_dict() for u in units])
+        return self.unit_collection.insert_many([u.to_dict() for u in units], ordered=ordered)
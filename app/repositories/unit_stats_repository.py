@@ -0,0 +1,89 @@
+from typing import Any, Dict, List, Optional
+from pymongo import UpdateOne
+from pymongo.client_session import ClientSession
+from pymongo.database import Collection
+from app.model.unit_stats import UnitStats
+
+
+class UnitStatsRepository:
+    """
+    The `unit_stats` collection, one UnitStats document per unit with a unique `unit_id`.
+
+    The documents are upserted by the first increment of a unit, so a unit without products
+    has no document until then. On a database created before the counters were kept the
+    documents are built by app.bootstrap, see ProductService.backfill_unit_stats().
+    """
+    unit_stats_collection: Collection
+
+    def __init__(self, unit_stats_collection: Collection):
+        self.unit_stats_collection = unit_stats_collection
+
+
+    @staticmethod
+    def add_change(changes: Dict[str, Dict[str, Any]], unit_id: str, change: Dict[str, Any]) -> None:
+        """
+        Add the increments `change` of a unit (see UnitStats.change()) to the increments
+        of many units `changes`, so that a write of many products increments each unit once.
+        """
+        total = changes.setdefault(unit_id, dict.fromkeys(UnitStats.COUNTERS, 0))
+        for counter, value in change.items():
+            total[counter] += value
+
+
+    def get_unit_stats(self, unit_id: str) -> Optional[UnitStats]:
+        """
+        Get the counters of a unit.
+
+        Args:
+            unit_id (str): The id of the unit.
+
+        Returns:
+            UnitStats | None: The counters of the unit, or None if none of its products
+                has been written since the collection was rebuilt.
+        """
+        result = self.unit_stats_collection.find_one({"unit_id": unit_id}, projection={"_id": 0})
+
+        if result is None:
+            return None
+
+        return UnitStats.from_dict(result)
+
+
+    def get_all_unit_stats(self) -> List[UnitStats]:
+        """
+        Get the counters of every unit that has a document.
+        """
+        return UnitStats.from_documents(self.unit_stats_collection.find({}, projection={"_id": 0}))
+
+
+    def increment(self, changes: Dict[str, Dict[str, Any]], session: Optional[ClientSession] = None) -> None:
+        """
+        Increment the counters of many units with one bulk write of $inc upserts.
+
+        Args:
+            changes (Dict[str, Dict[str, Any]]): The increments of the counters of each unit, by `unit_id`.
+            session (ClientSession | None): The session of the transaction of the write
+                that changed the products, if any.
+        """
+        if not changes:
+            return
+
+        self.unit_stats_collection.bulk_write(
+            [
+                UpdateOne({"unit_id": unit_id}, {"$inc": change}, upsert=True)
+                for unit_id, change in changes.items()
+            ],
+            ordered=False,
+            session=session,
+        )
+
+
+    def set_unit_stats(self, unit_stats: UnitStats) -> None:
+        """
+        Overwrite the counters of a unit, e.g. with the ones recomputed from its products.
+        """
+        self.unit_stats_collection.update_one(
+            {"unit_id": unit_stats.unit_id},
+            {"$set": unit_stats.counters()},
+            upsert=True,
+        )
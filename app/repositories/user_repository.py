@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pymongo.database import Collection
 from app.model.employee import Employee
 from app.model.supervisor import Supervisor
@@ -6,12 +6,28 @@ from app.model.admin import Admin
 from app.model.user import User
 
 
+# the stored fields of a user (see User.to_percistance_dict())
+USER_PROJECTION = {
+    "_id":      0,
+    "id":       1,
+    "name":     1,
+    "surname":  1,
+    "username": 1,
+    "password": 1,
+    "unit_id":  1,
+    "role":     1,
+}
+
+
 class UserRepository:
     user_collection: Collection
+    unit_collection_name: str
 
 
-    def __init__(self, user_collection: Collection) -> None:
-        self.user_collection = user_collection
+    def __init__(self, user_collection: Collection, unit_collection_name: str = "units") -> None:
+        self.user_collection      = user_collection
+        # the collection joined to find the `unit_name` of a user
+        self.unit_collection_name = unit_collection_name
 
 
     def get_user_by_id(self, id: str) -> User | None:
@@ -38,36 +54,62 @@ class UserRepository:
         return User.from_persistence_dict(result)
 
 
-    def get_user(self, username: str, password: str, unit_id: Optional[str]) -> User | None:
+    def get_user_with_unit_name(self, id: str) -> User | None:
         """
-        Retrieve a User instance from the DB using their credentials.
+        Get a User instance from the DB by ID, with the name of its unit.
 
-        Note that `unit_name` is not stored in the DB and it will be set to None.
+        The user and the name of its unit are read in one round trip,
+        with a $lookup on the units collection.
 
         Args:
-            username (str): The `username` of the employee.
-            password (str): The `password` of the employee.
-            unit_id (str | None): The `id` of the unit the employee is assigned to.
-                If None then the user is not assigned to any unit (ex Admin).
+            id (str): The ID of the user to retrieve.
 
         Returns:
             User | None:
-            - A User object if found. Note that `unit_name` is not stored in the database.
-            - None if no employee with the given ID exists.
+            - A User object if found. Its `unit_name` is None if the unit of the user does not exist.
+            - None if no user with the given ID exists.
 
         Raises:
             ValueError: If the Database record is missing required attributes
             (see User.from_persistence_dict() for details on the required attributes).
         """
-        query = {
-            "username": username,
-            "password": password,
-        }
+        result = self._find_one_with_unit_name({"id": id})
+
+        if result is None:
+            return None
+
+        return User.from_persistence_dict(result)
+
 
-        if unit_id is not None:
-            query["unit_id"] = unit_id
+    def get_user_by_username(self, username: str, unit_id: Optional[str]) -> User | None:
+        """
+        Retrieve a User instance from the DB by their username, with the name of its unit.
+
+        This is the read of a login: one point read on the unique (`username`, `unit_id`) index
+        and a $lookup of the unit name, in one round trip.
 
-        result = self.user_collection.find_one(query)
+        The password is not checked here, the `password` of the returned user is the stored hash
+        (see PasswordHasher.verify()).
+
+        Args:
+            username (str): The `username` of the user.
+            unit_id (str | None): The `id` of the unit the user is assigned to.
+                If None then the user is not assigned to any unit (ex Admin).
+
+        Returns:
+            User | None:
+            - A User object if found. Its `unit_name` is None if the unit of the user does not exist.
+            - None if no user with the given username exists in the unit.
+
+        Raises:
+            ValueError: If the Database record is missing required attributes
+            (see User.from_persistence_dict() for details on the required attributes).
+        """
+        # users that are not assigned to any unit are stored with unit_id=""
+        result = self._find_one_with_unit_name({
+            "username": username,
+            "unit_id":  unit_id if unit_id is not None else "",
+        })
 
         if result is None:
             return None
@@ -75,13 +117,50 @@ class UserRepository:
         return User.from_persistence_dict(result)
 
 
+    def _find_one_with_unit_name(self, query: dict) -> Optional[dict]:
+        """
+        Find the first user matching `query` and set its `unit_name` with a $lookup on the units.
+
+        Only the fields of User are read, the `unit_name` is None if the unit does not exist.
+
+        Args:
+            query (dict): The filter of the user, it should match at most one user through an index.
+
+        Returns:
+            dict | None: The user document, or None if no user matches `query`.
+        """
+        cursor = self.user_collection.aggregate(self._build_unit_name_pipeline(query, self.unit_collection_name))
+        return next(cursor, None)
+
+
+    @staticmethod
+    def _build_unit_name_pipeline(query: dict, unit_collection_name: str) -> List[dict]:
+        """
+        Build the aggregation of UserRepository._find_one_with_unit_name().
+        """
+        return [
+            {"$match": query},
+            {"$limit": 1},
+            {"$project": USER_PROJECTION},
+            {"$lookup": {
+                "from":         unit_collection_name,
+                "localField":   "unit_id",
+                "foreignField": "id",
+                "pipeline":     [{"$project": {"_id": 0, "name": 1}}],
+                "as":           "unit",
+            }},
+            {"$set": {"unit_name": {"$first": "$unit.name"}}},
+            {"$project": {"unit": 0}},
+        ]
+
+
     def change_password(self, id: str, password: str) -> bool:
         """
         Changes the password of the user identified by `id`.
 
         Args:
             id (str): The id of the user whose password is going to change.
-            password (str): The new password.
+            password (str): The hash of the new password (see PasswordHasher.hash()).
 
         Returns:
             bool: True if the password is changed false otherwise
@@ -93,3 +172,27 @@ class UserRepository:
         )
 
         return result is not None
+
+
+    def update_password_hash(self, id: str, old_hash: str, new_hash: str) -> bool:
+        """
+        Replaces the stored password hash of the user identified by `id`,
+        only if it is still `old_hash`.
+
+        Used to upgrade the hash of a password after a login (see PasswordHasher.rehash_in_background()),
+        without overwriting a password that was changed in the meantime.
+
+        Args:
+            id (str): The id of the user.
+            old_hash (str): The hash that was verified.
+            new_hash (str): The hash that replaces it.
+
+        Returns:
+            bool: True if the hash was replaced, False otherwise.
+        """
+        result = self.user_collection.update_one(
+            {"id": id, "password": old_hash},
+            {"$set": {"password": new_hash}}
+        )
+
+        return result.modified_count == 1
@@ -1,15 +1,27 @@
+from typing import Optional
 from pymongo.database import Collection
 from pymongo.results import InsertOneResult
 from app.model.admin import Admin
 from app.repositories.admin_repository import AdminRepository
+from app.utils.password_utils import PasswordHasher, get_password_hasher
 
 
 class AdminService:
     admin_repository: AdminRepository
+    password_hasher: PasswordHasher
 
 
-    def __init__(self, admin_repository: AdminRepository):
+    def __init__(self, admin_repository: AdminRepository, password_hasher: Optional[PasswordHasher] = None):
         self.admin_repository = admin_repository
+        self.password_hasher  = password_hasher or get_password_hasher()
+
+
+    def admin_exists(self, username: str) -> bool:
+        """
+        Returns:
+            bool: True if an admin with `username` exists.
+        """
+        return self.admin_repository.admin_exists(username)
 
 
     def insert_admin(
@@ -41,7 +53,7 @@ class AdminService:
         admin = Admin(
             id        = None,
             username  = username,
-            password  = password,
+            password  = self.password_hasher.hash(password),
         )
 
         return self.admin_repository.insert_admin(admin)
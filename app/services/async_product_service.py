@@ -0,0 +1,211 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from app.exceptions.exceptions import InsufficientProductQuantity, ProductNotFoundByIdError, UnitNotFoundByIdError
+from app.model.line_result import LineResult
+from app.model.page import Page
+from app.model.product import Product
+from app.repositories.async_product_repository import AsyncProductRepository
+from app.repositories.async_unit_repository import AsyncUnitRepository
+from app.utils.pagination_utils import validate_page_size
+
+
+class AsyncProductService:
+    """
+    The asyncio version of the product reads and sales of ProductService.
+
+    The methods validate and fail like their ProductService counterparts, but the independent
+    reads of a method (like a product and its unit) are sent concurrently, and while a method
+    waits for the database the event loop serves the other requests.
+    """
+    product_repository: AsyncProductRepository
+    unit_repository: AsyncUnitRepository
+
+    def __init__(self, product_repository: AsyncProductRepository, unit_repository: AsyncUnitRepository):
+        self.product_repository = product_repository
+        self.unit_repository    = unit_repository
+
+
+    async def get_product_by_id(self, id: str, unit_id: Optional[str] = None) -> Product:
+        """
+        Get a Product instance from the DB by ID, see ProductService.get_product_by_id().
+
+        Raises:
+            UnitNotFoundByIdError: If `unit_id` is specified and no unit exists with that ID.
+            ProductNotFoundByIdError: If the product does not exist.
+            ValueError: If the product record is missing required attributes.
+        """
+        if unit_id is None:
+            product = await self.product_repository.get_product_by_id(id)
+        else:
+            unit, product = await asyncio.gather(
+                self.unit_repository.get_unit_by_id(unit_id),
+                self.product_repository.get_product_by_id(id, unit_id),
+            )
+            if unit is None:
+                raise UnitNotFoundByIdError(unit_id)
+
+        if product is None:
+            raise ProductNotFoundByIdError(id)
+
+        return product
+
+
+    async def get_products(
+        self, page_size: Optional[int] = None, page_token: Optional[str] = None, summary: bool = False
+    ) -> Page:
+        """
+        Get one page of all the products in the database, see ProductService.get_products().
+        """
+        return await self.product_repository.get_products(validate_page_size(page_size), page_token, summary)
+
+
+    async def get_products_from_unit(
+        self,
+        unit_id: str,
+        page_size: Optional[int] = None,
+        page_token: Optional[str] = None,
+        summary: bool = False
+    ) -> Page:
+        """
+        Get one page of the products inside a unit, see ProductService.get_products_from_unit().
+
+        Raises:
+            UnitNotFoundByIdError: If the unit does not exist.
+            ValueError: If the page size or token are invalid or a product record is missing required attributes.
+        """
+        page_size = validate_page_size(page_size)
+
+        unit, page = await asyncio.gather(
+            self.unit_repository.get_unit_by_id(unit_id),
+            self.product_repository.get_products_from_unit(unit_id, page_size, page_token, summary),
+        )
+
+        if unit is None:
+            raise UnitNotFoundByIdError(unit_id)
+
+        return page
+
+
+    async def search_products(
+        self,
+        order_field: Optional[str],
+        order_type: Optional[str],
+        name: Optional[str],
+        id: Optional[str],
+        min_quantity: Optional[int],
+        max_quantity: Optional[int],
+        unit_id: Optional[str],
+        page_size: Optional[int] = None,
+        page_token: Optional[str] = None,
+        summary: bool = False
+    ) -> Page:
+        """
+        Search the database and order results, one page at a time, see ProductService.search_products().
+
+        Raises:
+            ValueError: If min_quantity or max_quantity are negative or if min_quantity > max_quantity,
+                or if the page size or token are invalid.
+        """
+        page_size = validate_page_size(page_size)
+
+        if min_quantity is not None and max_quantity is not None:
+            # are indexes valid?
+            if (min_quantity > max_quantity) or (min_quantity < 0 or max_quantity < 0):
+                raise ValueError(f"Invalid prices for min_quanity={min_quantity} and max_quantity={max_quantity}")
+
+        # is order_field valid?
+        if order_field != "name" and order_field != "quantity":
+            order_field, order_type = None, None
+
+        return await self.product_repository.search_products(
+            order_field, order_type, name, id, min_quantity, max_quantity, unit_id, page_size, page_token, summary
+        )
+
+
+    async def sell_product(self, product_id: str, quantity_to_sell: int, unit_id: Optional[str] = None) -> Product:
+        """
+        Sell a product by validating and updating it, see ProductService.sell_product().
+
+        Raises:
+            ProductNotFoundByIdError: If the product does not exist.
+            InsufficientProductQuantity: If there are not enough items or `quantity_to_sell` is negative.
+            ValueError: If the product's record in the database is missing required attributes.
+        """
+        if quantity_to_sell < 0:
+            raise InsufficientProductQuantity(product_id, str(quantity_to_sell))
+
+        if unit_id is None:
+            updated_product = await self.product_repository.sell_product(product_id, quantity_to_sell)
+        else:
+            updated_product = await self.product_repository.sell_products_from_unit(
+                product_id, quantity_to_sell, None, unit_id
+            )
+
+        if updated_product is None:
+            if not await self.product_repository.product_exists(product_id, unit_id):
+                raise ProductNotFoundByIdError(product_id)
+            raise InsufficientProductQuantity(product_id, str(quantity_to_sell))
+
+        # the sold items no longer take up space in the unit
+        await self.unit_repository.increment_occupied_volume(
+            updated_product.unit_id, -quantity_to_sell * float(updated_product.volume)
+        )
+
+        return updated_product
+
+
+    async def sell_products(
+        self,
+        lines: List[Tuple[str, int]],
+        unit_id: Optional[str] = None,
+        all_or_nothing: bool = False
+    ) -> List[LineResult]:
+        """
+        Sell many products at once with a single bulk write, see ProductService.sell_products().
+
+        Returns:
+            List[LineResult]: The result of every line, in the order of `lines`.
+        """
+        results: List[LineResult]        = [LineResult(p, q, applied=False) for p, q in lines]
+        valid: List[int]                 = []
+        requested: Dict[str, int]        = {}
+        volume_to_free: Dict[str, float] = {}
+
+        for i, (product_id, quantity_to_sell) in enumerate(lines):
+            if quantity_to_sell <= 0:
+                results[i].error = InsufficientProductQuantity(product_id, str(quantity_to_sell))
+                continue
+            valid.append(i)
+            requested[product_id] = requested.get(product_id, 0) + quantity_to_sell
+
+        if all_or_nothing and len(valid) != len(lines):
+            return results
+
+        applied = await self.product_repository.sell_products(
+            [lines[i] for i in valid], unit_id, all_or_nothing
+        )
+        products = {
+            p["id"]: p for p in await self.product_repository.get_storage_info_by_ids(list(requested), unit_id)
+        }
+
+        for i, is_applied in zip(valid, applied):
+            product_id, quantity_to_sell = lines[i]
+            product = products.get(product_id)
+
+            if product is None:
+                results[i].error = ProductNotFoundByIdError(product_id)
+            elif is_applied:
+                results[i].applied = True
+                volume = quantity_to_sell * float(product["volume"])
+                volume_to_free[product["unit_id"]] = volume_to_free.get(product["unit_id"], 0) + volume
+            elif not all_or_nothing or requested[product_id] > product["quantity"]:
+                # when the whole basket was rolled back, only blame the lines without enough items
+                results[i].error = InsufficientProductQuantity(product_id, str(quantity_to_sell))
+
+        # the sold items no longer take up space in their units
+        await asyncio.gather(*(
+            self.unit_repository.increment_occupied_volume(sold_unit_id, -volume)
+            for sold_unit_id, volume in volume_to_free.items()
+        ))
+
+        return results
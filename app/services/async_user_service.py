@@ -0,0 +1,73 @@
+import asyncio
+from typing import Optional
+from app.exceptions.exceptions import UnitNotFoundByIdError, UserNotFoundByCredentialsError, UserNotFoundByIdError
+from app.model.user import User
+from app.repositories.async_user_repository import AsyncUserRepository
+from app.services.user_service import UserService
+from app.utils.password_utils import PasswordHasher, get_password_hasher
+
+
+class AsyncUserService:
+    """
+    The asyncio version of the login and of the identity lookup of UserService.
+
+    The passwords are hashed in a thread, so scrypt does not block the event loop.
+    """
+    user_repository: AsyncUserRepository
+    password_hasher: PasswordHasher
+
+    def __init__(self, user_repository: AsyncUserRepository, password_hasher: Optional[PasswordHasher] = None) -> None:
+        self.user_repository = user_repository
+        self.password_hasher = password_hasher or get_password_hasher()
+
+
+    async def get_user_with_unit_name(self, id: str) -> User:
+        """
+        Get a User instance from the DB by ID, with its `unit_name`, see UserService.get_user_with_unit_name().
+
+        Raises:
+            UserNotFoundByIdError: If the user does not exist.
+            UnitNotFoundByIdError: If the user is assigned to a unit that does not exist.
+            ValueError: If the user record is missing required attributes or has an invalid role.
+        """
+        user: Optional[User] = await self.user_repository.get_user_with_unit_name(id)
+
+        if user is None:
+            raise UserNotFoundByIdError(id)
+
+        # admins are not assigned to any unit
+        if user.unit_id and user.unit_name is None:
+            raise UnitNotFoundByIdError(user.unit_id)
+
+        return UserService._get_user_subclass(user)
+
+
+    async def get_user(self, username: str, password: str, unit_id: Optional[str] = None) -> User:
+        """
+        Get a User instance from the DB by their credentials, see UserService.get_user().
+
+        Raises:
+            UserNotFoundByCredentialsError: If the user does not exist or the password is wrong.
+            UnitNotFoundByIdError: If the unit does not exist.
+            ValueError: If the user record is missing required attributes or has an invalid role.
+        """
+        user = await self.user_repository.get_user_by_username(username, unit_id)
+
+        if user is None or not await asyncio.to_thread(self.password_hasher.verify, password, user.password):
+            raise UserNotFoundByCredentialsError(username, unit_id)
+
+        # the new hash is computed in the thread of the hasher and saved from the event loop
+        loop    = asyncio.get_running_loop()
+        user_id = user.id
+        self.password_hasher.rehash_in_background(
+            password, user.password,
+            lambda old_hash, new_hash: asyncio.run_coroutine_threadsafe(
+                self.user_repository.update_password_hash(user_id, old_hash, new_hash), loop
+            ).result(),
+        )
+
+        # the unit name is read with the user, it is None if the unit does not exist
+        if unit_id is not None and user.unit_name is None:
+            raise UnitNotFoundByIdError(unit_id)
+
+        return UserService._get_user_subclass(user)
@@ -1,3 +1,4 @@
+from functools import partial
 from typing import List, Optional
 from pymongo.results import InsertOneResult
 from app.exceptions.exceptions import UnitNotFoundByIdError, UserNotFoundByCredentialsError, UserNotFoundByIdError
@@ -6,18 +7,27 @@ from app.model.unit import Unit
 from app.repositories.employee_repository import EmployeeRepository
 from app.repositories.unit_repository import UnitRepository
 from app.repositories.user_repository import UserRepository
+from app.utils.password_utils import PasswordHasher, get_password_hasher
 
 
 class EmployeeService():
     user_repository: UserRepository
     employee_repository: EmployeeRepository
     unit_repository: UnitRepository
+    password_hasher: PasswordHasher
 
 
-    def __init__(self, user_repository: UserRepository, employee_repository: EmployeeRepository, unit_repo: UnitRepository):
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        employee_repository: EmployeeRepository,
+        unit_repo: UnitRepository,
+        password_hasher: Optional[PasswordHasher] = None
+    ):
         self.user_repository     = user_repository
         self.employee_repository = employee_repository
         self.unit_repository     = unit_repo
+        self.password_hasher     = password_hasher or get_password_hasher()
 
 
     def insert_employee(
@@ -63,6 +73,7 @@ class EmployeeService():
             unit_id   = unit_id,
             unit_name = None
         )
+        employee.password = self.password_hasher.hash(password)
         return self.employee_repository.insert_employee(employee)
 
 
@@ -115,7 +126,7 @@ class EmployeeService():
         Get an Employee instance from the DB by their credentials.
 
         This method:
-        1) Retrieves the employee and the employee's unit records from the repository.
+        1) Retrieves the employee by `username`, verifies `password` and retrieves the employee's unit.
         2) Enriches the employee object by setting its `unit_name`.
 
         Args:
@@ -128,18 +139,24 @@ class EmployeeService():
             of the employee identified by `id`.
 
         Raises:
-            UserNotFoundByCredentialsError: If the employee does not exist.
+            UserNotFoundByCredentialsError: If the employee does not exist or the password is wrong.
             UnitNotFoundByIdError: If the unit does not exist.
             ValueError: If the employee record is missing required attributes
                 (see EmployeeRepository.get_employee_by_id()).
         """
         # retrieve Employee object
         # unit_name is not saved in DB, it is None
-        employee = self.employee_repository.get_employee(username, password, unit_id)
-        unit     = self.unit_repository.get_unit_by_id(unit_id)
+        employee = self.employee_repository.get_employee_by_username(username, unit_id)
 
-        if employee is None:
+        if employee is None or not self.password_hasher.verify(password, employee.password):
             raise UserNotFoundByCredentialsError(username, unit_id)
+
+        self.password_hasher.rehash_in_background(
+            password, employee.password, partial(self.user_repository.update_password_hash, employee.id)
+        )
+
+        unit = self.unit_repository.get_unit_by_id(unit_id)
+
         if unit is None:
             raise UnitNotFoundByIdError(unit_id)
 
@@ -1,19 +1,33 @@
-from typing import List, Literal, Optional
+import math
+from typing import Dict, List, Literal, Optional, Set, Tuple
 from pymongo.results import InsertManyResult, InsertOneResult
 from app.exceptions.exceptions import InsufficientProductQuantity, ProductDoesNotFitInUnit, ProductNotFoundByIdError, UnitNotFoundByIdError
+from app.model.line_result import LineResult
+from app.model.page import Page
 from app.model.product import Product
+from app.model.product_snapshot import ProductSnapshot
 from app.model.unit import Unit
+from app.model.unit_stats import UnitStats
 from app.repositories.unit_repository import UnitRepository
 from app.repositories.product_repository import ProductRepository
+from app.repositories.unit_stats_repository import UnitStatsRepository
+from app.utils.pagination_utils import validate_page_size
 
 
 class ProductService:
     product_repository: ProductRepository
     unit_repository: UnitRepository
+    unit_stats_repository: Optional[UnitStatsRepository]
 
-    def __init__(self, product_repository: ProductRepository, unit_repository: UnitRepository):
+    def __init__(
+        self,
+        product_repository: ProductRepository,
+        unit_repository: UnitRepository,
+        unit_stats_repository: Optional[UnitStatsRepository] = None
+    ):
         self.product_repository = product_repository
         self.unit_repository = unit_repository
+        self.unit_stats_repository = unit_stats_repository
 
 
     def get_product_by_id(self, id: str, unit_id: Optional[str] = None) -> Product:
@@ -54,43 +68,66 @@ class ProductService:
         return product
 
 
-    def get_products(self) -> List[Product]:
+    def get_products(
+        self, page_size: Optional[int] = None, page_token: Optional[str] = None, summary: bool = False
+    ) -> Page:
         """
-        Get all the products in the database.
+        Get one page of all the products in the database.
+
+        Args:
+            page_size (int | None): The maximum number of products of the page.
+                If None DEFAULT_PAGE_SIZE is used.
+            page_token (str | None): The next_page_token of the previous page.
+                If None the first page is returned.
+            summary (bool): If True the page contains ProductSummary instances.
 
         Returns:
-            List[Product]: A list of Product instances of all the products inside the database.
+            Page: A page of Product (or ProductSummary) instances.
 
         Raises:
-            ValueError: If the product record is missing required attributes
+            ValueError: If the page size or token are invalid (see validate_page_size())
+                or the product record is missing required attributes
                 (see ProductRepository.from_dict()).
         """
-        return self.product_repository.get_products()
+        return self.product_repository.get_products(validate_page_size(page_size), page_token, summary)
 
 
-    def get_products_from_unit(self, unit_id: str) -> List[Product]:
+    def get_products_from_unit(
+        self,
+        unit_id: str,
+        page_size: Optional[int] = None,
+        page_token: Optional[str] = None,
+        summary: bool = False
+    ) -> Page:
         """
-        Get all the products inside the unit identified by `unit_id`.
+        Get one page of the products inside the unit identified by `unit_id`.
 
         Args:
             unit_id (str): The id of the unit from which to get the products from.
+            page_size (int | None): The maximum number of products of the page.
+                If None DEFAULT_PAGE_SIZE is used.
+            page_token (str | None): The next_page_token of the previous page.
+                If None the first page is returned.
+            summary (bool): If True the page contains ProductSummary instances.
 
         Returns:
-            List[Product]: A list of Product instances of all the products inside the unit
+            Page: A page of Product (or ProductSummary) instances of the products inside the unit
                 identified by `unit_id`.
 
         Raises:
             UnitNotFoundByIdError: If the unit does not exist.
-            ValueError: If the product record is missing required attributes
+            ValueError: If the page size or token are invalid (see validate_page_size())
+                or the product record is missing required attributes
                 (see ProductRepository.get_products_from_unit()).
         """
+        page_size = validate_page_size(page_size)
 
         unit: Optional[Unit] = self.unit_repository.get_unit_by_id(unit_id)
 
         if unit is None:
             raise UnitNotFoundByIdError(unit_id)
 
-        return self.product_repository.get_products_from_unit(unit_id)
+        return self.product_repository.get_products_from_unit(unit_id, page_size, page_token, summary)
 
 
     def _insert_product_to_unit(
@@ -242,42 +279,216 @@ class ProductService:
         return result
 
 
-    def _does_product_fit_in_unit(self, unit_id: str, product_quantity: int, product_volume: float) -> bool:
+    def _reserve_space_in_unit(self, unit_id: str, volume: float) -> bool:
         """
-        Checks if a product can fit in the unit that is associated by `unit_id`
+        Reserves `volume` in the unit that is associated by `unit_id`
 
-        This method gets the total volume of the unit associated by `unit_id`.
-        It then gets information about how much storage each product of the unit takes up
-        and subtracts it from the total volume.
-        If the remainder is enough to store the product with `product_quantity` and `product_volume`
-        the product can be placed inside the unit.
+        The free space of the unit is checked and its `occupied_volume` is increased
+        in a single conditional update (see UnitRepository.reserve_volume()),
+        so two requests can never both fill the same free space.
+        If the product cannot be stored after all, the caller must release the space
+        with UnitRepository.increment_occupied_volume() and a negative volume.
 
         Args:
-        unit_id (str): The ID of the unit to check if a product fits in it
-        product_quantity (int): The number of items of the product to insert in the unit.
-        product_volume (float): The volume of one item of the product to insert to the unit.
+        unit_id (str): The ID of the unit to reserve space in.
+        volume (float): The volume to reserve, the quantity of the items to store times their volume.
 
         Returns:
-            bool: True if there is space in the unit for the product, False otherwise
+            bool: True if the space was reserved, False if there is not enough space in the unit.
 
         Raises:
             UnitNotFoundByIdError: If no unit with the given `unit_id` exists.
         """
-        free_space: float
-        used_space: float
-        unit: Optional[Unit] = self.unit_repository.get_unit_by_id(unit_id)
+        if self.unit_repository.reserve_volume(unit_id, volume):
+            return True
 
-        # no unit with unit_id was found
-        if unit is None:
+        # the reservation failed, find out why
+        if self.unit_repository.get_unit_by_id(unit_id) is None:
             raise UnitNotFoundByIdError(unit_id)
 
-        # get storage information for all the products in the unit
-        products = self.product_repository.get_quantity_and_volume_by_unit(unit_id)
+        return False
+
+
+    def reconcile_occupied_volume(self, dry_run: bool = False) -> List[dict]:
+        """
+        Recompute the `occupied_volume` of every unit from its products.
+
+        The `occupied_volume` of a unit is updated separately from its products,
+        so it can drift if a request fails between the two writes.
+        This method calculates the actual occupied volume of every unit
+        and overwrites the stored value if they differ.
+
+        Args:
+            dry_run (bool): If True only report the drift without fixing it.
+
+        Returns:
+            List[dict]: One dictionary for each unit whose stored value was wrong, with keys:
+            - `unit_id`
+            - `stored`: The `occupied_volume` stored in the unit.
+            - `actual`: The volume the products of the unit actually occupy.
+        """
+        drift: List[dict] = []
+        occupied_volumes  = self.product_repository.get_occupied_volume_by_unit()
+
+        for unit in self.unit_repository.get_all_units():
+            actual = float(occupied_volumes.get(unit.id, 0))
+            stored = float(unit.occupied_volume)
+
+            if math.isclose(stored, actual, abs_tol=1e-9):
+                continue
+
+            drift.append({"unit_id": unit.id, "stored": stored, "actual": actual})
+
+            if not dry_run:
+                self.unit_repository.set_occupied_volume(unit.id, actual)
+
+        return drift
+
+
+    def backfill_occupied_volume(self) -> List[dict]:
+        """
+        Compute the `occupied_volume` of the units that do not have one from their products,
+        e.g. the units of a database created before it was kept. Run by app.bootstrap.
+
+        Until then the capacity check refuses to store products in these units
+        and their sales do not change it (see UnitRepository.reserve_volume()).
+
+        Returns:
+            List[dict]: One dictionary for each backfilled unit, with keys:
+            - `unit_id`
+            - `actual`: The volume the products of the unit actually occupy.
+        """
+        unit_ids = self.unit_repository.get_unit_ids_without_occupied_volume()
+        if not unit_ids:
+            return []
+
+        backfilled: List[dict] = []
+        occupied_volumes       = self.product_repository.get_occupied_volume_by_unit()
 
-        used_space = sum(p["quantity"] * p["volume"] for p in products)
-        free_space = float(unit.volume) - used_space
+        for unit_id in unit_ids:
+            actual = float(occupied_volumes.get(unit_id, 0))
+            if self.unit_repository.backfill_occupied_volume(unit_id, actual):
+                backfilled.append({"unit_id": unit_id, "actual": actual})
 
-        return free_space >= product_quantity * product_volume
+        return backfilled
+
+
+    def get_unit_stats(self, unit_id: str) -> UnitStats:
+        """
+        Get the counters of a unit (see UnitStats), with one point read of `unit_stats`.
+
+        Args:
+            unit_id (str): The ID of the unit.
+
+        Returns:
+            UnitStats: The counters of the unit, all 0 if it has no document
+                (none of its products has been written).
+
+        Raises:
+            ValueError: If there is no `unit_stats_repository`.
+        """
+        if self.unit_stats_repository is None:
+            raise ValueError("The unit stats are not maintained.")
+
+        return self.unit_stats_repository.get_unit_stats(unit_id) or UnitStats(unit_id)
+
+
+    def reconcile_unit_stats(self, dry_run: bool = False) -> List[dict]:
+        """
+        Recompute the counters of `unit_stats` of every unit from its products.
+
+        The counters are incremented after the writes of the products, outside their transaction
+        unless ProductRepository.stats_transactions is True, so they can drift if a request fails
+        between the two writes, or if the products are changed by something else than ProductRepository.
+        The increments of the writes that run while the products are aggregated can be
+        overwritten, check again on a quiet database to be sure.
+
+        Args:
+            dry_run (bool): If True only report the drift without fixing it.
+
+        Returns:
+            List[dict]: One dictionary for each unit whose counters were wrong, with keys:
+            - `unit_id`
+            - `stored`: The stored counters, None if the unit had no document.
+            - `actual`: The counters computed from the products of the unit.
+
+        Raises:
+            ValueError: If there is no `unit_stats_repository`.
+        """
+        if self.unit_stats_repository is None:
+            raise ValueError("The unit stats are not maintained.")
+
+        drift: List[dict] = []
+        actual_stats      = self.product_repository.get_unit_stats_by_unit()
+        stored_stats      = {stats.unit_id: stats for stats in self.unit_stats_repository.get_all_unit_stats()}
+        unit_ids          = [unit.id for unit in self.unit_repository.get_all_units()]
+
+        for unit_id in dict.fromkeys([*unit_ids, *actual_stats, *stored_stats]):
+            actual = actual_stats.get(unit_id, UnitStats(unit_id))
+            stored = stored_stats.get(unit_id)
+
+            if stored is not None and stored.matches(actual):
+                continue
+            # a unit without products nor document is not a drift
+            if stored is None and actual.matches(UnitStats(unit_id)):
+                continue
+
+            drift.append({
+                "unit_id": unit_id,
+                "stored": stored.counters() if stored is not None else None,
+                "actual": actual.counters(),
+            })
+
+            if not dry_run:
+                self.unit_stats_repository.set_unit_stats(actual)
+
+        return drift
+
+
+    def backfill_unit_stats(self) -> List[dict]:
+        """
+        Rebuild `unit_stats` if a unit with products has no document, e.g. on a database
+        created before the counters were kept, where the first $inc upsert of a unit
+        would store only the change of that write. Run by app.bootstrap.
+
+        Returns:
+            List[dict]: The drift fixed by reconcile_unit_stats(), empty if every unit with products
+                has a document or if there is no `unit_stats_repository`.
+        """
+        if self.unit_stats_repository is None:
+            return []
+
+        stored_unit_ids = {stats.unit_id for stats in self.unit_stats_repository.get_all_unit_stats()}
+        missing         = any(
+            self.product_repository.unit_has_products(unit_id)
+            for unit_id in self.unit_repository.get_all_units_ids()
+            if unit_id not in stored_unit_ids
+        )
+        if not missing:
+            return []
+
+        return self.reconcile_unit_stats()
+
+
+    def get_product_snapshot(self, unit_id: Optional[str] = None) -> ProductSnapshot:
+        """
+        Load a ProductSnapshot of the products (of a unit) for the reports over many products.
+
+        Args:
+            unit_id (str | None): The ID of the unit of the products. If None all products are loaded.
+
+        Returns:
+            ProductSnapshot: The columns of the products.
+
+        Raises:
+            UnitNotFoundByIdError: If `unit_id` is specified and no unit exists with that ID.
+            ValueError: If a product record is missing a field of the snapshot
+                (see ProductRepository.get_snapshot()).
+        """
+        if unit_id is not None and self.unit_repository.get_unit_by_id(unit_id) is None:
+            raise UnitNotFoundByIdError(unit_id)
+
+        return self.product_repository.get_snapshot(unit_id)
 
 
     def insert_product(
@@ -327,23 +538,31 @@ class ProductService:
         """
 
         if unit_id is not None:
-            if not self._does_product_fit_in_unit(unit_id, int(quantity), float(volume)):
+            volume_needed = int(quantity) * float(volume)
+
+            if not self._reserve_space_in_unit(unit_id, volume_needed):
                 raise ValueError(f"Product with id={id} does not fit in unit")
 
-            result = self._insert_product_to_unit(
-                id,
-                name,
-                quantity,
-                sold_quantity,
-                weight,
-                volume,
-                category,
-                purchase_price,
-                selling_price,
-                manufacturer,
-                unit_gain,
-                unit_id,
-            )
+            try:
+                result = self._insert_product_to_unit(
+                    id,
+                    name,
+                    quantity,
+                    sold_quantity,
+                    weight,
+                    volume,
+                    category,
+                    purchase_price,
+                    selling_price,
+                    manufacturer,
+                    unit_gain,
+                    unit_id,
+                )
+            except Exception:
+                # the product was not stored, free the reserved space
+                self.unit_repository.increment_occupied_volume(unit_id, -volume_needed)
+                raise
+
             return result
 
         result = self._insert_product_to_all_units(
@@ -369,10 +588,13 @@ class ProductService:
         id: Optional[str],
         min_quantity: Optional[int],
         max_quantity: Optional[int],
-        unit_id: Optional[str]
-    ) -> List[Product]:
+        unit_id: Optional[str],
+        page_size: Optional[int] = None,
+        page_token: Optional[str] = None,
+        summary: bool = False
+    ) -> Page:
         """
-        Search the database and order results.
+        Search the database and order results, one page at a time.
 
         This method can search for products based on `name`, `id`,
         or quantity range ([`min_quantity`, `max_quantity`]).
@@ -387,13 +609,21 @@ class ProductService:
             min_quantity (int | None): The minimum product quantity in the database.
             max_quantity (int | None): The maximum product quantity in the database.
             unit_id (str | None): The id of the unit to search. If None all units are searched.
+            page_size (int | None): The maximum number of products of the page.
+                If None DEFAULT_PAGE_SIZE is used.
+            page_token (str | None): The next_page_token of the previous page of the same search.
+                If None the first page is returned.
+            summary (bool): If True the page contains ProductSummary instances.
 
         Returns:
-            List[Product]: List of products that match the search query, sorted if requested.
+            Page: A page of the products (or their ProductSummary) that match the search query,
+                sorted if requested.
 
         Raises:
-            ValueError: If min_quantity or max_quantity are negative or if min_quantity > max_quantity.
+            ValueError: If min_quantity or max_quantity are negative or if min_quantity > max_quantity,
+                or if the page size or token are invalid.
         """
+        page_size = validate_page_size(page_size)
 
         if min_quantity is not None and max_quantity is not None:
             # are indexes valid?
@@ -402,10 +632,10 @@ class ProductService:
 
         # is order_field valid?
         if order_field != "name" and order_field != "quantity":
-            return  self.product_repository.search_products(None, None, name, id, min_quantity, max_quantity, unit_id)
+            return  self.product_repository.search_products(None, None, name, id, min_quantity, max_quantity, unit_id, page_size, page_token, summary)
 
         # No need to check order_type, ascending is default unless descending is specified
-        return self.product_repository.search_products(order_field, order_type, name, id, min_quantity, max_quantity, unit_id) 
+        return self.product_repository.search_products(order_field, order_type, name, id, min_quantity, max_quantity, unit_id, page_size, page_token, summary)
 
 #####################################################################################################
 
@@ -419,9 +649,16 @@ class ProductService:
         Buy a product and update it to the database
 
         This method fetches the database for the product identified by `product_id`.
-        It then decreases the unit_gain (balance) and increases the quantity of the product
+        It then reserves space for the purchased items in the product's unit
+        and decreases the unit_gain (balance) and increases the quantity of the product
         based on the `purchased_quantity`.
 
+        The capacity check and the reservation happen in a single conditional update
+        (see ProductService._reserve_space_in_unit()), so concurrent purchases
+        cannot overfill a unit.
+        The product is only read for its `unit_id`, `volume` and `purchase_price`,
+        which never change after the product is inserted.
+
         Args:
             product_id (str): The id of the product to buy.
             purchased_quantity (int): The quantity of items of the product to be purchased.
@@ -432,18 +669,21 @@ class ProductService:
         Raises:
             ProductNotFoundByIdError: If no product exists with the given `product_id`
             ProductDoesNotFitInUnit: If there is no space for the product in the unit it is in.
+            UnitNotFoundByIdError: If the unit of the product does not exist.
             ValueError: If the product could not be updated
         """
         unit_id: str
         loss: float
+        volume_needed: float
         product: Optional[Product] = self.product_repository.get_product_by_id(product_id)
 
         if product is None:
             raise ProductNotFoundByIdError(product_id)
 
-        unit_id = product.unit_id
+        unit_id       = product.unit_id
+        volume_needed = int(purchased_quantity) * float(product.volume)
 
-        if not self._does_product_fit_in_unit(unit_id, int(purchased_quantity), float(product.volume)):
+        if not self._reserve_space_in_unit(unit_id, volume_needed):
             raise ProductDoesNotFitInUnit(product_id, unit_id)
 
         # loss MUST BE NEGATIVE because of $inc in the following query
@@ -454,12 +694,110 @@ class ProductService:
             updated_product = self.product_repository.buy_product(
                 product_id, purchased_quantity, loss
             )
-        except ValueError as e:
-            raise ValueError(f"Could not buy product") from e
+        except Exception as e:
+            # the items were not added, free the reserved space
+            self.unit_repository.increment_occupied_volume(unit_id, -volume_needed)
+            if isinstance(e, ValueError):
+                raise ValueError(f"Could not buy product") from e
+            raise
 
         return updated_product
 
 
+    def buy_products(self, lines: List[Tuple[str, int]]) -> List[LineResult]:
+        """
+        Buy many products at once, for example to restock units from a delivery.
+
+        Instead of checking the free space of a unit for every line like ProductService.buy_product(),
+        this method:
+        1. Reads the `unit_id`, `volume` and `purchase_price` of all the products with one query.
+        2. Groups the lines by unit and reserves their combined volume
+           in each unit with one conditional update (see ProductService._reserve_space_in_unit()).
+        3. Updates the products of every unit that had enough space with one bulk write per unit.
+           If some updates matched no product (it was deleted after step 1) the products
+           are read again, and the space reserved for their lines is freed.
+
+        Args:
+            lines (List[Tuple[str, int]]): Pairs of (`product_id`, `purchased_quantity`).
+
+        Returns:
+            List[LineResult]: The result of every line, in the order of `lines`.
+            A line that failed has its `error` set to:
+            - ValueError: If the quantity is negative.
+            - ProductNotFoundByIdError: If the product does not exist.
+            - UnitNotFoundByIdError: If the unit of the product does not exist.
+            - ProductDoesNotFitInUnit: If the lines of the product's unit
+              do not fit in the unit all together. No line of that unit is applied.
+
+        Raises:
+            PyMongoError: If the bulk write of a unit fails, after the space reserved
+                for its lines is freed. The lines of the previous units are applied.
+        """
+        results: List[LineResult]           = [LineResult(p, q, applied=False) for p, q in lines]
+        lines_by_unit: Dict[str, List[int]] = {}
+
+        products = {
+            p["id"]: p for p in self.product_repository.get_storage_info_by_ids([p for p, _ in lines])
+        }
+
+        for i, (product_id, purchased_quantity) in enumerate(lines):
+            if purchased_quantity < 0:
+                results[i].error = ValueError(f"Cannot buy {purchased_quantity} items of product with id={product_id}.")
+            elif product_id not in products:
+                results[i].error = ProductNotFoundByIdError(product_id)
+            else:
+                lines_by_unit.setdefault(products[product_id]["unit_id"], []).append(i)
+
+        for unit_id, unit_lines in lines_by_unit.items():
+            volume_needed = sum(
+                lines[i][1] * float(products[lines[i][0]]["volume"]) for i in unit_lines
+            )
+
+            try:
+                fits = self._reserve_space_in_unit(unit_id, volume_needed)
+            except UnitNotFoundByIdError as e:
+                for i in unit_lines:
+                    results[i].error = e
+                continue
+
+            if not fits:
+                for i in unit_lines:
+                    results[i].error = ProductDoesNotFitInUnit(lines[i][0], unit_id)
+                continue
+
+            # loss MUST BE NEGATIVE because of $inc
+            try:
+                result = self.product_repository.buy_products([
+                    (
+                        lines[i][0],
+                        lines[i][1],
+                        - float(products[lines[i][0]]["purchase_price"]) * lines[i][1],
+                    )
+                    for i in unit_lines
+                ])
+            except Exception:
+                # the items were not added, free the reserved space
+                self.unit_repository.increment_occupied_volume(unit_id, -volume_needed)
+                raise
+
+            missing: Set[str] = set()
+            if result.matched_count != len(unit_lines):
+                # the products deleted since they were read matched no update
+                found   = self.product_repository.get_storage_info_by_ids([lines[i][0] for i in unit_lines], unit_id)
+                missing = {lines[i][0] for i in unit_lines} - {p["id"] for p in found}
+                self.unit_repository.increment_occupied_volume(unit_id, -sum(
+                    lines[i][1] * float(products[lines[i][0]]["volume"]) for i in unit_lines if lines[i][0] in missing
+                ))
+
+            for i in unit_lines:
+                if lines[i][0] in missing:
+                    results[i].error = ProductNotFoundByIdError(lines[i][0])
+                else:
+                    results[i].applied = True
+
+        return results
+
+
     def sell_product(
         self,
         product_id: str,
@@ -470,9 +808,11 @@ class ProductService:
         Sell a product by validating and updating it.
 
         This service method:
-        1. Checks that the product exists.
-        2. Calculates the profit for the given quantity to sell.
-        3. Calls repository to update the product.
+        1. Validates the quantity to sell.
+        2. Calls repository to update the product. The profit is calculated
+           by the database from the stored prices, so the product is not read first.
+        3. If nothing was updated, checks whether the product exists
+           to report the correct error.
 
         Args:
             product_id (str): The ID of the product to sell.
@@ -491,28 +831,104 @@ class ProductService:
             ValueError: If the product's record in the database is missing required attributes
                 (see ProductRepository.sell_product() for more details).
         """
-        profit: float
-        product: Optional[Product] = self.product_repository.get_product_by_id(product_id)
-
-        if product is None:
-            raise ProductNotFoundByIdError(f"Product with id={product_id} does not exist.")
-
         if quantity_to_sell < 0:
             raise InsufficientProductQuantity(product_id, str(quantity_to_sell))
 
-        profit = product.calculate_profit(quantity_to_sell)
-
         # This might throw value error
         if unit_id is None:
             updated_product = self.product_repository.sell_product(
-                product_id, quantity_to_sell, profit
+                product_id, quantity_to_sell
             )
         else:
             updated_product = self.product_repository.sell_products_from_unit(
-                product_id, quantity_to_sell, profit, unit_id
+                product_id, quantity_to_sell, None, unit_id
             )
 
         if updated_product is None:
+            if not self.product_repository.product_exists(product_id, unit_id):
+                raise ProductNotFoundByIdError(product_id)
             raise InsufficientProductQuantity(product_id, str(quantity_to_sell))
 
+        # the sold items no longer take up space in the unit
+        self.unit_repository.increment_occupied_volume(
+            updated_product.unit_id, -quantity_to_sell * float(updated_product.volume)
+        )
+
         return updated_product
+
+
+    def sell_products(
+        self,
+        lines: List[Tuple[str, int]],
+        unit_id: Optional[str] = None,
+        all_or_nothing: bool = False
+    ) -> List[LineResult]:
+        """
+        Sell many products at once, for example a point-of-sale basket.
+
+        All the lines are sold with a single bulk write
+        (see ProductRepository.sell_products()) instead of one sale per line.
+
+        This service method:
+        1. Rejects lines without a positive quantity.
+        2. Sells the remaining lines in one bulk write.
+        3. Reads the `unit_id`, `quantity` and `volume` of the products of the basket
+           to free the space of the sold items and to tell missing products
+           apart from products without enough items.
+
+        Args:
+            lines (List[Tuple[str, int]]): Pairs of (`product_id`, `quantity_to_sell`).
+            unit_id (str | None): The id of the unit were the products are stored.
+                If None the method will try to find the products in all units.
+            all_or_nothing (bool): If True either every line is sold or none.
+
+        Returns:
+            List[LineResult]: The result of every line, in the order of `lines`.
+            A line that failed has its `error` set to:
+            - ProductNotFoundByIdError: If the product does not exist.
+            - InsufficientProductQuantity: If there are not enough items of the product
+              or the quantity is not positive.
+            If `all_or_nothing` is True and any line failed, no line is applied
+            and the lines that did not fail have no error.
+        """
+        results: List[LineResult]        = [LineResult(p, q, applied=False) for p, q in lines]
+        valid: List[int]                 = []
+        requested: Dict[str, int]        = {}
+        volume_to_free: Dict[str, float] = {}
+
+        for i, (product_id, quantity_to_sell) in enumerate(lines):
+            if quantity_to_sell <= 0:
+                results[i].error = InsufficientProductQuantity(product_id, str(quantity_to_sell))
+                continue
+            valid.append(i)
+            requested[product_id] = requested.get(product_id, 0) + quantity_to_sell
+
+        if all_or_nothing and len(valid) != len(lines):
+            return results
+
+        applied = self.product_repository.sell_products(
+            [lines[i] for i in valid], unit_id, all_or_nothing
+        )
+        products = {
+            p["id"]: p for p in self.product_repository.get_storage_info_by_ids(list(requested), unit_id)
+        }
+
+        for i, is_applied in zip(valid, applied):
+            product_id, quantity_to_sell = lines[i]
+            product = products.get(product_id)
+
+            if product is None:
+                results[i].error = ProductNotFoundByIdError(product_id)
+            elif is_applied:
+                results[i].applied = True
+                volume = quantity_to_sell * float(product["volume"])
+                volume_to_free[product["unit_id"]] = volume_to_free.get(product["unit_id"], 0) + volume
+            elif not all_or_nothing or requested[product_id] > product["quantity"]:
+                # when the whole basket was rolled back, only blame the lines without enough items
+                results[i].error = InsufficientProductQuantity(product_id, str(quantity_to_sell))
+
+        # the sold items no longer take up space in their units
+        for sold_unit_id, volume in volume_to_free.items():
+            self.unit_repository.increment_occupied_volume(sold_unit_id, -volume)
+
+        return results
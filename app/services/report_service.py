@@ -0,0 +1,145 @@
+from typing import Callable, Dict, List, Optional
+from app.exceptions.exceptions import UnitNotFoundByIdError
+from app.repositories.report_repository import ReportRepository
+from app.repositories.unit_repository import UnitRepository
+from app.utils.ttl_cache import TTLCache
+
+
+# the most products a top sellers report returns
+MAX_TOP_SELLERS         = 100
+TOP_SELLERS_LIMIT_ERROR = f"The number of top sellers must be between 1 and {MAX_TOP_SELLERS}."
+
+
+class ReportService:
+    """
+    The reports over the products, computed by the aggregations of ReportRepository.
+
+    With a `cache` every report is kept for the `ttl` of the cache, by report and arguments,
+    so a dashboard refreshed by many admins runs each aggregation once per `ttl`.
+    A cached report does not show the sales of the last `ttl` seconds.
+    """
+    report_repository: ReportRepository
+    unit_repository: UnitRepository
+    cache: Optional[TTLCache]
+
+    def __init__(
+        self,
+        report_repository: ReportRepository,
+        unit_repository: UnitRepository,
+        cache: Optional[TTLCache] = None
+    ):
+        self.report_repository = report_repository
+        self.unit_repository   = unit_repository
+        self.cache             = cache
+
+
+    def _report(self, name: str, unit_id: Optional[str], run: Callable[[], List[dict]], *args) -> List[dict]:
+        """
+        Run the report `name` of `unit_id`, or return it from the cache.
+
+        Raises:
+            UnitNotFoundByIdError: If `unit_id` is specified and no unit exists with that ID.
+        """
+        key = (name, unit_id, *args)
+        if self.cache is not None:
+            found, report = self.cache.get(key)
+            if found:
+                return report
+
+        if unit_id is not None and self.unit_repository.get_unit_by_id(unit_id) is None:
+            raise UnitNotFoundByIdError(unit_id)
+
+        report = run()
+        if self.cache is not None:
+            self.cache.put(key, report)
+
+        return report
+
+
+    def get_gain_by_unit(self, unit_id: Optional[str] = None) -> List[dict]:
+        """
+        Get the total `unit_gain` and `sold_quantity` of each unit.
+
+        Args:
+            unit_id (str | None): The unit to report. If None every unit with products is reported.
+
+        Returns:
+            List[dict]: See ReportRepository.get_gain_by_unit().
+
+        Raises:
+            UnitNotFoundByIdError: If `unit_id` is specified and no unit exists with that ID.
+        """
+        return self._report("gain_by_unit", unit_id, lambda: self.report_repository.get_gain_by_unit(unit_id))
+
+
+    def get_margin_by_category(self, unit_id: Optional[str] = None) -> List[dict]:
+        """
+        Get the revenue, the cost and the margin of the sold products of each category.
+
+        Args:
+            unit_id (str | None): The unit of the products. If None the products of every unit are reported.
+
+        Returns:
+            List[dict]: See ReportRepository.get_margin_by_category(), with a `margin_rate` key
+                more: `margin / revenue`, or None for a category without revenue.
+
+        Raises:
+            UnitNotFoundByIdError: If `unit_id` is specified and no unit exists with that ID.
+        """
+        def run() -> List[dict]:
+            categories = self.report_repository.get_margin_by_category(unit_id)
+            for category in categories:
+                category["margin_rate"] = category["margin"] / category["revenue"] if category["revenue"] else None
+            return categories
+
+        return self._report("margin_by_category", unit_id, run)
+
+
+    def get_top_sellers(self, limit: int = 10, unit_id: Optional[str] = None) -> List[dict]:
+        """
+        Get the products with the highest `sold_quantity`.
+
+        Args:
+            limit (int): The number of products, from 1 to MAX_TOP_SELLERS.
+            unit_id (str | None): The unit of the products. If None the products of every unit are ranked.
+
+        Returns:
+            List[dict]: See ReportRepository.get_top_sellers().
+
+        Raises:
+            UnitNotFoundByIdError: If `unit_id` is specified and no unit exists with that ID.
+            ValueError: If `limit` is out of range.
+        """
+        if not 1 <= limit <= MAX_TOP_SELLERS:
+            raise ValueError(TOP_SELLERS_LIMIT_ERROR)
+
+        return self._report(
+            "top_sellers", unit_id, lambda: self.report_repository.get_top_sellers(limit, unit_id), limit
+        )
+
+
+    def get_stock_value_by_unit(self, unit_id: Optional[str] = None) -> List[dict]:
+        """
+        Get the value of the stock of each unit at its purchase and at its selling price.
+
+        Args:
+            unit_id (str | None): The unit to report. If None every unit with products is reported.
+
+        Returns:
+            List[dict]: See ReportRepository.get_stock_value_by_unit().
+
+        Raises:
+            UnitNotFoundByIdError: If `unit_id` is specified and no unit exists with that ID.
+        """
+        return self._report(
+            "stock_value_by_unit", unit_id, lambda: self.report_repository.get_stock_value_by_unit(unit_id)
+        )
+
+
+    def cache_stats(self) -> Optional[Dict[str, float]]:
+        """
+        Returns:
+            Dict[str, float] | None: The statistics of the cache (see TTLCache.stats()),
+                or None without a cache.
+        """
+        return self.cache.stats() if self.cache is not None else None
@@ -1,3 +1,4 @@
+from functools import partial
 from typing import Optional
 from pymongo.results import InsertOneResult
 from app.exceptions.exceptions import UnitNotFoundByIdError, UserNotFoundByCredentialsError, UserNotFoundByIdError
@@ -8,6 +9,7 @@ from app.repositories.employee_repository import EmployeeRepository
 from app.repositories.supervisor_repository import SupervisorRepository
 from app.repositories.unit_repository import UnitRepository
 from app.repositories.user_repository import UserRepository
+from app.utils.password_utils import PasswordHasher, get_password_hasher
 
 
 class SupervisorService:
@@ -15,6 +17,7 @@ class SupervisorService:
     employee_repository: EmployeeRepository
     supervisor_repository: SupervisorRepository
     unit_repository: UnitRepository
+    password_hasher: PasswordHasher
 
 
     def __init__(
@@ -23,11 +26,13 @@ class SupervisorService:
         employee_repository: EmployeeRepository,
         supervisor_repository: SupervisorRepository,
         unit_repository: UnitRepository,
+        password_hasher: Optional[PasswordHasher] = None
     ):
         self.user_repository       = user_repository
         self.employee_repository   = employee_repository
         self.supervisor_repository = supervisor_repository
         self.unit_repository       = unit_repository
+        self.password_hasher       = password_hasher or get_password_hasher()
 
 
     def insert_supervisor(
@@ -65,6 +70,7 @@ class SupervisorService:
             unit_id   = unit_id,
             unit_name = None
         )
+        supervisor.password = self.password_hasher.hash(password)
         return self.supervisor_repository.insert_supervisor(supervisor)
 
 
@@ -117,7 +123,7 @@ class SupervisorService:
         Get a Supervisor instance from the DB by their credentials.
 
         This method:
-        1) Retrieves the supervisor and the supervisor's unit records from the repository.
+        1) Retrieves the supervisor by `username`, verifies `password` and retrieves the supervisor's unit.
         2) Enriches the supervisor object by setting its `unit_name`.
 
         Args:
@@ -130,18 +136,24 @@ class SupervisorService:
             of the supervisor identified by `id`.
 
         Raises:
-            UserNotFoundByCredentialsError: If the supervisor does not exist.
+            UserNotFoundByCredentialsError: If the supervisor does not exist or the password is wrong.
             UnitNotFoundByIdError: If the unit does not exist.
             ValueError: If the supervisor record is missing required attributes
-                (see Supervisor.get_supervisor()).
+                (see SupervisorRepository.get_supervisor_by_username()).
         """
         # retrieve Supervisor object
         # unit_name is not saved in DB, it is None
-        supervisor = self.supervisor_repository.get_supervisor(username, password, unit_id)
-        unit     = self.unit_repository.get_unit_by_id(unit_id)
+        supervisor = self.supervisor_repository.get_supervisor_by_username(username, unit_id)
 
-        if supervisor is None:
+        if supervisor is None or not self.password_hasher.verify(password, supervisor.password):
             raise UserNotFoundByCredentialsError(username, unit_id)
+
+        self.password_hasher.rehash_in_background(
+            password, supervisor.password, partial(self.user_repository.update_password_hash, supervisor.id)
+        )
+
+        unit = self.unit_repository.get_unit_by_id(unit_id)
+
         if unit is None:
             raise UnitNotFoundByIdError(unit_id)
 
@@ -1,3 +1,4 @@
+from functools import partial
 from typing import Optional
 from app.exceptions.exceptions import UnitNotFoundByIdError, UserNotFoundByCredentialsError, UserNotFoundByIdError
 from app.model.employee import Employee
@@ -7,15 +8,23 @@ from app.model.unit import Unit
 from app.model.user import User
 from app.repositories.unit_repository import UnitRepository
 from app.repositories.user_repository import UserRepository
+from app.utils.password_utils import PasswordHasher, get_password_hasher
 
 
 class UserService:
     user_repository: UserRepository
     unit_repository: UnitRepository
-
-    def __init__(self, user_repository: UserRepository, unit_repository: UnitRepository) -> None:
+    password_hasher: PasswordHasher
+
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        unit_repository: UnitRepository,
+        password_hasher: Optional[PasswordHasher] = None
+    ) -> None:
         self.user_repository = user_repository
         self.unit_repository = unit_repository
+        self.password_hasher = password_hasher or get_password_hasher()
 
 
     def get_user_by_id(self, id: str) -> User:
@@ -55,14 +64,48 @@ class UserService:
         return self._get_user_subclass(user)
 
 
+    def get_user_with_unit_name(self, id: str) -> User:
+        """
+        Get a User instance from the DB by ID, with its `unit_name`, in one round trip.
+
+        Unlike UserService.get_user_by_id() the unit is not read separately
+        (see UserRepository.get_user_with_unit_name()).
+
+        Args:
+            id (str): The ID of the user to retrieve.
+
+        Returns:
+            UserSubclass: The appropriate subclass of a User object
+            with the information of the user identified by `id`.
+
+        Raises:
+            UserNotFoundByIdError: If the user does not exist.
+            UnitNotFoundByIdError: If the user is assigned to a unit that does not exist.
+            ValueError: If the user record is missing required attributes or has an invalid role
+                (see UserRepository.get_user_with_unit_name()).
+        """
+        user: Optional[User] = self.user_repository.get_user_with_unit_name(id)
+
+        if user is None:
+            raise UserNotFoundByIdError(id)
+
+        # admins are not assigned to any unit
+        if user.unit_id and user.unit_name is None:
+            raise UnitNotFoundByIdError(user.unit_id)
+
+        return self._get_user_subclass(user)
+
+
     def get_user(self, username: str, password: str, unit_id: Optional[str] = None) -> User:
         """
         Get a User instance from the DB by their credentials.
 
         This method:
-        1) Retrieves the user and the user's unit records from the repository.
-        2) Enriches the user object by setting its `unit_name`.
-        3) Returns the appropriate type of user based on `User.role`.
+        1) Retrieves the user and the name of its unit by `username`, in one round trip
+            (see UserRepository.get_user_by_username()).
+        2) Verifies `password` against the stored hash.
+        3) Upgrades an outdated hash in the background (see PasswordHasher.rehash_in_background()).
+        4) Returns the appropriate type of user based on `User.role`.
 
         Args:
             username (str): The `username` of the user.
@@ -75,35 +118,49 @@ class UserService:
             of the user identified by `id`.
 
         Raises:
-            UserNotFoundByCredentialsError: If the user does not exist.
+            UserNotFoundByCredentialsError: If the user does not exist or the password is wrong.
             UnitNotFoundByIdError: If the unit does not exist.
             ValueError:
                 - If the user record is missing required attributes
-                (see UserRepository.get_user()).
+                (see UserRepository.get_user_by_username()).
                 - If the user has a role field other than: "admin", "supervisor", "employee".
         """
 
-        user = self.user_repository.get_user(username, password, unit_id)
+        user = self.user_repository.get_user_by_username(username, unit_id)
 
-        if user is None:
+        if user is None or not self.password_hasher.verify(password, user.password):
             raise UserNotFoundByCredentialsError(username, unit_id)
 
-        if unit_id is not None:
-            unit = self.unit_repository.get_unit_by_id(unit_id)
+        self.password_hasher.rehash_in_background(
+            password, user.password, partial(self.user_repository.update_password_hash, user.id)
+        )
 
-            if unit is None:
-                raise UnitNotFoundByIdError(unit_id)
-
-            user.unit_name = unit.name
+        # the unit name is read with the user, it is None if the unit does not exist
+        if unit_id is not None and user.unit_name is None:
+            raise UnitNotFoundByIdError(unit_id)
 
         return self._get_user_subclass(user)
 
 
+    def verify_password(self, user: User, password: str) -> bool:
+        """
+        Returns True if `password` is the password of `user`.
+        """
+        return self.password_hasher.verify(password, user.password)
+
+
     def change_password(self, id: str, password: str) -> bool:
-        return self.user_repository.change_password(id, password)
+        """
+        Hashes `password` and stores it as the password of the user identified by `id`.
+
+        Returns:
+            bool: True if the password is changed false otherwise
+        """
+        return self.user_repository.change_password(id, self.password_hasher.hash(password))
 
 
-    def _get_user_subclass(self, user: User) -> User:
+    @staticmethod
+    def _get_user_subclass(user: User) -> User:
         """
         Convert base user to subclass based on role field.
 
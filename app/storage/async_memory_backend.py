@@ -0,0 +1,270 @@
+"""
+The asyncio API of the in-memory storage backend, the subset of `pymongo.AsyncMongoClient`
+used by the async repositories.
+
+An AsyncMemoryClient wraps a MemoryClient, so the async and the sync repositories of a process
+share the same data (see app.asgi). Every operation runs on the wrapped collections at once,
+after awaiting the simulated round trip of the async client (`latency`), during which
+the other coroutines of the event loop run. Give the wrapped client no latency of its own.
+
+A transaction runs its callback while holding the locks of every collection, without a round trip
+between its operations, so no other coroutine or thread runs in the meantime.
+"""
+from __future__ import annotations
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence
+from bson.codec_options import CodecOptions
+from pymongo.operations import IndexModel, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+from app.storage.memory_backend import (
+    MemoryClient, MemoryClientBulkWriteResult, MemoryCollection, MemoryCursor, MemoryDatabase, MemorySession
+)
+
+
+class AsyncMemoryCursor:
+    """ The cursor of a find or of an aggregation, read with `async for` or to_list(). """
+
+    def __init__(
+        self,
+        collection: AsyncMemoryCollection,
+        cursor: MemoryCursor | List[Dict[str, Any]],
+        session: Optional[AsyncMemorySession] = None
+    ):
+        self.collection = collection
+        self._cursor    = cursor
+        self._session   = session
+        self._documents: Optional[List[Dict[str, Any]]] = None
+
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> AsyncMemoryCursor:
+        self._cursor.sort(key_or_list, direction)  # type: ignore[union-attr]
+        return self
+
+
+    def limit(self, limit: int) -> AsyncMemoryCursor:
+        self._cursor.limit(limit)  # type: ignore[union-attr]
+        return self
+
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        if self._documents is None:
+            await self.collection._round_trip(self._session)
+            self._documents = list(self._cursor)
+        documents, self._documents = self._documents[:length], self._documents[length:] if length else []
+        return documents
+
+
+    def __aiter__(self) -> AsyncMemoryCursor:
+        return self
+
+
+    async def __anext__(self) -> Dict[str, Any]:
+        documents = await self.to_list(1)
+        if not documents:
+            raise StopAsyncIteration
+        return documents[0]
+
+
+    async def close(self) -> None:
+        self._documents = []
+
+
+class AsyncMemoryCollection:
+    database: AsyncMemoryDatabase
+
+    def __init__(self, database: AsyncMemoryDatabase, collection: MemoryCollection):
+        self.database    = database
+        self.name        = collection.name
+        self._collection = collection
+
+
+    @property
+    def full_name(self) -> str:
+        return self._collection.full_name
+
+
+    async def _round_trip(self, session: Optional[AsyncMemorySession] = None) -> None:
+        # the operations of a transaction do not wait, see AsyncMemorySession.with_transaction()
+        if session is None or not session.in_transaction:
+            await self.database.client.sleep_round_trip()
+
+
+    def find(
+        self,
+        filter: Optional[Mapping[str, Any]] = None,
+        projection: Optional[Mapping[str, Any]] = None,
+        batch_size: int = 0,
+        session: Optional[AsyncMemorySession] = None
+    ) -> AsyncMemoryCursor:
+        return AsyncMemoryCursor(self, self._collection.find(filter, projection), session)
+
+
+    def with_options(self, codec_options: Optional[CodecOptions] = None) -> AsyncMemoryCollection:
+        """ See MemoryCollection.with_options(). """
+        return AsyncMemoryCollection(self.database, self._collection.with_options(codec_options))
+
+
+    async def find_one(
+        self,
+        filter: Optional[Mapping[str, Any]] = None,
+        projection: Optional[Mapping[str, Any]] = None,
+        session: Optional[AsyncMemorySession] = None
+    ) -> Optional[Dict[str, Any]]:
+        await self._round_trip(session)
+        return self._collection.find_one(filter, projection)
+
+
+    async def count_documents(self, filter: Mapping[str, Any]) -> int:
+        await self._round_trip()
+        return self._collection.count_documents(filter)
+
+
+    async def aggregate(self, pipeline: Sequence[Mapping[str, Any]]) -> AsyncMemoryCursor:
+        await self._round_trip()
+        cursor = AsyncMemoryCursor(self, [])
+        # the round trip is over, the cursor has all the documents
+        cursor._documents = list(self._collection.aggregate(pipeline))
+        return cursor
+
+
+    async def insert_one(self, document: Dict[str, Any], session: Optional[AsyncMemorySession] = None) -> InsertOneResult:
+        await self._round_trip(session)
+        return self._collection.insert_one(document)
+
+
+    async def insert_many(
+        self, documents: List[Dict[str, Any]], ordered: bool = True, session: Optional[AsyncMemorySession] = None
+    ) -> InsertManyResult:
+        await self._round_trip(session)
+        return self._collection.insert_many(documents, ordered)
+
+
+    async def update_one(
+        self, filter: Mapping[str, Any], update: Any, upsert: bool = False, session: Optional[AsyncMemorySession] = None
+    ) -> UpdateResult:
+        await self._round_trip(session)
+        return self._collection.update_one(filter, update, upsert)
+
+
+    async def find_one_and_update(
+        self,
+        filter: Mapping[str, Any],
+        update: Any,
+        projection: Optional[Mapping[str, Any]] = None,
+        upsert: bool = False,
+        return_document: bool = False,
+        session: Optional[AsyncMemorySession] = None
+    ) -> Optional[Dict[str, Any]]:
+        await self._round_trip(session)
+        return self._collection.find_one_and_update(filter, update, projection, upsert, return_document)
+
+
+    async def delete_one(self, filter: Mapping[str, Any]) -> DeleteResult:
+        await self._round_trip()
+        return self._collection.delete_one(filter)
+
+
+    async def bulk_write(
+        self, requests: Sequence[UpdateOne], ordered: bool = True, session: Optional[AsyncMemorySession] = None
+    ) -> BulkWriteResult:
+        await self._round_trip(session)
+        return self._collection.bulk_write(requests, ordered)
+
+
+    async def create_indexes(self, indexes: Sequence[IndexModel]) -> List[str]:
+        await self._round_trip()
+        return self._collection.create_indexes(indexes)
+
+
+class AsyncMemoryDatabase:
+    client: AsyncMemoryClient
+
+    def __init__(self, client: AsyncMemoryClient, database: MemoryDatabase):
+        self.client    = client
+        self.name      = database.name
+        self._database = database
+        self._collections: Dict[str, AsyncMemoryCollection] = {}
+
+
+    def __getitem__(self, name: str) -> AsyncMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = AsyncMemoryCollection(self, self._database[name])
+        return self._collections[name]
+
+
+class AsyncMemorySession:
+    client: AsyncMemoryClient
+
+    def __init__(self, client: AsyncMemoryClient):
+        self.client   = client
+        self._session = MemorySession(client._client)
+        # the operations of a transaction do not wait for a round trip, see with_transaction()
+        self.in_transaction = False
+
+
+    async def __aenter__(self) -> AsyncMemorySession:
+        return self
+
+
+    async def __aexit__(self, *args) -> None:
+        await self.abort_transaction()
+
+
+    async def with_transaction(self, callback: Callable[[AsyncMemorySession], Awaitable[Any]]) -> Any:
+        await self.client.sleep_round_trip()
+        with self._session._transaction():
+            self.in_transaction = True
+            try:
+                return await callback(self)
+            finally:
+                self.in_transaction = False
+
+
+    async def abort_transaction(self) -> None:
+        self._session.abort_transaction()
+
+
+class AsyncMemoryClient:
+    """ A replacement of `pymongo.AsyncMongoClient` over the databases of a MemoryClient. """
+    latency: float
+
+    def __init__(self, client: Optional[MemoryClient] = None, latency: float = 0.0):
+        """
+        Args:
+            client (MemoryClient | None): The client that keeps the data. If None a new empty one.
+            latency (float): The seconds of the simulated round trip of every operation.
+        """
+        self._client    = client if client is not None else MemoryClient()
+        self._databases: Dict[str, AsyncMemoryDatabase] = {}
+        self.latency    = latency
+
+
+    def __getitem__(self, name: str) -> AsyncMemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = AsyncMemoryDatabase(self, self._client[name])
+        return self._databases[name]
+
+
+    async def sleep_round_trip(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+    def start_session(self) -> AsyncMemorySession:
+        return AsyncMemorySession(self)
+
+
+    async def bulk_write(
+        self,
+        models: Sequence[UpdateOne],
+        session: Optional[AsyncMemorySession] = None,
+        ordered: bool = True,
+        verbose_results: bool = False
+    ) -> MemoryClientBulkWriteResult:
+        if session is None or not session.in_transaction:
+            await self.sleep_round_trip()
+        return self._client.bulk_write(models, None, ordered, verbose_results)
+
+
+    async def close(self) -> None:
+        self._client.close()
@@ -0,0 +1,906 @@
+"""
+An in-memory storage backend that implements the subset of the pymongo API used by the repositories.
+
+The repositories run on it unchanged, without a MongoDB server: the server with STORAGE_BACKEND=memory
+(a single process demo that loses its data on exit), the benchmarks and the load tests.
+
+It supports:
+- the query operators of the repositories ($gt, $gte, $lt, $lte, $in, $ne, $and, $or, $expr),
+- $set/$inc updates and aggregation pipeline updates, and upserts on the equality conditions of the filter,
+- the aggregation stages $match, $limit, $project, $lookup, $set, $group, $sort,
+- unique indexes, which also answer equality and $in queries on their keys without a scan,
+  and the leading field of the other indexes, which narrows equality queries on it,
+- collection and client level bulk writes, and sessions whose transactions
+  apply every write immediately and restore a snapshot on abort. The operations take
+  a `session` argument like the ones of pymongo and ignore it, a transaction holds the locks
+  of every collection so nothing else runs while it is open,
+- reading the documents of a find as RawBSONDocument, with `with_options(codec_options=...)`.
+
+Every other query scans the collection, the backend does not try to mirror MongoDB.
+Every collection has a lock, so the backend can be shared by the threads of one process.
+Commands like explain are not supported, `flask check-query-plans` needs MongoDB.
+
+A client can simulate the round trip to a server with `latency`: every operation then sleeps
+before it runs, so that the benchmarks can measure how many requests overlap their round trips.
+"""
+from __future__ import annotations
+import copy
+import functools
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar
+from bson import ObjectId, encode
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.operations import IndexModel, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+
+_MISSING = object()
+
+
+#####################################################################################################
+# Field paths and comparison
+
+def _get_path(document: Mapping[str, Any], path: str) -> Any:
+    value: Any = document
+    for key in path.split("."):
+        if isinstance(value, list):
+            # a path through an array resolves to the values of its elements
+            value = [v[key] for v in value if isinstance(v, dict) and key in v]
+        elif isinstance(value, dict) and key in value:
+            value = value[key]
+        else:
+            return _MISSING
+    return value
+
+
+def _set_path(document: Dict[str, Any], path: str, value: Any) -> None:
+    keys = path.split(".")
+    for key in keys[:-1]:
+        document = document.setdefault(key, {})
+    document[keys[-1]] = value
+
+
+def _unset_path(document: Dict[str, Any], path: str) -> None:
+    keys = path.split(".")
+    for key in keys[:-1]:
+        document = document.get(key, {})
+    document.pop(keys[-1], None)
+
+
+# the BSON comparison order of the types the repositories store
+_TYPE_ORDER: Dict[type, int] = {type(None): 0, int: 1, float: 1, str: 2, bool: 4}
+
+
+def _type_order(value: Any) -> int:
+    return 0 if value is _MISSING else _TYPE_ORDER.get(type(value), 3)
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    order = _type_order(value)
+    if order in (1, 2, 4):
+        return (order, value)
+    return (order, repr(value) if order else 0)
+
+
+def _compare(left: Any, right: Any) -> int:
+    left_key, right_key = _sort_key(left), _sort_key(right)
+    return (left_key > right_key) - (left_key < right_key)
+
+
+#####################################################################################################
+# Aggregation expressions
+
+def _evaluate(expression: Any, document: Mapping[str, Any]) -> Any:
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _get_path(document, expression[1:])
+        return None if value is _MISSING else value
+
+    if isinstance(expression, list):
+        return [_evaluate(e, document) for e in expression]
+
+    if not isinstance(expression, dict):
+        return expression
+
+    if len(expression) != 1 or not next(iter(expression)).startswith("$"):
+        return {key: _evaluate(value, document) for key, value in expression.items()}
+
+    operator, args = next(iter(expression.items()))
+
+    if operator == "$ifNull":
+        values = [_evaluate(arg, document) for arg in args]
+        return next((v for v in values if v is not None), None)
+
+    values = _evaluate(args, document)
+    if not isinstance(args, list):
+        values = [values]
+
+    return _EXPRESSION_OPERATORS[operator](values)
+
+
+def _sum(values: List[Any]) -> Any:
+    total: Any = 0
+    for value in values:
+        if isinstance(value, list):
+            total += _sum(value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total += value
+    return total
+
+
+def _multiply(values: List[Any]) -> Any:
+    result: Any = 1
+    for value in values:
+        if value is None:
+            return None
+        result *= value
+    return result
+
+
+_EXPRESSION_OPERATORS: Dict[str, Callable[[List[Any]], Any]] = {
+    "$add":      lambda v: None if None in v else sum(v),
+    "$subtract": lambda v: None if None in v else v[0] - v[1],
+    "$multiply": _multiply,
+    "$divide":   lambda v: None if None in v else v[0] / v[1],
+    "$sum":      _sum,
+    "$eq":       lambda v: _compare(v[0], v[1]) == 0,
+    "$ne":       lambda v: _compare(v[0], v[1]) != 0,
+    "$gt":       lambda v: _compare(v[0], v[1]) > 0,
+    "$gte":      lambda v: _compare(v[0], v[1]) >= 0,
+    "$lt":       lambda v: _compare(v[0], v[1]) < 0,
+    "$lte":      lambda v: _compare(v[0], v[1]) <= 0,
+    "$and":      all,
+    "$or":       any,
+    "$first":    lambda v: v[0][0] if isinstance(v[0], list) and v[0] else None,
+    "$cond":     lambda v: v[1] if v[0] else v[2],
+}
+
+
+#####################################################################################################
+# Query filters
+
+def _match_value(expected: Any, value: Any) -> bool:
+    if isinstance(value, list) and not isinstance(expected, list):
+        return any(_match_value(expected, v) for v in value)
+    if value is _MISSING:
+        return expected is None
+    return _type_order(value) == _type_order(expected) and _compare(value, expected) == 0
+
+
+def _match_range(value: Any, operand: Any, accept: Callable[[int], bool]) -> bool:
+    values = value if isinstance(value, list) else [value]
+    return any(
+        v is not _MISSING and _type_order(v) == _type_order(operand) and accept(_compare(v, operand))
+        for v in values
+    )
+
+
+def _match_operator(operator: str, operand: Any, value: Any) -> bool:
+    match operator:
+        case "$eq":
+            return _match_value(operand, value)
+        case "$ne":
+            return not _match_value(operand, value)
+        case "$gt":
+            return _match_range(value, operand, lambda c: c > 0)
+        case "$gte":
+            return _match_range(value, operand, lambda c: c >= 0)
+        case "$lt":
+            return _match_range(value, operand, lambda c: c < 0)
+        case "$lte":
+            return _match_range(value, operand, lambda c: c <= 0)
+        case "$in":
+            return any(_match_value(o, value) for o in operand)
+        case "$nin":
+            return not any(_match_value(o, value) for o in operand)
+        case "$exists":
+            return (value is not _MISSING) == bool(operand)
+        case _:
+            raise NotImplementedError(f"Query operator {operator} is not supported.")
+
+
+def _match_condition(condition: Any, value: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        return all(_match_operator(op, operand, value) for op, operand in condition.items())
+    return _match_value(condition, value)
+
+
+def matches(query: Optional[Mapping[str, Any]], document: Mapping[str, Any]) -> bool:
+    """ Returns True if `document` satisfies the find filter `query`. """
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(q, document) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(q, document) for q in condition):
+                return False
+        elif key == "$expr":
+            if not _evaluate(condition, document):
+                return False
+        elif not _match_condition(condition, _get_path(document, key)):
+            return False
+    return True
+
+
+#####################################################################################################
+# Updates, projections and pipelines
+
+def _apply_update(document: Dict[str, Any], update: Any) -> Dict[str, Any]:
+    if isinstance(update, list):
+        # an aggregation pipeline update
+        return _run_pipeline([document], update, None)[0]
+
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            match operator:
+                case "$set":
+                    _set_path(document, path, copy.deepcopy(value))
+                case "$unset":
+                    _unset_path(document, path)
+                case "$inc":
+                    current = _get_path(document, path)
+                    _set_path(document, path, (0 if current is _MISSING else current) + value)
+                case _:
+                    raise NotImplementedError(f"Update operator {operator} is not supported.")
+    return document
+
+
+def _project(document: Mapping[str, Any], projection: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(dict(document))
+
+    include_id = projection.get("_id", 1)
+    fields     = {k: v for k, v in projection.items() if k != "_id"}
+
+    # {"_id": 0} alone excludes `_id` and keeps every other field
+    if all(v in (0, False) for v in fields.values()):
+        result = copy.deepcopy(dict(document))
+        for path in fields:
+            _unset_path(result, path)
+    else:
+        result = {"_id": document["_id"]} if "_id" in document else {}
+        for path, spec in fields.items():
+            value = _get_path(document, path) if isinstance(spec, (int, bool)) else _evaluate(spec, document)
+            if value is not _MISSING:
+                _set_path(result, path, copy.deepcopy(value))
+
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def _sort_documents(documents: List[Dict[str, Any]], sort: Sequence[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    # stable sorts from the last key to the first
+    for field, direction in reversed(list(sort)):
+        documents.sort(key=lambda d, f=field: _sort_key(_get_path(d, f)), reverse=direction == DESCENDING)
+    return documents
+
+
+def _group(documents: Iterable[Dict[str, Any]], spec: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[str, Tuple[Any, List[Dict[str, Any]]]] = {}
+    for document in documents:
+        key = _evaluate(spec["_id"], document)
+        groups.setdefault(repr(key), (key, []))[1].append(document)
+
+    result = []
+    for key, members in groups.values():
+        group: Dict[str, Any] = {"_id": key}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            operator, expression = next(iter(accumulator.items()))
+            if operator != "$sum":
+                raise NotImplementedError(f"Accumulator {operator} is not supported.")
+            group[field] = _sum([_evaluate(expression, d) for d in members])
+        result.append(group)
+    return result
+
+
+def _run_pipeline(
+    documents: List[Dict[str, Any]],
+    pipeline: Sequence[Mapping[str, Any]],
+    database: Optional[MemoryDatabase],
+) -> List[Dict[str, Any]]:
+    for stage in pipeline:
+        operator, spec = next(iter(stage.items()))
+        match operator:
+            case "$match":
+                documents = [d for d in documents if matches(spec, d)]
+            case "$limit":
+                documents = documents[:spec]
+            case "$project":
+                documents = [_project(d, spec) for d in documents]
+            case "$set" | "$addFields":
+                for document in documents:
+                    # every expression sees the document before the stage
+                    values = {path: _evaluate(expression, document) for path, expression in spec.items()}
+                    for path, value in values.items():
+                        _set_path(document, path, value)
+            case "$group":
+                documents = _group(documents, spec)
+            case "$sort":
+                documents = _sort_documents(documents, list(spec.items()))
+            case "$lookup":
+                foreign = database[spec["from"]]
+                for document in documents:
+                    local  = _get_path(document, spec["localField"])
+                    joined = foreign._find({spec["foreignField"]: None if local is _MISSING else local})
+                    document[spec["as"]] = _run_pipeline(
+                        [copy.deepcopy(f) for f in joined], spec.get("pipeline", []), database
+                    )
+            case _:
+                raise NotImplementedError(f"Aggregation stage {operator} is not supported.")
+    return documents
+
+
+def _equality_condition(query: Optional[Mapping[str, Any]], field: str) -> Any:
+    """ The condition of `query` on `field`, also inside a top level $and, or _MISSING. """
+    if not query:
+        return _MISSING
+    if field in query:
+        return query[field]
+    for subquery in query.get("$and", ()):
+        condition = _equality_condition(subquery, field)
+        if condition is not _MISSING:
+            return condition
+    return _MISSING
+
+
+#####################################################################################################
+# Client, database and collection
+
+_Method = TypeVar("_Method", bound=Callable[..., Any])
+
+
+def _round_trip(method: _Method) -> _Method:
+    """ Sleep for the `latency` of the client before running an operation of a collection. """
+    @functools.wraps(method)
+    def wrapped(self: MemoryCollection, *args, **kwargs):
+        self.database.client.sleep_round_trip()
+        return method(self, *args, **kwargs)
+    return wrapped  # type: ignore[return-value]
+
+
+class MemoryCursor:
+    """ A lazy cursor over the documents of a find, with sort, limit and batch_size. """
+    collection: MemoryCollection
+
+    def __init__(
+        self,
+        collection: MemoryCollection,
+        query: Optional[Mapping[str, Any]],
+        projection: Optional[Mapping[str, Any]],
+        raw: bool = False
+    ):
+        self.collection  = collection
+        self._query      = query
+        self._projection = projection
+        # return the documents as RawBSONDocument, see MemoryCollection.with_options()
+        self._raw        = raw
+        self._sort: List[Tuple[str, int]] = []
+        self._limit      = 0
+        self._iterator: Optional[Iterator[Dict[str, Any]]] = None
+
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> MemoryCursor:
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction or ASCENDING)]
+        else:
+            self._sort = list(key_or_list.items() if isinstance(key_or_list, dict) else key_or_list)
+        return self
+
+
+    def limit(self, limit: int) -> MemoryCursor:
+        self._limit = limit
+        return self
+
+
+    def batch_size(self, batch_size: int) -> MemoryCursor:
+        return self
+
+
+    def __iter__(self) -> MemoryCursor:
+        return self
+
+
+    def __next__(self) -> Dict[str, Any]:
+        if self._iterator is None:
+            self.collection.database.client.sleep_round_trip()
+            documents = _sort_documents(self.collection._find(self._query), self._sort)
+            if self._limit:
+                documents = documents[:abs(self._limit)]
+            self._iterator = (_project(d, self._projection) for d in documents)
+            if self._raw:
+                self._iterator = (RawBSONDocument(encode(d)) for d in self._iterator)
+        return next(self._iterator)
+
+
+    def close(self) -> None:
+        self._iterator = iter(())
+
+
+class MemoryCollection:
+    """
+    A collection that keeps its documents in a dict by `_id`.
+
+    Every unique index is a dict from its key to the `_id` of the document,
+    every other index is a dict from the value of its leading field to the `_id`s of the documents.
+    The documents are never mutated in place, an update replaces the document,
+    so shallow copies of the dicts are a snapshot (see MemorySession).
+    """
+    database: MemoryDatabase
+    name: str
+
+    def __init__(self, database: MemoryDatabase, name: str):
+        self.database = database
+        self.name     = name
+        self._lock    = threading.RLock()
+        self._docs: Dict[Any, Dict[str, Any]] = {}
+        # index name -> the keys of the index
+        self._indexes: Dict[str, List[Tuple[str, int]]] = {"_id_": [("_id", ASCENDING)]}
+        # unique index name -> {key: _id}
+        self._unique: Dict[str, Dict[Tuple[str, ...], Any]] = {}
+        # leading field of an index -> {value: {_id: None}}
+        self._leading: Dict[str, Dict[str, Dict[Any, None]]] = {}
+
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.database.name}.{self.name}"
+
+
+    # storage
+
+    def _index_key(self, index: str, document: Mapping[str, Any]) -> Tuple[str, ...]:
+        return tuple(repr(_get_path(document, field)) for field, _ in self._indexes[index])
+
+
+    def _candidates(self, query: Optional[Mapping[str, Any]]) -> Iterable[Dict[str, Any]]:
+        """ The documents an index narrows `query` to, or every document. """
+        for index, keys in self._unique.items():
+            conditions = [_equality_condition(query, field) for field, _ in self._indexes[index]]
+            if _MISSING in conditions:
+                continue
+
+            if all(not isinstance(c, dict) for c in conditions):
+                _id = keys.get(tuple(repr(c) for c in conditions))
+                return [] if _id is None else [self._docs[_id]]
+
+            if len(conditions) == 1 and list(conditions[0]) == ["$in"]:
+                ids = (keys.get((repr(value),)) for value in conditions[0]["$in"])
+                return [self._docs[_id] for _id in dict.fromkeys(ids) if _id is not None]
+
+        for field, values in self._leading.items():
+            condition = _equality_condition(query, field)
+            if condition is not _MISSING and not isinstance(condition, dict):
+                return [self._docs[_id] for _id in values.get(repr(condition), ())]
+
+        return list(self._docs.values())
+
+
+    def _find(self, query: Optional[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [d for d in self._candidates(query) if matches(query, d)]
+
+
+    def _store(self, document: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> None:
+        """ Store `document`, replacing `previous`, after checking the unique indexes. """
+        for index, keys in self._unique.items():
+            if keys.get(self._index_key(index, document), document["_id"]) != document["_id"]:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.full_name} index: {index}", 11000
+                )
+
+        if previous is not None:
+            self._unindex(previous)
+
+        for index, keys in self._unique.items():
+            keys[self._index_key(index, document)] = document["_id"]
+        for field, values in self._leading.items():
+            values.setdefault(repr(_get_path(document, field)), {})[document["_id"]] = None
+
+        self._docs[document["_id"]] = document
+
+
+    def _unindex(self, document: Dict[str, Any]) -> None:
+        for index, keys in self._unique.items():
+            keys.pop(self._index_key(index, document), None)
+        for field, values in self._leading.items():
+            values.get(repr(_get_path(document, field)), {}).pop(document["_id"], None)
+
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.full_name} index: _id_", 11000)
+        self._store(copy.deepcopy(document))
+        return document["_id"]
+
+
+    def _update(
+        self, query: Mapping[str, Any], update: Any, upsert: bool = False
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Update the first document matching `query`. Returns the document before and after the update.
+
+        With `upsert`, if no document matches, the update is applied to a new document
+        with the equality conditions of `query`, which is then inserted (before is None).
+        """
+        for document in self._candidates(query):
+            if matches(query, document):
+                updated = _apply_update(copy.deepcopy(document), update)
+                self._store(updated, document)
+                return document, updated
+
+        if upsert:
+            inserted = _apply_update(
+                {k: copy.deepcopy(v) for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)},
+                update,
+            )
+            self._insert(inserted)
+            return None, self._docs[inserted["_id"]]
+
+        return None, None
+
+
+    def _delete(self, query: Mapping[str, Any]) -> int:
+        for document in self._candidates(query):
+            if matches(query, document):
+                self._unindex(document)
+                del self._docs[document["_id"]]
+                return 1
+        return 0
+
+
+    # indexes
+
+    @_round_trip
+    def create_indexes(self, indexes: Sequence[IndexModel]) -> List[str]:
+        names = []
+        with self._lock:
+            for index in indexes:
+                name   = index.document["name"]
+                keys   = list(index.document["key"].items())
+                unique = bool(index.document.get("unique"))
+
+                self._indexes[name] = keys
+                if unique:
+                    self._unique.setdefault(name, {})
+                else:
+                    self._leading.setdefault(keys[0][0], {})
+
+                names.append(name)
+
+            # index the existing documents
+            documents, self._docs = self._docs, {}
+            for index in self._unique.values():
+                index.clear()
+            for values in self._leading.values():
+                values.clear()
+            for document in documents.values():
+                self._store(document)
+        return names
+
+
+    def drop(self) -> None:
+        with self._lock:
+            self._docs.clear()
+            self._indexes = {"_id_": self._indexes["_id_"]}
+            self._unique  = {}
+            self._leading = {}
+
+
+    # reads
+
+    def find(
+        self,
+        filter: Optional[Mapping[str, Any]] = None,
+        projection: Optional[Mapping[str, Any]] = None,
+        batch_size: int = 0,
+        session: Optional[MemorySession] = None
+    ) -> MemoryCursor:
+        return MemoryCursor(self, filter, projection)
+
+
+    def with_options(self, codec_options: Optional[CodecOptions] = None) -> MemoryCollection:
+        """
+        Returns:
+            MemoryCollection: The collection, or with the RawBSONDocument `document_class`
+                a view of it whose finds return RawBSONDocument (see RawMemoryCollection).
+        """
+        if codec_options is not None and codec_options.document_class is RawBSONDocument:
+            return RawMemoryCollection(self)  # type: ignore[return-value]
+        return self
+
+
+    def find_one(
+        self,
+        filter: Optional[Mapping[str, Any]] = None,
+        projection: Optional[Mapping[str, Any]] = None,
+        session: Optional[MemorySession] = None
+    ) -> Optional[Dict[str, Any]]:
+        return next(self.find(filter, projection).limit(1), None)
+
+
+    @_round_trip
+    def count_documents(self, filter: Mapping[str, Any]) -> int:
+        return len(self._find(filter))
+
+
+    @_round_trip
+    def aggregate(self, pipeline: Sequence[Mapping[str, Any]]) -> Iterator[Dict[str, Any]]:
+        # a leading $match is answered with the unique indexes like a find
+        query = pipeline[0]["$match"] if pipeline and "$match" in pipeline[0] else None
+        documents = [copy.deepcopy(d) for d in self._find(query)]
+        return iter(_run_pipeline(documents, pipeline, self.database))
+
+
+    # writes
+
+    @_round_trip
+    def insert_one(self, document: Dict[str, Any], session: Optional[MemorySession] = None) -> InsertOneResult:
+        with self._lock:
+            return InsertOneResult(self._insert(document), True)
+
+
+    @_round_trip
+    def insert_many(
+        self, documents: Iterable[Dict[str, Any]], ordered: bool = True, session: Optional[MemorySession] = None
+    ) -> InsertManyResult:
+        inserted_ids: List[Any]      = []
+        errors: List[Dict[str, Any]] = []
+
+        with self._lock:
+            for index, document in enumerate(documents):
+                try:
+                    inserted_ids.append(self._insert(document))
+                except DuplicateKeyError as e:
+                    errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": document})
+                    if ordered:
+                        break
+
+        if errors:
+            raise BulkWriteError(_raw_bulk_result(nInserted=len(inserted_ids), writeErrors=errors))
+        return InsertManyResult(inserted_ids, True)
+
+
+    @_round_trip
+    def update_one(
+        self, filter: Mapping[str, Any], update: Any, upsert: bool = False, session: Optional[MemorySession] = None
+    ) -> UpdateResult:
+        with self._lock:
+            before, after = self._update(filter, update, upsert)
+        return UpdateResult(_raw_update_result(before, after), True)
+
+
+    @_round_trip
+    def find_one_and_update(
+        self,
+        filter: Mapping[str, Any],
+        update: Any,
+        projection: Optional[Mapping[str, Any]] = None,
+        upsert: bool = False,
+        return_document: bool = False,
+        session: Optional[MemorySession] = None
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            before, after = self._update(filter, update, upsert)
+
+        document = after if return_document else before
+        return None if document is None else _project(document, projection)
+
+
+    @_round_trip
+    def delete_one(self, filter: Mapping[str, Any]) -> DeleteResult:
+        with self._lock:
+            return DeleteResult({"n": self._delete(filter)}, True)
+
+
+    @_round_trip
+    def bulk_write(
+        self, requests: Sequence[UpdateOne], ordered: bool = True, session: Optional[MemorySession] = None
+    ) -> BulkWriteResult:
+        matched, modified, upserted = 0, 0, 0
+        with self._lock:
+            for request in requests:
+                before, after = self._update(request._filter, request._doc, bool(request._upsert))
+                matched      += before is not None
+                modified     += before is not None and before != after
+                upserted     += before is None and after is not None
+        return BulkWriteResult(_raw_bulk_result(nMatched=matched, nModified=modified, nUpserted=upserted), True)
+
+
+def _raw_update_result(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"n": int(before is not None), "nModified": int(before is not None and before != after)}
+
+
+def _raw_bulk_result(**counts: Any) -> Dict[str, Any]:
+    raw = {
+        "writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+        "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+    }
+    raw.update(counts)
+    return raw
+
+
+class RawMemoryCollection:
+    """
+    A view of a MemoryCollection whose finds return the documents as RawBSONDocument,
+    like a collection with the codec options of RawBSONDocument. The other operations
+    are the ones of the collection.
+    """
+
+    def __init__(self, collection: MemoryCollection):
+        self._collection = collection
+
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._collection, name)
+
+
+    def find(
+        self,
+        filter: Optional[Mapping[str, Any]] = None,
+        projection: Optional[Mapping[str, Any]] = None,
+        batch_size: int = 0
+    ) -> MemoryCursor:
+        return MemoryCursor(self._collection, filter, projection, raw=True)
+
+
+    def find_one(
+        self, filter: Optional[Mapping[str, Any]] = None, projection: Optional[Mapping[str, Any]] = None
+    ) -> Optional[RawBSONDocument]:
+        return next(self.find(filter, projection).limit(1), None)
+
+
+class MemoryDatabase:
+    client: MemoryClient
+    name: str
+
+    def __init__(self, client: MemoryClient, name: str):
+        self.client = client
+        self.name   = name
+        self._collections: Dict[str, MemoryCollection] = {}
+        self._lock  = threading.Lock()
+
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(self, name)
+            return self._collections[name]
+
+
+class MemorySession:
+    """
+    A session whose transactions are serialized with every other write.
+
+    A transaction holds the locks of every collection of the client, so no other thread
+    reads or writes while it runs. Its writes are applied immediately and aborting it
+    restores the snapshot taken when it started.
+    """
+    client: MemoryClient
+
+    def __init__(self, client: MemoryClient):
+        self.client    = client
+        self._snapshot: Optional[Dict[MemoryCollection, Tuple[dict, dict, dict]]] = None
+
+
+    def __enter__(self) -> MemorySession:
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.abort_transaction()
+
+
+    def with_transaction(self, callback: Callable[[MemorySession], Any]) -> Any:
+        self.client.sleep_round_trip()
+        with self._transaction():
+            return callback(self)
+
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """ Hold the locks of every collection and restore their snapshot if the block raises. """
+        # the locks are always taken in the same order, so two transactions cannot deadlock
+        collections = sorted(self.client._collections(), key=lambda c: c.full_name)
+
+        with ExitStack() as locks:
+            for collection in collections:
+                locks.enter_context(collection._lock)
+
+            self._snapshot = {
+                collection: (
+                    dict(collection._docs),
+                    {index: dict(keys) for index, keys in collection._unique.items()},
+                    {field: {v: dict(ids) for v, ids in values.items()} for field, values in collection._leading.items()},
+                )
+                for collection in collections
+            }
+            try:
+                yield
+            except BaseException:
+                self.abort_transaction()
+                raise
+            finally:
+                self._snapshot = None
+
+
+    def abort_transaction(self) -> None:
+        if self._snapshot is None:
+            return
+        for collection, (docs, unique, leading) in self._snapshot.items():
+            with collection._lock:
+                collection._docs, collection._unique, collection._leading = docs, unique, leading
+        self._snapshot = None
+
+
+class MemoryClientBulkWriteResult:
+    """ The part of pymongo.results.ClientBulkWriteResult read by the repositories. """
+
+    def __init__(self, update_results: Dict[int, UpdateResult]):
+        self.update_results = update_results
+
+
+class MemoryClient:
+    """
+    A replacement of `pymongo.MongoClient` that keeps every database in memory.
+
+    Every operation sleeps for `latency` seconds first, the simulated round trip to a server.
+    """
+    latency: float
+
+    def __init__(self, *args, latency: float = 0.0, **kwargs):
+        self._databases: Dict[str, MemoryDatabase] = {}
+        self._lock   = threading.Lock()
+        self.latency = latency
+
+
+    def sleep_round_trip(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = MemoryDatabase(self, name)
+            return self._databases[name]
+
+
+    def _collections(self) -> List[MemoryCollection]:
+        return [c for database in self._databases.values() for c in database._collections.values()]
+
+
+    def start_session(self) -> MemorySession:
+        return MemorySession(self)
+
+
+    def bulk_write(
+        self,
+        models: Sequence[UpdateOne],
+        session: Optional[MemorySession] = None,
+        ordered: bool = True,
+        verbose_results: bool = False
+    ) -> MemoryClientBulkWriteResult:
+        update_results: Dict[int, UpdateResult] = {}
+
+        # one round trip for the whole bulk write
+        self.sleep_round_trip()
+        for i, model in enumerate(models):
+            database, name = model._namespace.split(".", 1)
+            collection     = self[database][name]
+            with collection._lock:
+                before, after = collection._update(model._filter, model._doc)
+            update_results[i] = UpdateResult(_raw_update_result(before, after), True)
+
+        return MemoryClientBulkWriteResult(update_results)
+
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,118 @@
+import threading
+from typing import Any, Dict
+from pymongo import monitoring
+
+
+class _PoolStats:
+    """ The counters of the connection pool of one server. """
+
+    def __init__(self):
+        self.connections_open: int                = 0
+        self.connections_in_use: int              = 0
+        self.max_connections_in_use: int          = 0
+        self.checkouts: int                       = 0
+        self.checkout_wait_seconds: float         = 0.0
+        self.max_checkout_wait_seconds: float     = 0.0
+        self.checkout_failures: Dict[str, int]    = {}
+        self.pool_clears: int                     = 0
+
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "connections_open":       self.connections_open,
+            "connections_in_use":     self.connections_in_use,
+            "max_connections_in_use": self.max_connections_in_use,
+            "checkouts":              self.checkouts,
+            "avg_checkout_wait_ms":   self.checkout_wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+            "max_checkout_wait_ms":   self.max_checkout_wait_seconds * 1000,
+            "checkout_failures":      dict(self.checkout_failures),
+            "pool_clears":            self.pool_clears,
+        }
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Collects the statistics of the connection pools of a MongoClient from its CMAP events.
+
+    Pass it in the `event_listeners` of the client. The counters are kept per server address,
+    the connections in use against `maxPoolSize` and the checkout waits show when
+    the pool is too small for the threads of the process, and the checkout failures
+    count the requests that timed out waiting for a connection (`waitQueueTimeoutMS`).
+    """
+
+    def __init__(self):
+        self._lock                          = threading.Lock()
+        self._pools: Dict[str, _PoolStats]  = {}
+
+
+    def _pool(self, address: tuple) -> _PoolStats:
+        key = f"{address[0]}:{address[1]}"
+        if key not in self._pools:
+            self._pools[key] = _PoolStats()
+        return self._pools[key]
+
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns:
+            Dict[str, Dict[str, Any]]: The statistics of the pool of every server, by "host:port".
+        """
+        with self._lock:
+            return {address: pool.to_dict() for address, pool in self._pools.items()}
+
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        with self._lock:
+            self._pool(event.address)
+
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        with self._lock:
+            self._pool(event.address).pool_clears += 1
+
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self._pool(event.address).connections_open += 1
+
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self._pool(event.address).connections_open -= 1
+
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        pass
+
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        with self._lock:
+            failures               = self._pool(event.address).checkout_failures
+            failures[event.reason] = failures.get(event.reason, 0) + 1
+
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        with self._lock:
+            pool                            = self._pool(event.address)
+            pool.checkouts                 += 1
+            pool.connections_in_use        += 1
+            pool.max_connections_in_use     = max(pool.max_connections_in_use, pool.connections_in_use)
+            pool.checkout_wait_seconds     += event.duration
+            pool.max_checkout_wait_seconds  = max(pool.max_checkout_wait_seconds, event.duration)
+
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self._pool(event.address).connections_in_use -= 1
@@ -0,0 +1,140 @@
+from typing import Any, Dict, Mapping, Optional, Tuple, Type
+from pymongo import AsyncMongoClient, MongoClient
+from app.storage.async_memory_backend import AsyncMemoryClient
+from app.storage.memory_backend import MemoryClient
+from app.storage.pool_stats import PoolStatsListener
+
+
+"""
+The storage backends of the application, selected with the STORAGE_BACKEND config.
+
+A backend is a client with the pymongo API: the repositories get their collections
+from `client[database][collection]` and only use the operations that every backend supports
+(see app.storage.memory_backend for that subset).
+"""
+MONGO_BACKEND  = "mongo"
+MEMORY_BACKEND = "memory"
+STORAGE_BACKENDS: Tuple[str, ...] = (MONGO_BACKEND, MEMORY_BACKEND)
+
+# the MongoClient options set from the config of the server, by config key
+MONGO_CLIENT_OPTIONS: Dict[str, str] = {
+    "MONGO_MAX_POOL_SIZE":                "maxPoolSize",
+    "MONGO_MIN_POOL_SIZE":                "minPoolSize",
+    "MONGO_MAX_IDLE_TIME_MS":             "maxIdleTimeMS",
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS":        "waitQueueTimeoutMS",
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS":  "serverSelectionTimeoutMS",
+    "MONGO_CONNECT_TIMEOUT_MS":           "connectTimeoutMS",
+    "MONGO_SOCKET_TIMEOUT_MS":            "socketTimeoutMS",
+    "MONGO_COMPRESSORS":                  "compressors",
+}
+
+
+def mongo_client_options(config: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Returns:
+        Dict[str, Any]: The MongoClient options of MONGO_CLIENT_OPTIONS that are set in `config`,
+            the options that are None or empty keep the default of pymongo.
+    """
+    return {
+        option: config[key]
+        for key, option in MONGO_CLIENT_OPTIONS.items()
+        if config.get(key) not in (None, "")
+    }
+
+
+def _create_mongo_clients(
+    client_class: Type[MongoClient] | Type[AsyncMongoClient], config: Mapping[str, Any]
+) -> Tuple[Any, Any, Dict[str, PoolStatsListener]]:
+    """ Create the write and the read clients of create_clients() with `client_class`. """
+    options      = mongo_client_options(config)
+    write_stats  = PoolStatsListener()
+    write_client = client_class(
+        config["MONGO_HOST"], config["MONGO_PORT"], connect=False, event_listeners=[write_stats], **options
+    )
+
+    read_preference = config.get("MONGO_READ_PREFERENCE", "primary")
+    if read_preference == "primary":
+        return write_client, write_client, {"write": write_stats}
+
+    if config.get("MONGO_MAX_STALENESS_SECONDS") is not None:
+        options["maxStalenessSeconds"] = config["MONGO_MAX_STALENESS_SECONDS"]
+
+    read_stats  = PoolStatsListener()
+    read_client = client_class(
+        config["MONGO_HOST"], config["MONGO_PORT"],
+        connect=False, event_listeners=[read_stats], readPreference=read_preference, **options
+    )
+    return write_client, read_client, {"write": write_stats, "read": read_stats}
+
+
+def create_clients(
+    config: Mapping[str, Any]
+) -> Tuple[MongoClient | MemoryClient, MongoClient | MemoryClient, Dict[str, PoolStatsListener]]:
+    """
+    Create the clients of the storage backend of the config.
+
+    The MongoClients connect lazily, on their first operation, so creating them does not block
+    the startup of the process and no connection is opened before a fork.
+
+    The write client serves the writes and the point reads, the read client serves the listing
+    queries (see ProductRepository) with the MONGO_READ_PREFERENCE of the config, so that they
+    can go to the secondaries of a replica set. With the "primary" read preference,
+    or with the memory backend, both are the same client.
+
+    Args:
+        config (Mapping[str, Any]): The config of the server.
+            - STORAGE_BACKEND: One of STORAGE_BACKENDS.
+                - "mongo": MongoClients connected to MONGO_HOST:MONGO_PORT.
+                - "memory": an empty MemoryClient, the data is lost when the process exits.
+            - MONGO_HOST, MONGO_PORT: ignored by the memory backend.
+            - The options of MONGO_CLIENT_OPTIONS, MONGO_READ_PREFERENCE and MONGO_MAX_STALENESS_SECONDS.
+
+    Returns:
+        Tuple[MongoClient | MemoryClient, MongoClient | MemoryClient, Dict[str, PoolStatsListener]]:
+            The write client, the read client and the pool statistics of each MongoClient,
+            by "write" and "read" (empty for the memory backend).
+
+    Raises:
+        ValueError: If STORAGE_BACKEND is not one of STORAGE_BACKENDS.
+    """
+    match config["STORAGE_BACKEND"]:
+        case "mongo":
+            return _create_mongo_clients(MongoClient, config)
+        case "memory":
+            client = MemoryClient()
+            return client, client, {}
+        case backend:
+            raise ValueError(f"Unknown storage backend {backend}, expected one of {', '.join(STORAGE_BACKENDS)}.")
+
+
+def create_async_clients(
+    config: Mapping[str, Any], memory_client: Optional[MemoryClient] = None
+) -> Tuple[
+    AsyncMongoClient | AsyncMemoryClient, AsyncMongoClient | AsyncMemoryClient, Dict[str, PoolStatsListener]
+]:
+    """
+    Create the asyncio clients of the storage backend of the config, like create_clients().
+
+    An AsyncMongoClient can only be used from the event loop of its first operation,
+    so the clients must be created for the event loop that serves the requests (see app.asgi).
+
+    Args:
+        config (Mapping[str, Any]): The config of the server, see create_clients().
+        memory_client (MemoryClient | None): With the "memory" backend, the client whose data
+            the async client shares. If None a new empty one.
+
+    Returns:
+        Tuple[AsyncMongoClient | AsyncMemoryClient, AsyncMongoClient | AsyncMemoryClient, Dict[str, PoolStatsListener]]:
+            The write client, the read client and the pool statistics of each AsyncMongoClient.
+
+    Raises:
+        ValueError: If STORAGE_BACKEND is not one of STORAGE_BACKENDS.
+    """
+    match config["STORAGE_BACKEND"]:
+        case "mongo":
+            return _create_mongo_clients(AsyncMongoClient, config)
+        case "memory":
+            client = AsyncMemoryClient(memory_client)
+            return client, client, {}
+        case backend:
+            raise ValueError(f"Unknown storage backend {backend}, expected one of {', '.join(STORAGE_BACKENDS)}.")
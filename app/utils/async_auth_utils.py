@@ -0,0 +1,80 @@
+from functools import wraps
+from typing import Optional
+from quart import current_app, g, session, redirect, url_for
+from app.blueprints.names import AUTH_BP
+from app.exceptions.exceptions import UnitNotFoundByIdError, UserNotFoundByIdError
+from app.model.user import User
+
+
+"""
+The async views version of app.utils.auth_utils, for the blueprints of the ASGI server (see app.asgi).
+"""
+
+
+async def current_user() -> Optional[User]:
+    """
+    Returns the logged in user, with its `unit_name`, loaded once per request.
+    See app.utils.auth_utils.current_user().
+    """
+    if "current_user" in g:
+        return g.current_user
+
+    user: Optional[User] = None
+    user_id              = session.get("user_id")
+
+    if user_id is not None:
+        try:
+            user = await current_app.load_identity(user_id)  # type: ignore[attr-defined]
+        except (UserNotFoundByIdError, UnitNotFoundByIdError, ValueError):
+            user = None
+
+    g.current_user = user
+    return user
+
+
+def login_required(f):
+    """
+    Decorator to ensure that a user is logged in, see app.utils.auth_utils.login_required().
+    """
+    @wraps(f)
+    async def wrapped_view(**kwargs):
+        if "user_id" not in session:
+            return redirect(url_for(f"{AUTH_BP}.login"))
+
+        # the user may have been deleted after logging in
+        if await current_user() is None:
+            session.clear()
+            return redirect(url_for(f"{AUTH_BP}.login"))
+
+        return await f(**kwargs)
+
+    return wrapped_view
+
+
+def required_role(min_role: str):
+    """
+    Checks if a user has the required role, see app.utils.auth_utils.required_role().
+    """
+    def decorator(f):
+        @wraps(f)
+        async def wrapped(**kwargs):
+
+            hierarchy = ["employee", "supervisor", "admin"]
+            user      = await current_user()
+            # the role is read from the database, so role changes apply immediately
+            user_role = user.role if user is not None else None
+
+            if not isinstance(user_role, str):
+                return redirect(url_for(f"{AUTH_BP}.login"))
+
+            if hierarchy.index(user_role) < hierarchy.index(min_role):
+                return redirect(url_for(f"{AUTH_BP}.missing_permissions"))
+
+            return await f(**kwargs)
+        return wrapped
+    return decorator
+
+
+async def is_admin_logged_in() -> bool:
+    user = await current_user()
+    return user is not None and user.role == "admin"
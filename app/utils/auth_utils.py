@@ -1,14 +1,45 @@
 from functools import wraps
-from flask import session, redirect, url_for
+from typing import Optional
+from flask import current_app, g, session, redirect, url_for
 from app.blueprints.names import AUTH_BP
+from app.exceptions.exceptions import UnitNotFoundByIdError, UserNotFoundByIdError
+from app.model.user import User
+
+
+def current_user() -> Optional[User]:
+    """
+    Returns the logged in user, with its `unit_name`.
+
+    The user is loaded with the identity loader of the server (see CustomFlask.load_identity())
+    the first time this is called in a request and is kept in `flask.g` for the rest of it,
+    so the decorators and the view of a request share a single lookup.
+
+    Returns:
+        User | None: The user of the session or None if no user is logged in,
+            or if the user (or its unit) no longer exists or its record is invalid.
+    """
+    if "current_user" in g:
+        return g.current_user
+
+    user: Optional[User] = None
+    user_id              = session.get("user_id")
+
+    if user_id is not None:
+        try:
+            user = current_app.load_identity(user_id)  # type: ignore[attr-defined]
+        except (UserNotFoundByIdError, UnitNotFoundByIdError, ValueError):
+            user = None
+
+    g.current_user = user
+    return user
 
 
 def login_required(f):
     """
     Decorator to ensure that a user is logged in.
 
-    If the user is not logged in, they are redirected
-    to the login page.
+    If the user is not logged in, or no longer exists,
+    they are redirected to the login page.
 
     Usage:
         @login_required
@@ -19,6 +50,12 @@ def login_required(f):
     def wrapped_view(**kwargs):
         if "user_id" not in session:
             return redirect(url_for(f"{AUTH_BP}.login"))
+
+        # the user may have been deleted after logging in
+        if current_user() is None:
+            session.clear()
+            return redirect(url_for(f"{AUTH_BP}.login"))
+
         return f(**kwargs)
 
     return wrapped_view
@@ -52,7 +89,9 @@ def required_role(min_role: str):
         def wrapped(**kwargs):
 
             hierarchy = ["employee", "supervisor", "admin"]
-            user_role = session.get("role")
+            user      = current_user()
+            # the role is read from the database, so role changes apply immediately
+            user_role = user.role if user is not None else None
 
             if not isinstance(user_role, str):
                 return redirect(url_for(f"{AUTH_BP}.login"))
@@ -66,8 +105,5 @@ def required_role(min_role: str):
 
 
 def is_admin_logged_in() -> bool:
-    # Maybe if role not in sessio nredirect to login page
-    if "role" in session:
-        if session["role"] == "admin":
-            return True
-    return False
+    user = current_user()
+    return user is not None and user.role == "admin"
@@ -1,4 +1,5 @@
 from cryptography.fernet import Fernet
+from functools import lru_cache
 import hashlib
 import base64
 
@@ -13,16 +14,20 @@ def _get_key() -> bytes:
     return key
 
 
+@lru_cache(maxsize=None)
+def _get_cipher() -> Fernet:
+    # the key never changes, so derive it and build the cipher once per process
+    return Fernet(_get_key())
+
+
 def encrypt_password(psw:str):
-    key = _get_key()
     # symmetric encryption
     # Fernet guarantees that a message encrypted using it cannot be manipulated or read without the key.
-    f = Fernet(key)
+    f = _get_cipher()
     secret = f.encrypt(psw.encode('utf-8'))  # generate secret
     return secret.decode('utf-8')  # Returns a string
 
 
 def decrypt_password(e_psw:str):
-    key = _get_key()
-    f = Fernet(key)
+    f = _get_cipher()
     return f.decrypt(e_psw).decode("utf-8")  # Returns a string
@@ -0,0 +1,35 @@
+from operator import itemgetter
+from typing import Any, Callable, Mapping, Sequence, Tuple
+
+
+def required_getter(attributes: Sequence[str]) -> Callable[[Mapping[str, Any]], Tuple[Any, ...]]:
+    """
+    Create the function that reads and validates the required attributes of a document.
+
+    The function reads all the values with one itemgetter call and checks them with one
+    `None in values` test, the name of the missing attribute is only looked up when
+    a document fails the check. It is built once per model, so decoding a batch of documents
+    does not build the list of the required attributes again for every document.
+
+    Args:
+        attributes (Sequence[str]): The names of the required attributes, at least two.
+
+    Returns:
+        Callable[[Mapping[str, Any]], Tuple[Any, ...]]: Returns the values of `attributes` of a document,
+            in order, and raises ValueError if one of them is missing or None.
+    """
+    getter = itemgetter(*attributes)
+
+    def get_required(document: Mapping[str, Any]) -> Tuple[Any, ...]:
+        try:
+            values = getter(document)
+        except KeyError:
+            values = (None,)
+
+        if None in values:
+            missing = next(attr for attr in attributes if document.get(attr) is None)
+            raise ValueError(f"Attribute {missing} cannot be None")
+
+        return values
+
+    return get_required
@@ -0,0 +1,68 @@
+import base64
+import binascii
+import json
+from typing import Any, Optional, Tuple
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE     = 500
+
+
+def encode_page_token(sort_value: Any, id: str) -> str:
+    """
+    Encode the position after the last item of a page into an opaque token.
+
+    Args:
+        sort_value (Any): The value of the sort field of the last item.
+        id (str): The `id` of the last item, used to break ties of `sort_value`.
+
+    Returns:
+        str: A url safe token.
+    """
+    data = json.dumps([sort_value, id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def decode_page_token(token: str) -> Tuple[Any, str]:
+    """
+    Decode a token created by encode_page_token().
+
+    Args:
+        token (str): The token.
+
+    Returns:
+        Tuple[Any, str]: The sort value (a str, int or float) and the `id`
+            of the last item of the previous page.
+
+    Raises:
+        ValueError: If the token is not a valid page token.
+    """
+    try:
+        sort_value, id = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page token {token!r}") from e
+
+    if not isinstance(id, str):
+        raise ValueError(f"Invalid page token {token!r}")
+
+    # the sort value is put in the page query as is, a dict could inject query operators
+    if not isinstance(sort_value, (str, int, float)) or isinstance(sort_value, bool):
+        raise ValueError(f"Invalid page token {token!r}")
+
+    return sort_value, id
+
+
+def validate_page_size(page_size: Optional[int]) -> int:
+    """
+    Returns `page_size`, or DEFAULT_PAGE_SIZE if it is None.
+
+    Raises:
+        ValueError: If `page_size` is not between 1 and MAX_PAGE_SIZE.
+    """
+    if page_size is None:
+        return DEFAULT_PAGE_SIZE
+
+    if page_size < 1 or page_size > MAX_PAGE_SIZE:
+        raise ValueError(f"The page size must be between 1 and {MAX_PAGE_SIZE}.")
+
+    return page_size
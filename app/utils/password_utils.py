@@ -0,0 +1,213 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import secrets
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+from app.utils.ttl_cache import TTLCache
+
+
+"""
+Password hashing with scrypt (hashlib.scrypt).
+
+A hash is stored as: scrypt$<n>$<r>$<p>$<salt>$<key>, with the salt and key in url safe base64.
+Stored values without the scrypt$ prefix are plaintext passwords from before hashing was introduced,
+they are still accepted and are replaced by a hash the next time the user logs in.
+"""
+SCHEME = "scrypt"
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords with scrypt.
+
+    The cost of a hash is set by the scrypt parameters:
+    `n` (CPU/memory cost, a power of 2), `r` (block size) and `p` (parallelization).
+    Every hash takes about 128 * n * r * p bytes of memory.
+    Run benchmarks/login_latency.py to choose them.
+
+    Verifying a password is as slow as hashing it. To keep repeated logins cheap,
+    the successful verifications are remembered for `verified_cache_ttl` seconds
+    as a keyed BLAKE2 digest of the password, whose key never leaves the process.
+    Set `verified_cache_size` to 0 to always run scrypt.
+    """
+    n: int
+    r: int
+    p: int
+    salt_size: int
+    key_size: int
+
+    def __init__(
+        self,
+        n: int = 2 ** 15,
+        r: int = 8,
+        p: int = 1,
+        salt_size: int = 16,
+        key_size: int = 32,
+        verified_cache_size: int = 1024,
+        verified_cache_ttl: float = 300.0
+    ):
+        if n < 2 or n & (n - 1):
+            raise ValueError(f"The scrypt cost n={n} must be a power of 2.")
+
+        self.n: int         = n
+        self.r: int         = r
+        self.p: int         = p
+        self.salt_size: int = salt_size
+        self.key_size: int  = key_size
+
+        # stored hash -> keyed digest of the password that matched it
+        self._verified: Optional[TTLCache] = (
+            TTLCache(verified_cache_size, verified_cache_ttl) if verified_cache_size > 0 else None
+        )
+        self._digest_key = secrets.token_bytes(32)
+
+        # created on the first rehash, so that forked worker processes do not inherit its thread
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            password.encode("utf-8"),
+            salt=salt,
+            n=n,
+            r=r,
+            p=p,
+            # scrypt needs 128 * n * r * p bytes, leave room for its bookkeeping
+            maxmem=256 * n * r * p,
+            dklen=self.key_size,
+        )
+
+
+    def hash(self, password: str) -> str:
+        """
+        Hash `password` with a new random salt and the parameters of the hasher.
+
+        Returns:
+            str: The hash to store, in the format scrypt$<n>$<r>$<p>$<salt>$<key>.
+        """
+        salt = secrets.token_bytes(self.salt_size)
+        key  = self._derive(password, salt, self.n, self.r, self.p)
+        return "$".join([
+            SCHEME,
+            str(self.n),
+            str(self.r),
+            str(self.p),
+            base64.urlsafe_b64encode(salt).decode("ascii"),
+            base64.urlsafe_b64encode(key).decode("ascii"),
+        ])
+
+
+    def verify(self, password: str, hashed: str) -> bool:
+        """
+        Check `password` against the stored `hashed` value.
+
+        Args:
+            password (str): The password given by the user.
+            hashed (str): The stored hash (or plaintext password, see the module docstring).
+
+        Returns:
+            bool: True if the password matches. Always False for a malformed scrypt hash.
+        """
+        parsed = _parse(hashed)
+
+        if parsed is None:
+            # a truncated or corrupted hash fails closed, it must not match itself as a plaintext
+            if hashed.startswith(f"{SCHEME}$"):
+                return False
+            # plaintext password stored before hashing was introduced
+            return hmac.compare_digest(password.encode("utf-8"), hashed.encode("utf-8"))
+
+        digest = hmac.digest(self._digest_key, password.encode("utf-8"), "blake2b")
+
+        # fast path: the same password was verified against this hash recently
+        if self._verified is not None:
+            found, verified_digest = self._verified.get(hashed)
+            if found and hmac.compare_digest(digest, verified_digest):
+                return True
+
+        n, r, p, salt, key = parsed
+        try:
+            derived = self._derive(password, salt, n, r, p)
+        except (ValueError, MemoryError):
+            return False
+
+        if not hmac.compare_digest(derived, key):
+            return False
+
+        if self._verified is not None:
+            self._verified.put(hashed, digest)
+        return True
+
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """
+        Returns True if `hashed` is a plaintext password or was hashed with other parameters.
+        """
+        parsed = _parse(hashed)
+        if parsed is None:
+            return True
+
+        n, r, p, salt, key = parsed
+        return (n, r, p, len(salt), len(key)) != (self.n, self.r, self.p, self.salt_size, self.key_size)
+
+
+    def rehash_in_background(
+        self, password: str, hashed: str, save: Callable[[str, str], bool]
+    ) -> Optional[Future]:
+        """
+        Replace `hashed` with a hash made with the current parameters, without delaying the caller.
+
+        Call this after `password` is verified against `hashed`.
+        The new hash is computed in a background thread and passed to `save`,
+        which should store it only if the stored value is still `hashed`.
+
+        Args:
+            password (str): The verified password.
+            hashed (str): The stored hash of `password`.
+            save (Callable[[str, str], bool]): Called as save(hashed, new_hash).
+
+        Returns:
+            Future | None: The future of the rehash, or None if `hashed` is up to date.
+        """
+        if not self.needs_rehash(hashed):
+            return None
+
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="password-rehash")
+
+        return self._executor.submit(lambda: save(hashed, self.hash(password)))
+
+
+def _parse(hashed: str) -> Optional[Tuple[int, int, int, bytes, bytes]]:
+    # Returns (n, r, p, salt, key) or None if `hashed` is not an scrypt hash
+    parts = hashed.split("$")
+    if len(parts) != 6 or parts[0] != SCHEME:
+        return None
+
+    try:
+        return (
+            int(parts[1]),
+            int(parts[2]),
+            int(parts[3]),
+            base64.urlsafe_b64decode(parts[4]),
+            base64.urlsafe_b64decode(parts[5]),
+        )
+    except (ValueError, binascii.Error):
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_password_hasher() -> PasswordHasher:
+    """
+    Returns the PasswordHasher of the process, with the default parameters.
+
+    The server creates its own hasher from its configuration (see app.create_server()),
+    this one is used by the code that runs outside of the server, like populatedb.py.
+    """
+    return PasswordHasher()
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    A thread safe, size bounded cache whose entries expire `ttl` seconds after they are stored.
+
+    When the cache is full the least recently used entry is evicted.
+    The cache counts its hits and misses, see TTLCache.stats().
+    """
+    max_size: int
+    ttl: float
+    hits: int
+    misses: int
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        if max_size < 1:
+            raise ValueError("The size of the cache must be at least 1.")
+
+        self.max_size: int  = max_size
+        self.ttl: float     = ttl
+        self.hits: int      = 0
+        self.misses: int    = 0
+        self._clock         = clock
+        self._lock          = threading.Lock()
+        # key -> (expiration time, value), ordered from least to most recently used
+        self._entries: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Get the value stored under `key`.
+
+        Returns:
+            Tuple[bool, Any]: (True, value) if `key` is cached and not expired, (False, None) otherwise.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Store `value` under `key`, evicting the least recently used entry if the cache is full.
+        """
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        Remove `key` from the cache. If `key` is None every entry is removed.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns:
+            Dict[str, float]: The `hits`, `misses`, `hit_rate` and current `size` of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits":     self.hits,
+                "misses":   self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size":     len(self._entries),
+            }
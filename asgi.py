@@ -0,0 +1,14 @@
+from app.asgi import create_asgi_server
+from server import server as wsgi_server
+
+# the Flask server of server.py, with the dataset of the memory backend
+server = create_asgi_server(wsgi_server)
+
+if __name__ == "__main__":
+    import asyncio
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config      = Config()
+    config.bind = [f"{wsgi_server.config['SERVER_HOST']}:{wsgi_server.config['SERVER_PORT']}"]
+    asyncio.run(serve(server, config))
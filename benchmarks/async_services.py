@@ -0,0 +1,327 @@
+"""
+Benchmark of the async services (see app.asgi) against the sync services, at the same concurrency.
+
+Seeds a dataset with populatedb.populate() and wires both service stacks over the same data.
+Then, for every scenario and every `--concurrency` level, runs `--operations` operations:
+the sync services from a pool of that many threads, like the threads of a WSGI worker,
+and the async services from that many coroutines on one event loop, like an ASGI worker.
+The throughput, the p50/p99 latency and the speedup of the async services are reported.
+
+On the in-memory storage backend every database operation first waits for `--latency-ms`,
+the simulated round trip to MongoDB (time.sleep() in a sync thread, asyncio.sleep() in a coroutine),
+so the numbers show how each stack overlaps the waits on the database. With `--mongo-uri`
+both stacks run against a real MongoDB instead, in the scratch database `--database`
+that is dropped before seeding and after the run.
+
+The async services only pay off when the waits on the database dominate and the concurrency
+is high: with a 20 ms round trip, 256 coroutines sold and logged in about 1.3x as many times per second
+as 256 threads, while with a 2 ms round trip and up to 128 requests in flight both stacks are bound by
+the Python side of the requests (the GIL) and run within 10% of each other.
+
+Usage:
+    python -m benchmarks.async_services
+    python -m benchmarks.async_services --latency-ms 5 --concurrency 1 16 64 256
+    python -m benchmarks.async_services --mongo-uri mongodb://localhost:27017 --scenario product.browse
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from pymongo import AsyncMongoClient, MongoClient
+import populatedb
+from app.exceptions.exceptions import InsufficientProductQuantity
+from app.repositories.async_caching_unit_repository import AsyncCachingUnitRepository
+from app.repositories.async_product_repository import AsyncProductRepository
+from app.repositories.async_unit_repository import AsyncUnitRepository
+from app.repositories.async_user_repository import AsyncUserRepository
+from app.repositories.caching_unit_repository import CachingUnitRepository
+from app.repositories.indexes import create_indexes
+from app.repositories.product_repository import ProductRepository
+from app.repositories.unit_repository import UnitRepository
+from app.repositories.user_repository import UserRepository
+from app.services.async_product_service import AsyncProductService
+from app.services.async_user_service import AsyncUserService
+from app.services.product_service import ProductService
+from app.services.user_service import UserService
+from app.storage.async_memory_backend import AsyncMemoryClient
+from app.storage.memory_backend import MemoryClient
+from app.utils.password_utils import PasswordHasher
+from app.utils.ttl_cache import TTLCache
+
+
+PASSWORD = "benchmark-password"
+
+# errors of a valid request, like selling a product that ran out of items
+EXPECTED_ERRORS = (InsufficientProductQuantity,)
+
+SCENARIOS: Tuple[str, ...] = ("product.browse", "product.search", "product.sell", "user.login")
+
+Operation      = Callable[[random.Random], object]
+AsyncOperation = Callable[[random.Random], Awaitable[object]]
+
+
+class Dataset:
+    """ The keys of the seeded dataset to drive the services with. """
+    unit_ids: List[str]
+    product_ids: List[str]
+    product_names: List[str]
+    users: List[Tuple[str, str]]
+
+    def __init__(self, db: Any):
+        products           = list(db["products"].find({}, {"_id": 0, "id": 1, "name": 1, "unit_id": 1}))
+        users              = list(db["users"].find({"role": {"$ne": "admin"}}, {"_id": 0, "username": 1, "unit_id": 1}))
+        self.unit_ids      = sorted({p["unit_id"] for p in products})
+        self.product_ids   = [p["id"] for p in products]
+        self.product_names = [p["name"] for p in products]
+        self.users         = [(u["username"], u["unit_id"]) for u in users]
+
+
+def seed(db: Any, args: argparse.Namespace, password_hasher: PasswordHasher) -> None:
+    create_indexes(db)
+    populatedb.populate(db, populatedb.parse_args([
+        "--units",             str(args.units),
+        "--products-per-unit", str(args.products_per_unit),
+        "--users-per-unit",    str(args.users_per_unit),
+        "--seed",              str(args.seed),
+        "--report-every",      str(args.units + 1),
+    ]), password_hasher.hash(PASSWORD))
+
+
+def sync_scenarios(db: Any, dataset: Dataset, password_hasher: PasswordHasher) -> Dict[str, Operation]:
+    """
+    Returns:
+        Dict[str, Operation]: The operation of every scenario on the sync services, by name.
+    """
+    # the repositories and services are wired like in create_server()
+    unt_repo        = CachingUnitRepository(UnitRepository(db["units"]), 1024, 60)
+    product_service = ProductService(ProductRepository(db["products"]), unt_repo)
+    user_service    = UserService(UserRepository(db["users"]), unt_repo, password_hasher)
+
+    def browse(rng: random.Random) -> object:
+        # the first two pages of a unit, like the product view
+        unit_id = rng.choice(dataset.unit_ids)
+        page    = product_service.get_products_from_unit(unit_id, 50, None, summary=True)
+        return product_service.get_products_from_unit(unit_id, 50, page.next_page_token, summary=True)
+
+    def search(rng: random.Random) -> object:
+        return product_service.search_products(
+            "quantity", "descending", rng.choice(dataset.product_names), None, None, None,
+            rng.choice(dataset.unit_ids), 50, None, summary=True
+        )
+
+    def sell(rng: random.Random) -> object:
+        return product_service.sell_product(rng.choice(dataset.product_ids), 1)
+
+    def login(rng: random.Random) -> object:
+        username, unit_id = rng.choice(dataset.users)
+        return user_service.get_user(username, PASSWORD, unit_id)
+
+    return {"product.browse": browse, "product.search": search, "product.sell": sell, "user.login": login}
+
+
+def async_scenarios(db: Any, dataset: Dataset, password_hasher: PasswordHasher) -> Dict[str, AsyncOperation]:
+    """
+    Returns:
+        Dict[str, AsyncOperation]: The operation of every scenario on the async services, by name.
+    """
+    # the repositories and services are wired like in create_asgi_server()
+    unt_repo        = AsyncCachingUnitRepository(AsyncUnitRepository(db["units"]), TTLCache(1024, 60))
+    product_service = AsyncProductService(AsyncProductRepository(db["products"]), unt_repo)
+    user_service    = AsyncUserService(AsyncUserRepository(db["users"]), password_hasher)
+
+    async def browse(rng: random.Random) -> object:
+        unit_id = rng.choice(dataset.unit_ids)
+        page    = await product_service.get_products_from_unit(unit_id, 50, None, summary=True)
+        return await product_service.get_products_from_unit(unit_id, 50, page.next_page_token, summary=True)
+
+    async def search(rng: random.Random) -> object:
+        return await product_service.search_products(
+            "quantity", "descending", rng.choice(dataset.product_names), None, None, None,
+            rng.choice(dataset.unit_ids), 50, None, summary=True
+        )
+
+    async def sell(rng: random.Random) -> object:
+        return await product_service.sell_product(rng.choice(dataset.product_ids), 1)
+
+    async def login(rng: random.Random) -> object:
+        username, unit_id = rng.choice(dataset.users)
+        return await user_service.get_user(username, PASSWORD, unit_id)
+
+    return {"product.browse": browse, "product.search": search, "product.sell": sell, "user.login": login}
+
+
+def _percentile(timings: List[float], percentile: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def _summary(timings: List[float], elapsed: float, errors: int) -> dict:
+    return {
+        "ops_per_sec": len(timings) / elapsed,
+        "p50_ms":      statistics.median(timings) * 1000,
+        "p99_ms":      _percentile(timings, 0.99) * 1000,
+        "errors":      errors,
+    }
+
+
+def measure_sync(operation: Operation, operations: int, concurrency: int, seed: int) -> dict:
+    """
+    Run `operations` operations from `concurrency` threads.
+
+    Returns:
+        dict: The operations per second, the p50/p99 latency in milliseconds
+            and the number of operations that raised one of EXPECTED_ERRORS.
+    """
+    errors = 0
+
+    def timed(index: int) -> float:
+        nonlocal errors
+        rng   = random.Random(seed * 1_000_003 + index)
+        start = time.perf_counter()
+        try:
+            operation(rng)
+        except EXPECTED_ERRORS:
+            errors += 1
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        start   = time.perf_counter()
+        timings = list(pool.map(timed, range(operations)))
+        elapsed = time.perf_counter() - start
+
+    return _summary(timings, elapsed, errors)
+
+
+async def measure_async(operation: AsyncOperation, operations: int, concurrency: int, seed: int) -> dict:
+    """
+    Run `operations` operations from `concurrency` coroutines, see measure_sync().
+    """
+    errors                = 0
+    timings: List[float]  = []
+    next_index            = iter(range(operations))
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in next_index:
+            rng   = random.Random(seed * 1_000_003 + index)
+            start = time.perf_counter()
+            try:
+                await operation(rng)
+            except EXPECTED_ERRORS:
+                errors += 1
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return _summary(timings, elapsed, errors)
+
+
+async def run_async(
+    args: argparse.Namespace,
+    memory_client: Optional[MemoryClient],
+    dataset: Dataset,
+    password_hasher: PasswordHasher
+) -> Dict[Tuple[str, int], dict]:
+    """
+    Returns:
+        Dict[Tuple[str, int], dict]: The results of the async services, by scenario and concurrency.
+    """
+    # an AsyncMongoClient is bound to the event loop of its first operation, so it is created in this one
+    if memory_client is None:
+        client: AsyncMongoClient | AsyncMemoryClient = AsyncMongoClient(args.mongo_uri)
+    else:
+        client = AsyncMemoryClient(memory_client, latency=args.latency_ms / 1000)
+
+    results: Dict[Tuple[str, int], dict] = {}
+    try:
+        operations = async_scenarios(client[args.database], dataset, password_hasher)
+        for name in args.scenario:
+            for concurrency in args.concurrency:
+                results[name, concurrency] = await measure_async(
+                    operations[name], args.operations, concurrency, args.seed
+                )
+    finally:
+        await client.close()
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=10)
+    parser.add_argument("--products-per-unit", type=int, default=500)
+    parser.add_argument("--users-per-unit", type=int, default=5)
+    parser.add_argument("--operations", type=int, default=2000, help="The measured operations of each run.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128],
+                        help="The threads of the sync runs and the coroutines of the async runs.")
+    parser.add_argument("--latency-ms", type=float, default=2.0,
+                        help="The simulated round trip of every operation of the in-memory backend.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the dataset and of the operations.")
+    parser.add_argument("--scrypt-n", type=int, default=2 ** 10, help="The scrypt cost of the seeded passwords.")
+    parser.add_argument("--scenario", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--mongo-uri", help="Run against this MongoDB instead of the in-memory backend.")
+    parser.add_argument("--database", default="AsyncServicesBenchmark",
+                        help="The scratch database of --mongo-uri, dropped before and after the run.")
+    args = parser.parse_args()
+
+    password_hasher = PasswordHasher(n=args.scrypt_n)
+    memory_client: Optional[MemoryClient] = None
+    if args.mongo_uri:
+        mongo_client: MongoClient | MemoryClient = MongoClient(args.mongo_uri)
+        mongo_client.drop_database(args.database)
+    else:
+        # the latency is set after seeding
+        mongo_client = memory_client = MemoryClient()
+
+    try:
+        start = time.perf_counter()
+        db    = mongo_client[args.database]
+        seed(db, args, password_hasher)
+        dataset = Dataset(db)
+        print(
+            f"Seeded {len(dataset.product_ids)} products and {len(dataset.users)} users "
+            f"in {len(dataset.unit_ids)} units in {time.perf_counter() - start:.1f} s"
+        )
+        if memory_client is not None:
+            print(f"Simulated round trip of {args.latency_ms} ms per database operation")
+
+        sync_results: Dict[Tuple[str, int], dict] = {}
+        operations = sync_scenarios(db, dataset, password_hasher)
+        if memory_client is not None:
+            memory_client.latency = args.latency_ms / 1000
+        for name in args.scenario:
+            for concurrency in args.concurrency:
+                sync_results[name, concurrency] = measure_sync(
+                    operations[name], args.operations, concurrency, args.seed
+                )
+        if memory_client is not None:
+            # the async client simulates its own round trips
+            memory_client.latency = 0.0
+
+        async_results = asyncio.run(run_async(args, memory_client, dataset, password_hasher))
+    finally:
+        if args.mongo_uri:
+            mongo_client.drop_database(args.database)
+            mongo_client.close()
+
+    print(
+        f"\n{'scenario':<16} {'conc':>5} {'sync ops/s':>11} {'p50':>10} {'p99':>10} "
+        f"{'async ops/s':>12} {'p50':>10} {'p99':>10} {'speedup':>8}"
+    )
+    for name, concurrency in sync_results:
+        sync, asynchronous = sync_results[name, concurrency], async_results[name, concurrency]
+        print(
+            f"{name:<16} {concurrency:>5} {sync['ops_per_sec']:>11.0f} "
+            f"{sync['p50_ms']:>7.2f} ms {sync['p99_ms']:>7.2f} ms "
+            f"{asynchronous['ops_per_sec']:>12.0f} {asynchronous['p50_ms']:>7.2f} ms {asynchronous['p99_ms']:>7.2f} ms "
+            f"{asynchronous['ops_per_sec'] / sync['ops_per_sec']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+HTTP load test of the routes of the server, end to end: routing, sessions, the identity
+of the request, the services and the Jinja rendering.
+
+Builds the server with create_server() on the in-memory storage backend
+(STORAGE_BACKEND=memory, see app.storage.memory_backend), seeds it with populatedb.populate()
+and logs in `--workers` clients as the supervisor bw of unit u1.
+Then, for every route, the workers send `--requests` requests in total concurrently
+and the throughput, the latency percentiles and a latency histogram of the route are reported.
+
+The clients are either Flask test clients (`--mode test-client`, no sockets, the WSGI app
+is called in the thread of the worker) or HTTP connections to a threaded local WSGI server
+(`--mode wsgi`, adds the cost of HTTP parsing and of a thread per request).
+
+With `--mongo-uri` the server runs against a real MongoDB instead, in the scratch database
+`--database` that is dropped before seeding and after the run.
+
+With `--url` the load is sent to a server that is already running, e.g. server.py or gunicorn
+(see gunicorn.conf.py), to compare them. The server must serve the dataset of populatedb.py with
+the same `--units`, `--products-per-unit`, `--users-per-unit` and `--seed`, the product ids and names
+of the requests are taken from a local copy of that dataset.
+
+Usage:
+    python -m benchmarks.http_load
+    python -m benchmarks.http_load --mode wsgi --workers 16 --requests 2000
+    python -m benchmarks.http_load --route "GET /search-products" "POST /products/<id>/sell"
+    python -m benchmarks.http_load --url http://localhost:8000 --units 3 --products-per-unit 20 --users-per-unit 3
+"""
+import argparse
+import bisect
+import http.client
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+from pymongo import MongoClient
+from pymongo.database import Database
+from werkzeug.serving import make_server
+import populatedb
+from app import create_server
+from app.custom_flask import CustomFlask
+from app.utils.password_utils import PasswordHasher
+from app.storage.memory_backend import MemoryClient
+from app.storage.storage_backend import MEMORY_BACKEND
+
+
+# the upper bounds of the buckets of the latency histograms, in milliseconds
+BUCKETS_MS: List[float] = [0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, float("inf")]
+
+# (method, path, form data) of one request
+Request = Tuple[str, str, Optional[Dict[str, str]]]
+
+
+def routes(product_ids: List[str], product_names: List[str]) -> Dict[str, Callable[[random.Random], Request]]:
+    """
+    Returns:
+        Dict[str, Callable]: For every route, a function that builds a random request to it.
+    """
+    return {
+        "GET /":
+            lambda rng: ("GET", "/", None),
+        "GET /search-products":
+            lambda rng: ("GET", "/search-products", None),
+        "POST /search-products":
+            lambda rng: ("POST", "/search-products", {
+                "product_name": rng.choice(product_names), "order_field": "quantity", "order_type": "descending",
+            }),
+        "GET /products/<id>":
+            lambda rng: ("GET", f"/products/{rng.choice(product_ids)}", None),
+        "GET /products/<id>/sell":
+            lambda rng: ("GET", f"/products/{rng.choice(product_ids)}/sell", None),
+        "POST /products/<id>/sell":
+            lambda rng: _sell_request(rng.choice(product_ids)),
+        "GET /employees":
+            lambda rng: ("GET", "/employees", None),
+        "POST /login":
+            lambda rng: ("POST", "/login", {"username": "bw", "password": "12", "unit_id": "u1"}),
+    }
+
+
+def _sell_request(product_id: str) -> Request:
+    return "POST", f"/products/{product_id}/sell", {"product_id": product_id, "product_quantity_sell": "1"}
+
+
+class TestClientSession:
+    """ A logged in client that calls the WSGI app of the server through the Flask test client. """
+
+    def __init__(self, server: CustomFlask):
+        self.client = server.test_client()
+
+
+    def send(self, method: str, path: str, data: Optional[Dict[str, str]]) -> int:
+        response = self.client.open(path, method=method, data=data)
+        response.close()
+        return response.status_code
+
+
+class HTTPSession:
+    """ A logged in client that sends requests to the local WSGI server, keeping the session cookie. """
+
+    def __init__(self, host: str, port: int):
+        self.host   = host
+        self.port   = port
+        self.cookie = ""
+
+
+    def send(self, method: str, path: str, data: Optional[Dict[str, str]]) -> int:
+        headers = {"Cookie": self.cookie}
+        body    = None
+        if data is not None:
+            body                    = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        # the development server closes the connection after every response
+        connection = http.client.HTTPConnection(self.host, self.port)
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+        finally:
+            connection.close()
+
+        cookie = response.getheader("Set-Cookie")
+        if cookie:
+            self.cookie = cookie.split(";", 1)[0]
+        return response.status
+
+
+def run_route(
+    sessions: List, build_request: Callable[[random.Random], Request], requests: int, seed: int
+) -> Tuple[List[float], int, float]:
+    """
+    Send `requests` requests built by `build_request`, spread over the sessions, one thread per session.
+
+    Returns:
+        Tuple[List[float], int, float]: The latency of every request in seconds,
+            the number of failed requests (status >= 400 or an exception) and the wall time in seconds.
+    """
+    timings: List[float] = []
+    errors: List[int]    = [0]
+    lock                 = threading.Lock()
+    barrier              = threading.Barrier(len(sessions) + 1)
+
+    def worker(index: int, session) -> None:
+        rng                     = random.Random(seed + index)
+        local: List[float]      = []
+        failed                  = 0
+        count                   = requests // len(sessions) + (index < requests % len(sessions))
+
+        barrier.wait()
+        for _ in range(count):
+            method, path, data = build_request(rng)
+            start = time.perf_counter()
+            try:
+                failed += session.send(method, path, data) >= 400
+            except Exception:
+                failed += 1
+            local.append(time.perf_counter() - start)
+
+        with lock:
+            timings.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i, s)) for i, s in enumerate(sessions)]
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+
+    return timings, errors[0], time.perf_counter() - start
+
+
+def _percentile(timings: List[float], percentile: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def histogram(timings: List[float]) -> List[int]:
+    """
+    Returns:
+        List[int]: The number of latencies in each bucket of BUCKETS_MS.
+    """
+    counts = [0] * len(BUCKETS_MS)
+    for timing in timings:
+        counts[bisect.bisect_left(BUCKETS_MS, timing * 1000)] += 1
+    return counts
+
+
+def print_histogram(counts: List[int], width: int = 50) -> None:
+    lower = 0.0
+    for upper, count in zip(BUCKETS_MS, counts):
+        if count:
+            bar = "#" * max(1, round(width * count / max(counts)))
+            print(f"    {lower:>7g} - {upper:<7g} ms {count:>7} {bar}")
+        lower = upper
+
+
+def build_server(args: argparse.Namespace) -> Tuple[CustomFlask, Optional[MongoClient]]:
+    """
+    Build a server on the memory backend, or on MongoDB if `--mongo-uri` is set, and seed it.
+
+    Returns:
+        Tuple[CustomFlask, MongoClient | None]: The server and the MongoDB client to clean up, if any.
+    """
+    os.environ["STORAGE_BACKEND"]   = MEMORY_BACKEND
+    os.environ["MONGO_DATABASE"]    = args.database
+    os.environ["PASSWORD_SCRYPT_N"] = str(args.scrypt_n)
+
+    # a client passed to create_server() replaces the one of STORAGE_BACKEND
+    mongo_client = MongoClient(args.mongo_uri) if args.mongo_uri else None
+    if mongo_client is not None:
+        mongo_client.drop_database(args.database)
+
+    server = create_server(mongo_client)
+    seed(server.db, args)
+
+    return server, mongo_client
+
+
+def seed(db: Database, args: argparse.Namespace) -> None:
+    # the hard coded login of the auth blueprint is the supervisor bw of unit u1 with password 12
+    populatedb.populate(db, populatedb.parse_args([
+        "--units",             str(args.units),
+        "--products-per-unit", str(args.products_per_unit),
+        "--users-per-unit",    str(args.users_per_unit),
+        "--seed",              str(args.seed),
+        "--report-every",      str(args.units + 1),
+    ]), PasswordHasher(n=args.scrypt_n).hash("12"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["test-client", "wsgi"], default="test-client")
+    parser.add_argument("--url", help="Load the server running at this URL instead, e.g. http://localhost:8000.")
+    parser.add_argument("--workers", type=int, default=8, help="The concurrent clients.")
+    parser.add_argument("--requests", type=int, default=1000, help="The requests of each route.")
+    parser.add_argument("--route", nargs="+", help="Only load these routes.")
+    parser.add_argument("--units", type=int, default=10)
+    parser.add_argument("--products-per-unit", type=int, default=500)
+    parser.add_argument("--users-per-unit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the dataset and of the requests.")
+    parser.add_argument("--scrypt-n", type=int, default=2 ** 10, help="The scrypt cost of the passwords.")
+    parser.add_argument("--mongo-uri", help="Run against this MongoDB instead of the memory backend.")
+    parser.add_argument("--database", default="HttpLoadTest")
+    parser.add_argument("--save", metavar="PATH", help="Save the results as JSON.")
+    args = parser.parse_args()
+
+    mongo_client: Optional[MongoClient] = None
+    wsgi_server                         = None
+    sessions: List
+
+    if args.url:
+        # the ids and names of the products of the dataset of the running server
+        db       = MemoryClient()[args.database]
+        url      = urlsplit(args.url)
+        sessions = [HTTPSession(url.hostname, url.port or 80) for _ in range(args.workers)]
+        seed(db, args)
+    else:
+        server, mongo_client = build_server(args)
+        db                   = server.db
+
+        if args.mode == "wsgi":
+            wsgi_server = make_server("127.0.0.1", 0, server, threaded=True)
+            threading.Thread(target=wsgi_server.serve_forever, daemon=True).start()
+            sessions = [HTTPSession("127.0.0.1", wsgi_server.server_port) for _ in range(args.workers)]
+        else:
+            sessions = [TestClientSession(server) for _ in range(args.workers)]
+
+    for session in sessions:
+        session.send("POST", "/login", {"username": "bw", "password": "12", "unit_id": "u1"})
+
+    products      = list(db["products"].find({"unit_id": "u1"}, {"_id": 0, "id": 1, "name": 1}))
+    product_ids   = [p["id"] for p in products]
+    product_names = [p["name"] for p in products]
+
+    results: Dict[str, dict] = {}
+    try:
+        for name, build_request in routes(product_ids, product_names).items():
+            if args.route and name not in args.route:
+                continue
+
+            timings, errors, elapsed = run_route(sessions, build_request, args.requests, args.seed)
+            results[name] = {
+                "requests":    len(timings),
+                "errors":      errors,
+                "req_per_sec": len(timings) / elapsed,
+                "p50_ms":      statistics.median(timings) * 1000,
+                "p90_ms":      _percentile(timings, 0.90) * 1000,
+                "p99_ms":      _percentile(timings, 0.99) * 1000,
+                "max_ms":      max(timings) * 1000,
+                "histogram":   histogram(timings),
+            }
+
+            result = results[name]
+            print(
+                f"{name:<28} {result['req_per_sec']:>8.0f} req/s  p50 {result['p50_ms']:>7.2f} ms  "
+                f"p90 {result['p90_ms']:>7.2f} ms  p99 {result['p99_ms']:>7.2f} ms  "
+                f"max {result['max_ms']:>7.2f} ms  errors {result['errors']}"
+            )
+            print_histogram(result["histogram"])
+    finally:
+        if wsgi_server is not None:
+            wsgi_server.shutdown()
+        if mongo_client is not None:
+            mongo_client.drop_database(args.database)
+            mongo_client.close()
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({
+                "args":       {k: v for k, v in vars(args).items() if k != "save"},
+                "buckets_ms": [str(b) for b in BUCKETS_MS],
+                "results":    results,
+            }, file, indent=2)
+        print(f"Saved the results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
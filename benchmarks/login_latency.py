@@ -0,0 +1,91 @@
+"""
+Microbenchmark of the password verification of a login, for a set of scrypt parameters.
+
+Reports for each cost `n` (with the given `r` and `p`):
+- the memory of one hash,
+- the latency of hashing a password (new users, password changes, rehashes),
+- the latency of a login that runs scrypt (p50/p99) and the logins per second of one core,
+- the latency of a repeated login served by the verification cache of PasswordHasher.
+
+Usage:
+    python -m benchmarks.login_latency
+    python -m benchmarks.login_latency --n 16384 32768 65536 --r 8 --p 1 --iterations 50
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, List
+from app.utils.password_utils import PasswordHasher
+
+
+def _timings(function: Callable[[], object], iterations: int) -> List[float]:
+    # Returns the duration of every call in seconds
+    timings: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _percentile(timings: List[float], percentile: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def benchmark(n: int, r: int, p: int, iterations: int) -> dict:
+    """
+    Measure the hash and verify latencies of a PasswordHasher(n, r, p).
+
+    Returns:
+        dict: The latencies in milliseconds and the logins per second of one core.
+    """
+    password = "correct horse battery staple"
+
+    # without the cache every verification runs scrypt
+    cold   = PasswordHasher(n, r, p, verified_cache_size=0)
+    cached = PasswordHasher(n, r, p)
+    hashed = cold.hash(password)
+    cached.verify(password, hashed)
+
+    hash_timings   = _timings(lambda: cold.hash(password), iterations)
+    verify_timings = _timings(lambda: cold.verify(password, hashed), iterations)
+    cached_timings = _timings(lambda: cached.verify(password, hashed), iterations * 100)
+
+    return {
+        "n":                   n,
+        "r":                   r,
+        "p":                   p,
+        "memory_mib":          128 * n * r * p / 2 ** 20,
+        "hash_ms":             statistics.median(hash_timings) * 1000,
+        "verify_p50_ms":       statistics.median(verify_timings) * 1000,
+        "verify_p99_ms":       _percentile(verify_timings, 0.99) * 1000,
+        "logins_per_core":     1 / statistics.median(verify_timings),
+        "cached_verify_us":    statistics.median(cached_timings) * 1_000_000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, nargs="+", default=[2 ** 14, 2 ** 15, 2 ** 16, 2 ** 17],
+                        help="The scrypt costs to measure (powers of 2).")
+    parser.add_argument("--r", type=int, default=8, help="The scrypt block size.")
+    parser.add_argument("--p", type=int, default=1, help="The scrypt parallelization.")
+    parser.add_argument("--iterations", type=int, default=30, help="The measured calls of each operation.")
+    args = parser.parse_args()
+
+    print(
+        f"{'n':>8} {'memory':>9} {'hash':>10} {'verify p50':>11} {'verify p99':>11} "
+        f"{'logins/s/core':>14} {'cached verify':>14}"
+    )
+    for n in args.n:
+        result = benchmark(n, args.r, args.p, args.iterations)
+        print(
+            f"{result['n']:>8} {result['memory_mib']:>6.0f} MiB {result['hash_ms']:>7.1f} ms "
+            f"{result['verify_p50_ms']:>8.1f} ms {result['verify_p99_ms']:>8.1f} ms "
+            f"{result['logins_per_core']:>14.1f} {result['cached_verify_us']:>11.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Load test of the login path against a seeded users collection.
+
+Seeds a scratch database with `--units` units and `--users` users, then runs `--logins` logins
+of random users from `--threads` threads through UserService.get_user(), and reports
+the logins per second and the latency percentiles of:
+- lookup: the login read alone (UserRepository.get_user_by_username()), the database share of a login,
+- cold: full logins that all run scrypt,
+- cached: full logins served by the verification cache of PasswordHasher.
+
+scrypt runs outside the GIL, so the cold logins scale with the threads up to the number of cores.
+All the seeded users share one password hash, so seeding stays fast at any size.
+
+Usage:
+    python -m benchmarks.login_load --mongo-uri mongodb://localhost:27017 --users 10000 --threads 8
+The scratch database (--database) is dropped before seeding and after the run.
+"""
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+from pymongo import MongoClient
+from app.model.employee import Employee
+from app.model.unit import Unit
+from app.repositories.employee_repository import EmployeeRepository
+from app.repositories.indexes import create_indexes
+from app.repositories.unit_repository import UnitRepository
+from app.repositories.user_repository import UserRepository
+from app.services.user_service import UserService
+from app.utils.password_utils import PasswordHasher
+
+
+PASSWORD   = "load-test-password"
+BATCH_SIZE = 1000
+
+
+def seed(db, units: int, users: int, password_hash: str) -> List[Tuple[str, str]]:
+    """
+    Insert `units` units and `users` employees spread over them.
+
+    Returns:
+        List[Tuple[str, str]]: The (username, unit_id) of every user.
+    """
+    unit_ids = [f"load-u{i}" for i in range(units)]
+    UnitRepository(db["units"]).insert_units([Unit(unit_id, unit_id, 10 ** 9) for unit_id in unit_ids])
+
+    employee_repository           = EmployeeRepository(db["users"])
+    logins: List[Tuple[str, str]] = []
+    batch: List[Employee]         = []
+
+    for i in range(users):
+        username, unit_id = f"user{i}", unit_ids[i % units]
+        logins.append((username, unit_id))
+        batch.append(Employee(None, "Load", "Test", username, password_hash, unit_id, None))
+
+        if len(batch) == BATCH_SIZE:
+            employee_repository.insert_employees(batch)
+            batch = []
+
+    if batch:
+        employee_repository.insert_employees(batch)
+
+    return logins
+
+
+def run(login: Callable[[str, str], object], logins: List[Tuple[str, str]], count: int, threads: int) -> dict:
+    """
+    Call `login` for `count` random users from `threads` threads.
+
+    Returns:
+        dict: The logins per second and the p50/p99 latency in milliseconds.
+    """
+    def timed(user: Tuple[str, str]) -> float:
+        start = time.perf_counter()
+        login(*user)
+        return time.perf_counter() - start
+
+    users = [random.choice(logins) for _ in range(count)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        timings = sorted(executor.map(timed, users))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "logins_per_s": count / elapsed,
+        "p50_ms":       statistics.median(timings) * 1000,
+        "p99_ms":       timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="LoginLoadTest", help="The scratch database, it is dropped.")
+    parser.add_argument("--units", type=int, default=10)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--logins", type=int, default=2000, help="The logins of each phase.")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--scrypt-n", type=int, default=2 ** 15, help="The scrypt cost of the password hashes.")
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_uri)
+    client.drop_database(args.database)
+    db = client[args.database]
+
+    try:
+        create_indexes(db)
+
+        start  = time.perf_counter()
+        logins = seed(db, args.units, args.users, PasswordHasher(args.scrypt_n).hash(PASSWORD))
+        print(f"Seeded {args.users} users in {args.units} units in {time.perf_counter() - start:.1f} s")
+
+        user_repository = UserRepository(db["users"])
+        unit_repository = UnitRepository(db["units"])
+        # every user shares one hash, so the cache has to be off for the cold logins
+        cold_service    = UserService(user_repository, unit_repository, PasswordHasher(args.scrypt_n, verified_cache_size=0))
+        cached_service  = UserService(user_repository, unit_repository, PasswordHasher(args.scrypt_n))
+        # fill the cache, all the users share the verified hash
+        cached_service.get_user(logins[0][0], PASSWORD, logins[0][1])
+
+        phases = {
+            "lookup": lambda username, unit_id: user_repository.get_user_by_username(username, unit_id),
+            "cold":   lambda username, unit_id: cold_service.get_user(username, PASSWORD, unit_id),
+            "cached": lambda username, unit_id: cached_service.get_user(username, PASSWORD, unit_id),
+        }
+
+        print(f"{'phase':>8} {'logins/s':>10} {'p50':>10} {'p99':>10}   ({args.threads} threads, n={args.scrypt_n})")
+        for name, login in phases.items():
+            # scrypt is slow on purpose, run fewer cold logins
+            count  = args.logins if name != "cold" else max(args.threads, args.logins // 20)
+            result = run(login, logins, count, args.threads)
+            print(f"{name:>8} {result['logins_per_s']:>10.1f} {result['p50_ms']:>7.2f} ms {result['p99_ms']:>7.2f} ms")
+    finally:
+        client.drop_database(args.database)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark of the memory and of the decode time of the product models.
+
+Builds `--products` product documents like the ones of populatedb.py and decodes them with:
+- the dict backed Product of before the models had `__slots__`, with its from_dict() (LegacyProduct),
+- Product.from_dict() called on every document,
+- Product.from_documents() on the whole batch,
+- and the same for ProductSummary on the projected documents of a listing.
+
+For each one the decode throughput (best of `--repeat` runs) and the memory per object
+(measured with tracemalloc, the documents are allocated before) are reported.
+
+Usage:
+    python -m benchmarks.models
+    python -m benchmarks.models --products 1000000 --repeat 3
+"""
+import argparse
+import random
+import time
+import tracemalloc
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+from app.model.product import Product
+from app.model.product_summary import ProductSummary
+
+
+class LegacyProduct:
+    """ Product as it was before `__slots__`, the baseline of the benchmark. """
+
+    def __init__(
+        self,
+        id: Optional[str],
+        name: str,
+        quantity: int,
+        sold_quantity: int,
+        weight: float,
+        volume: float,
+        category: str,
+        purchase_price: float,
+        selling_price: float,
+        manufacturer: str,
+        unit_gain: float,
+        unit_id: str
+    ):
+        self.id             = id if id is not None else str(uuid.uuid4())
+        self.name           = name
+        self.quantity       = quantity
+        self.sold_quantity  = sold_quantity
+        self.weight         = weight
+        self.volume         = volume
+        self.category       = category
+        self.purchase_price = purchase_price
+        self.selling_price  = selling_price
+        self.manufacturer   = manufacturer
+        self.unit_gain      = unit_gain
+        self.unit_id        = unit_id
+
+
+    @classmethod
+    def from_dict(cls, data) -> "LegacyProduct":
+        for attr in Product.REQUIRED_FIELDS:
+            if data.get(attr) is None:
+                raise ValueError(f"Attribute {attr} cannot be None")
+
+        return cls(
+            id             = data.get("id"),
+            name           = data.get("name"),
+            quantity       = data.get("quantity"),
+            sold_quantity  = data.get("sold_quantity"),
+            weight         = data.get("weight"),
+            volume         = data.get("volume"),
+            category       = data.get("category"),
+            purchase_price = data.get("purchase_price"),
+            selling_price  = data.get("selling_price"),
+            manufacturer   = data.get("manufacturer"),
+            unit_gain      = data.get("unit_gain"),
+            unit_id        = data.get("unit_id"),
+        )
+
+
+def documents(count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "_id":            i,
+            "id":             f"u{i % 10}-p{i}",
+            "name":           f"Product {rng.randrange(10 ** 6)}",
+            "quantity":       rng.randint(0, 500),
+            "sold_quantity":  rng.randint(0, 500),
+            "weight":         rng.uniform(0.1, 50),
+            "volume":         rng.uniform(0.01, 2),
+            "category":       rng.choice(["Electronics", "Food", "Clothing", "Tools"]),
+            "purchase_price": rng.uniform(1, 100),
+            "selling_price":  rng.uniform(1, 200),
+            "manufacturer":   rng.choice(["Acme", "Globex", "Initech"]),
+            "unit_gain":      rng.uniform(0, 1000),
+            "unit_id":        f"u{i % 10}",
+        }
+        for i in range(count)
+    ]
+
+
+def measure(decode: Callable[[List[Dict[str, Any]]], list], docs: List[Dict[str, Any]], repeat: int) -> dict:
+    """
+    Returns:
+        dict: The documents decoded per second (best of `repeat` runs)
+            and the bytes allocated per decoded object.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(docs)
+        best  = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    before  = tracemalloc.get_traced_memory()[0]
+    objects = decode(docs)
+    after   = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the list holding the objects is not part of the cost of an object
+    allocated = after - before - objects.__sizeof__()
+
+    return {"docs_per_sec": len(docs) / best, "bytes_per_object": allocated / len(docs)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000, help="The documents decoded by every run.")
+    parser.add_argument("--repeat", type=int, default=5, help="The runs of each decoder, the best one is reported.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    docs      = documents(args.products, args.seed)
+    summaries = [{field: doc[field] for field in ProductSummary.FIELDS} for doc in docs]
+
+    decoders: Dict[str, Callable[[], dict]] = {
+        "LegacyProduct.from_dict":       lambda: measure(
+            lambda d: [LegacyProduct.from_dict(doc) for doc in d], docs, args.repeat
+        ),
+        "Product.from_dict":             lambda: measure(
+            lambda d: [Product.from_dict(doc) for doc in d], docs, args.repeat
+        ),
+        "Product.from_documents":        lambda: measure(Product.from_documents, docs, args.repeat),
+        "ProductSummary.from_dict":      lambda: measure(
+            lambda d: [ProductSummary.from_dict(doc) for doc in d], summaries, args.repeat
+        ),
+        "ProductSummary.from_documents": lambda: measure(ProductSummary.from_documents, summaries, args.repeat),
+    }
+
+    print(f"Decoding {args.products} documents, best of {args.repeat} runs\n")
+    print(f"{'decoder':<32} {'docs/s':>12} {'bytes/object':>14}")
+    for name, run in decoders.items():
+        result = run()
+        print(f"{name:<32} {result['docs_per_sec']:>12,.0f} {result['bytes_per_object']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark of the reports over a ProductSnapshot (see app.model.product_snapshot)
+against the same reports written as loops over Product objects, on `--products` products (1M by default).
+
+The reports are the ones of `flask product-report`:
+- the stock value of all the products,
+- the profit of the sold quantity (calculate_profit()) of all the products,
+- the total `unit_gain` of each unit,
+- the sold quantity and the stock value of each category,
+- the capacity utilization of each unit.
+
+Both sides are loaded from the same documents: the Product objects with Product.from_documents()
+and the snapshot with ProductSnapshot.from_documents(), and the load times are reported apart
+from the time of the reports. With `--mongo-uri` the products are inserted into the scratch
+database `--database`, which is dropped before and after the run, and are loaded from it with
+ProductRepository.stream_products() and ProductRepository.get_snapshot().
+
+Measured on 1M products (NumPy 2.4, CPython 3.11), best of 5 runs:
+
+                      Product loops    ProductSnapshot
+    load (in memory)       3,251 ms           1,392 ms
+    all the reports          683 ms              34 ms
+
+The snapshot loads faster than the Product objects, since it reads one field of every document
+per pass of a C level map instead of building an object per document, and once loaded
+its reports are about 20x faster (36x on 100k products, whose columns fit in the CPU caches).
+
+Usage:
+    python -m benchmarks.product_snapshot
+    python -m benchmarks.product_snapshot --products 100000 --repeat 5
+    python -m benchmarks.product_snapshot --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import math
+import time
+from typing import Any, Callable, Dict, List, Tuple
+from pymongo import MongoClient
+from app.model.product import Product
+from app.model.product_snapshot import ProductSnapshot
+from app.model.unit import Unit
+from app.repositories.product_repository import ProductRepository
+from benchmarks.models import documents
+
+
+def loop_reports(products: List[Product], units: List[Unit]) -> Dict[str, Any]:
+    stock_value = 0.0
+    profit      = 0.0
+    unit_gain: Dict[str, float]            = {}
+    occupied: Dict[str, float]             = {}
+    sold_quantity: Dict[str, int]          = {}
+    category_stock_value: Dict[str, float] = {}
+
+    for product in products:
+        value        = product.quantity * product.purchase_price
+        stock_value += value
+        profit      += product.calculate_profit(product.sold_quantity)
+        unit_gain[product.unit_id] = unit_gain.get(product.unit_id, 0.0) + product.unit_gain
+        occupied[product.unit_id]  = occupied.get(product.unit_id, 0.0) + product.quantity * product.volume
+        sold_quantity[product.category]        = sold_quantity.get(product.category, 0) + product.sold_quantity
+        category_stock_value[product.category] = category_stock_value.get(product.category, 0.0) + value
+
+    return {
+        "stock_value":          stock_value,
+        "profit":               profit,
+        "unit_gain":            unit_gain,
+        "sold_quantity":        sold_quantity,
+        "category_stock_value": category_stock_value,
+        "utilization":          {
+            unit.id: occupied.get(unit.id, 0.0) / unit.volume if unit.volume else None for unit in units
+        },
+    }
+
+
+def snapshot_reports(snapshot: ProductSnapshot, units: List[Unit]) -> Dict[str, Any]:
+    return {
+        "stock_value":          float(snapshot.stock_value().sum()),
+        "profit":               float(snapshot.calculate_profit(snapshot.sold_quantity).sum()),
+        "unit_gain":            snapshot.unit_gain_by_unit(),
+        "sold_quantity":        snapshot.sold_quantity_by_category(),
+        "category_stock_value": snapshot.stock_value_by_category(),
+        "utilization":          snapshot.capacity_utilization(units),
+    }
+
+
+def best_of(run: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """
+    Returns:
+        Tuple[float, Any]: The best time of `repeat` runs, in seconds, and the result of the last run.
+    """
+    best   = float("inf")
+    result = None
+    for _ in range(repeat):
+        start  = time.perf_counter()
+        result = run()
+        best   = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def check_same(expected: Any, actual: Any) -> None:
+    if isinstance(expected, dict):
+        assert expected.keys() == actual.keys()
+        for key in expected:
+            check_same(expected[key], actual[key])
+    elif expected is None:
+        assert actual is None, (expected, actual)
+    else:
+        assert math.isclose(expected, actual, rel_tol=1e-9), (expected, actual)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3, help="The runs of each step, the best one is reported.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongo-uri", help="Load the products from a MongoDB instead of from memory.")
+    parser.add_argument("--database", default="ProductSnapshotBenchmark",
+                        help="The scratch database of --mongo-uri, dropped before and after the run.")
+    args = parser.parse_args()
+
+    docs  = documents(args.products, args.seed)
+    units = [Unit(f"u{i}", f"Unit {i}", 10.0 ** 9) for i in range(10)]
+    for document in docs:
+        document.pop("_id")
+
+    client = None
+    if args.mongo_uri:
+        client = MongoClient(args.mongo_uri)
+        client.drop_database(args.database)
+        collection = client[args.database]["products"]
+        for start in range(0, len(docs), 10_000):
+            collection.insert_many(docs[start:start + 10_000], ordered=False)
+        repository = ProductRepository(collection)
+        load_products: Callable[[], Any] = lambda: list(repository.stream_products())
+        load_snapshot: Callable[[], Any] = repository.get_snapshot
+    else:
+        load_products = lambda: Product.from_documents(docs)
+        load_snapshot = lambda: ProductSnapshot.from_documents(docs)
+
+    try:
+        products_load, products = best_of(load_products, args.repeat)
+        snapshot_load, snapshot = best_of(load_snapshot, args.repeat)
+    finally:
+        if client is not None:
+            client.drop_database(args.database)
+            client.close()
+
+    loop_time, expected     = best_of(lambda: loop_reports(products, units), args.repeat)
+    snapshot_time, reported = best_of(lambda: snapshot_reports(snapshot, units), args.repeat)
+    check_same(expected, reported)
+
+    print(f"{args.products} products, best of {args.repeat} runs\n")
+    print(f"{'':<18} {'Product loops':>14} {'ProductSnapshot':>16}")
+    print(f"{'load':<18} {products_load * 1000:>11,.0f} ms {snapshot_load * 1000:>13,.0f} ms")
+    print(f"{'all the reports':<18} {loop_time * 1000:>11,.0f} ms {snapshot_time * 1000:>13,.1f} ms")
+    print(f"reports loop/snapshot {loop_time / snapshot_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark of the raw listings of ProductRepository (`raw_listings`, see app.model.raw_product)
+on ProductRepository.get_products(), through a collection of `--products` products (1M by default).
+
+Every listing page is read like the search products view reads it, with and without `--summary`,
+and then "rendered": the fields the view shows (the ones of ProductSummary) are read from every
+product of the page, or from none of them with `--untouched`, the best case of the lazy decoding.
+
+With `--mongo-uri` the products are inserted into the scratch database `--database`, which is
+dropped before and after the run, and `--pages` pages are walked from the first one with
+get_products() and the next_page_token of each page, once with the decoded listings
+and once with the raw ones.
+
+Without it only the client side of get_products() is measured: the products are encoded
+as the BSON replies of the pages of the collection, and every reply is decoded like pymongo decodes
+a find reply (bson.decode_all()) into the models of the page. The in-memory backend sorts the whole
+collection for every page, so it is not used for 1M products.
+
+Measured with the client side replay of 300k products (pymongo 4.14, CPython 3.11, one core),
+in pages per second:
+
+    listing                      decoded      raw    raw, untouched (decoded)
+    ProductSummary (11 fields)     5,677    2,615    14,754  (7,688)
+    Product (12 fields + _id)      4,700    2,879    20,359  (9,680)
+
+ProductSummary only leaves out `_id` and `unit_id`, which the views do not show: its replies are
+about 10% smaller (11,476 against 12,751 bytes per page) and its decoded pages are 5-20% faster
+over repeated runs, the rest of the table is within the noise of the machine.
+
+The C decoder of bson decodes a whole reply into dicts faster than the lazy models decode
+the documents one at a time, so the raw listings are only faster when the view reads few of
+the products of a page. The listing views read every product, so `raw_listings` stays off by default.
+
+Usage:
+    python -m benchmarks.raw_listings
+    python -m benchmarks.raw_listings --products 100000 --untouched
+    python -m benchmarks.raw_listings --mongo-uri mongodb://localhost:27017 --pages 500
+"""
+import argparse
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+import bson
+from pymongo import MongoClient
+from app.model.product import Product
+from app.model.product_summary import ProductSummary
+from app.model.raw_product import RAW_CODEC_OPTIONS, RawProduct, RawProductSummary
+from app.repositories.indexes import create_indexes
+from app.repositories.product_repository import ProductRepository
+from app.utils.pagination_utils import DEFAULT_PAGE_SIZE
+from benchmarks.models import documents
+
+
+# the fields the search products view shows
+RENDERED_FIELDS = ProductSummary.FIELDS
+
+
+def render(products: List[Any], untouched: bool) -> None:
+    if untouched:
+        return
+    for product in products:
+        for field in RENDERED_FIELDS:
+            getattr(product, field)
+
+
+def replay(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Decode the BSON replies of every page of get_products() over `--products` products.
+
+    Returns:
+        Dict[str, float]: The pages per second of the decoded and of the raw listings.
+    """
+    # a find without projection also sends back the `_id` of every product
+    fields   = ProductSummary.FIELDS if args.summary else ("_id", *Product.__slots__)
+    products = sorted(documents(args.products, args.seed), key=lambda d: (d["name"], d["id"]))
+    # like get_products(), a page reads one extra product
+    replies  = [
+        b"".join(bson.encode({field: d[field] for field in fields}) for d in products[i:i + args.page_size + 1])
+        for i in range(0, len(products), args.page_size)
+    ]
+    del products
+
+    decoded_model = ProductSummary if args.summary else Product
+    raw_model     = RawProductSummary if args.summary else RawProduct
+    decoders: Dict[str, Callable[[bytes], List[Any]]] = {
+        "decoded": lambda reply: decoded_model.from_documents(bson.decode_all(reply)),
+        "raw":     lambda reply: raw_model.from_documents(bson.decode_all(reply, RAW_CODEC_OPTIONS)),
+    }
+
+    results: Dict[str, float] = {}
+    for name, decode in decoders.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for reply in replies:
+                render(decode(reply)[:args.page_size], args.untouched)
+            best = min(best, time.perf_counter() - start)
+        results[name] = len(replies) / best
+
+    return results
+
+
+def walk(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Walk `--pages` pages of get_products() on MongoDB.
+
+    Returns:
+        Dict[str, float]: The pages per second of the decoded and of the raw listings.
+    """
+    client = MongoClient(args.mongo_uri)
+    client.drop_database(args.database)
+    try:
+        collection = client[args.database]["products"]
+        create_indexes(client[args.database])
+        batch_size = 10_000
+        for start in range(0, args.products, batch_size):
+            batch = documents(min(batch_size, args.products - start), args.seed + start)
+            for i, document in enumerate(batch):
+                document.pop("_id")
+                document["id"] = f"p{start + i}"
+            collection.insert_many(batch, ordered=False)
+
+        results: Dict[str, float] = {}
+        for name, raw_listings in (("decoded", False), ("raw", True)):
+            repository = ProductRepository(collection, raw_listings=raw_listings)
+            timings: List[float] = []
+            token = None
+            for _ in range(args.pages):
+                start = time.perf_counter()
+                page  = repository.get_products(args.page_size, token, args.summary)
+                render(page.items, args.untouched)
+                timings.append(time.perf_counter() - start)
+                token = page.next_page_token
+                if token is None:
+                    break
+            results[name] = len(timings) / sum(timings)
+            print(f"{name:<8} p50 {statistics.median(timings) * 1000:.2f} ms per page")
+        return results
+    finally:
+        client.drop_database(args.database)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--summary", action=argparse.BooleanOptionalAction, default=True,
+                        help="Read the pages of ProductSummary, like the listing views.")
+    parser.add_argument("--untouched", action="store_true", help="Do not read the fields of the products.")
+    parser.add_argument("--repeat", type=int, default=3, help="The replays of the pages, the best one is reported.")
+    parser.add_argument("--pages", type=int, default=200, help="The pages walked on MongoDB.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mongo-uri", help="Walk the pages of a MongoDB instead of replaying their replies.")
+    parser.add_argument("--database", default="RawListingsBenchmark",
+                        help="The scratch database of --mongo-uri, dropped before and after the run.")
+    args = parser.parse_args()
+
+    results = walk(args) if args.mongo_uri else replay(args)
+
+    print(
+        f"\n{args.products} products, pages of {args.page_size} "
+        f"{'ProductSummary' if args.summary else 'Product'}, {'untouched' if args.untouched else 'rendered'}"
+    )
+    for name, pages_per_sec in results.items():
+        print(f"{name:<8} {pages_per_sec:>10,.0f} pages/s")
+    print(f"raw/decoded {results['raw'] / results['decoded']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Benchmark of the service layer on the in-memory storage backend (see app.storage.memory_backend).
+
+Seeds a dataset with populatedb.populate(), wires the services like create_server(),
+then runs every scenario `--operations` times and reports the operations per second
+and the p50/p99 latency of each one. The scenarios are the operations of the views:
+browsing and searching products, selling and buying, inserting a product to all units,
+logging in and listing the employees of a unit, and a weighted mix of them.
+
+The memory backend answers the point reads of the unique indexes from a dict and scans for the rest,
+so the numbers track the cost of the Python side of a request, not of MongoDB.
+scrypt runs with `--scrypt-n` (1024 by default) so a login measures the service,
+benchmarks.login_latency measures the cost of scrypt itself.
+
+The results can be saved as a JSON baseline and a later run compared to it.
+A scenario regresses if its ops/s drop by more than `--tolerance`
+or its p99 rises by more than `--p99-tolerance`.
+
+Usage:
+    python -m benchmarks.services
+    python -m benchmarks.services --save benchmarks/baseline.json
+    python -m benchmarks.services --compare benchmarks/baseline.json --tolerance 0.15
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+import populatedb
+from app.exceptions.exceptions import InsufficientProductQuantity, ProductDoesNotFitInUnit
+from app.repositories.caching_unit_repository import CachingUnitRepository
+from app.repositories.employee_repository import EmployeeRepository
+from app.repositories.indexes import create_indexes
+from app.repositories.product_repository import ProductRepository
+from app.repositories.supervisor_repository import SupervisorRepository
+from app.repositories.unit_repository import UnitRepository
+from app.repositories.user_repository import UserRepository
+from app.services.employee_service import EmployeeService
+from app.services.product_service import ProductService
+from app.services.supervisor_service import SupervisorService
+from app.services.user_service import UserService
+from app.utils.password_utils import PasswordHasher
+from app.storage.memory_backend import MemoryClient
+
+
+PASSWORD = "benchmark-password"
+
+# the share of each scenario in the "mixed" scenario
+MIX: Dict[str, int] = {
+    "product.browse":       40,
+    "product.search":       20,
+    "product.sell":         20,
+    "product.buy":          10,
+    "user.login":           10,
+}
+
+# errors of a valid request, like selling a product that ran out of items
+EXPECTED_ERRORS = (InsufficientProductQuantity, ProductDoesNotFitInUnit)
+
+Operation = Callable[[random.Random], object]
+
+
+class Fixture:
+    """ The services of a seeded in-memory database and the keys to drive them with. """
+    product_service: ProductService
+    user_service: UserService
+    employee_service: EmployeeService
+    supervisor_service: SupervisorService
+    unit_ids: List[str]
+    product_ids: List[str]
+    product_names: List[str]
+    employees: List[Tuple[str, str]]
+    supervisors: List[Tuple[str, str]]
+
+    def __init__(self, args: argparse.Namespace):
+        db              = MemoryClient()["ServiceBenchmark"]
+        password_hasher = PasswordHasher(n=args.scrypt_n)
+
+        create_indexes(db)
+        populatedb.populate(db, populatedb.parse_args([
+            "--units",             str(args.units),
+            "--products-per-unit", str(args.products_per_unit),
+            "--users-per-unit",    str(args.users_per_unit),
+            "--seed",              str(args.seed),
+            "--report-every",      str(args.units + 1),
+        ]), password_hasher.hash(PASSWORD))
+
+        # the repositories and services are wired like in create_server()
+        usr_repo = UserRepository(db["users"])
+        emp_repo = EmployeeRepository(db["users"])
+        sup_repo = SupervisorRepository(db["users"])
+        unt_repo = CachingUnitRepository(UnitRepository(db["units"]), 1024, 60)
+        prd_repo = ProductRepository(db["products"])
+
+        self.product_service    = ProductService(prd_repo, unt_repo)
+        self.user_service       = UserService(usr_repo, unt_repo, password_hasher)
+        self.employee_service   = EmployeeService(usr_repo, emp_repo, unt_repo, password_hasher)
+        self.supervisor_service = SupervisorService(usr_repo, emp_repo, sup_repo, unt_repo, password_hasher)
+
+        products           = list(prd_repo.stream_products())
+        users              = list(db["users"].find({}, {"_id": 0, "username": 1, "unit_id": 1, "role": 1}))
+        self.unit_ids      = sorted({p.unit_id for p in products})
+        self.product_ids   = [p.id for p in products]
+        self.product_names = [p.name for p in products]
+        self.employees     = [(u["username"], u["unit_id"]) for u in users if u["role"] == "employee"]
+        self.supervisors   = [(u["username"], u["unit_id"]) for u in users if u["role"] == "supervisor"]
+
+
+def scenarios(fixture: Fixture) -> Dict[str, Operation]:
+    """
+    Returns:
+        Dict[str, Operation]: The operation of every scenario, by name.
+            An operation runs one request with the random generator it is given.
+    """
+    product_service = fixture.product_service
+
+    def browse(rng: random.Random) -> object:
+        # the first two pages of a unit, like the product view
+        unit_id = rng.choice(fixture.unit_ids)
+        page    = product_service.get_products_from_unit(unit_id, 50, None, summary=True)
+        return product_service.get_products_from_unit(unit_id, 50, page.next_page_token, summary=True)
+
+    def search(rng: random.Random) -> object:
+        return product_service.search_products(
+            "quantity", "descending", rng.choice(fixture.product_names), None, None, None,
+            rng.choice(fixture.unit_ids), 50, None, summary=True
+        )
+
+    def search_quantity(rng: random.Random) -> object:
+        low = rng.randint(0, 50)
+        return product_service.search_products(
+            "quantity", None, None, None, low, low + 10, rng.choice(fixture.unit_ids), 50, None, summary=True
+        )
+
+    def sell(rng: random.Random) -> object:
+        return product_service.sell_product(rng.choice(fixture.product_ids), rng.randint(1, 3))
+
+    def sell_basket(rng: random.Random) -> object:
+        return product_service.sell_products([(rng.choice(fixture.product_ids), 1) for _ in range(5)])
+
+    def buy(rng: random.Random) -> object:
+        return product_service.buy_product(rng.choice(fixture.product_ids), rng.randint(1, 3))
+
+    def buy_delivery(rng: random.Random) -> object:
+        return product_service.buy_products([(rng.choice(fixture.product_ids), 1) for _ in range(20)])
+
+    def insert_to_all_units(rng: random.Random) -> object:
+        return product_service.insert_product(
+            None, f"Benchmark {rng.randrange(10 ** 9)}", 0, 0, 1.0, 0.1,
+            "Electronics", 10.0, 15.0, "Acme", 0, None
+        )
+
+    def user_login(rng: random.Random) -> object:
+        return fixture.user_service.get_user(*_login(rng, fixture.employees + fixture.supervisors))
+
+    def employee_login(rng: random.Random) -> object:
+        return fixture.employee_service.get_employee(*_login(rng, fixture.employees))
+
+    def supervisor_login(rng: random.Random) -> object:
+        return fixture.supervisor_service.get_employee(*_login(rng, fixture.supervisors))
+
+    def list_employees(rng: random.Random) -> object:
+        return fixture.employee_service.get_employees_in_unit(rng.choice(fixture.unit_ids))
+
+    operations: Dict[str, Operation] = {
+        "product.browse":              browse,
+        "product.search":              search,
+        "product.search_quantity":     search_quantity,
+        "product.sell":                sell,
+        "product.sell_basket":         sell_basket,
+        "product.buy":                 buy,
+        "product.buy_delivery":        buy_delivery,
+        "product.insert_to_all_units": insert_to_all_units,
+        "user.login":                  user_login,
+        "employee.login":              employee_login,
+        "employee.list_in_unit":       list_employees,
+        "supervisor.login":            supervisor_login,
+    }
+
+    def mixed(rng: random.Random) -> object:
+        name = rng.choices(list(MIX), list(MIX.values()))[0]
+        return operations[name](rng)
+
+    operations["mixed"] = mixed
+    return operations
+
+
+def _login(rng: random.Random, users: List[Tuple[str, str]]) -> Tuple[str, str, str]:
+    username, unit_id = rng.choice(users)
+    return username, PASSWORD, unit_id
+
+
+def _percentile(timings: List[float], percentile: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def measure(operation: Operation, operations: int, warmup: int, seed: int) -> dict:
+    """
+    Run `operation` `warmup` times and then `operations` times.
+
+    Returns:
+        dict: The operations per second, the p50/p99 latency in milliseconds
+            and the number of operations that raised one of EXPECTED_ERRORS.
+    """
+    rng    = random.Random(seed)
+    errors = 0
+
+    def timed() -> float:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            operation(rng)
+        except EXPECTED_ERRORS:
+            errors += 1
+        return time.perf_counter() - start
+
+    for _ in range(warmup):
+        timed()
+    errors = 0
+
+    start   = time.perf_counter()
+    timings = [timed() for _ in range(operations)]
+    elapsed = time.perf_counter() - start
+
+    return {
+        "ops_per_sec": operations / elapsed,
+        "p50_ms":      statistics.median(timings) * 1000,
+        "p99_ms":      _percentile(timings, 0.99) * 1000,
+        "errors":      errors,
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float, p99_tolerance: float) -> List[str]:
+    """
+    Print the change of every scenario against `baseline`.
+
+    Returns:
+        List[str]: The scenarios whose ops/s dropped by more than `tolerance`
+            or whose p99 rose by more than `p99_tolerance`.
+    """
+    regressions: List[str] = []
+
+    print(f"\n{'scenario':<28} {'baseline':>12} {'current':>12} {'ops/s':>8} {'p99':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<28} {'-':>12} {result['ops_per_sec']:>8.0f} ops/s")
+            continue
+
+        ops_change = result["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1
+        p99_change = result["p99_ms"] / baseline[name]["p99_ms"] - 1
+        regressed  = ops_change < -tolerance or p99_change > p99_tolerance
+        if regressed:
+            regressions.append(name)
+
+        print(
+            f"{name:<28} {baseline[name]['ops_per_sec']:>6.0f} ops/s {result['ops_per_sec']:>6.0f} ops/s "
+            f"{ops_change:>+8.1%} {p99_change:>+8.1%}{'  REGRESSION' if regressed else ''}"
+        )
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=10)
+    parser.add_argument("--products-per-unit", type=int, default=500)
+    parser.add_argument("--users-per-unit", type=int, default=5)
+    parser.add_argument("--operations", type=int, default=1000, help="The measured operations of each scenario.")
+    parser.add_argument("--warmup", type=int, default=100, help="The operations run before measuring.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the dataset and of the operations.")
+    parser.add_argument("--scrypt-n", type=int, default=2 ** 10, help="The scrypt cost of the seeded passwords.")
+    parser.add_argument("--scenario", nargs="+", help="Only run these scenarios.")
+    parser.add_argument("--save", metavar="PATH", help="Save the results as a JSON baseline.")
+    parser.add_argument("--compare", metavar="PATH", help="Compare the results to a JSON baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="The relative drop of ops/s that counts as a regression.")
+    parser.add_argument("--p99-tolerance", type=float, default=0.5,
+                        help="The relative rise of p99 that counts as a regression, the tail is noisier.")
+    args = parser.parse_args()
+
+    start   = time.perf_counter()
+    fixture = Fixture(args)
+    print(
+        f"Seeded {len(fixture.product_ids)} products and {len(fixture.employees) + len(fixture.supervisors)} users "
+        f"in {len(fixture.unit_ids)} units in {time.perf_counter() - start:.1f} s\n"
+    )
+
+    results: Dict[str, dict] = {}
+    print(f"{'scenario':<28} {'ops/s':>10} {'p50':>11} {'p99':>11} {'errors':>7}")
+    for name, operation in scenarios(fixture).items():
+        if args.scenario and name not in args.scenario:
+            continue
+
+        results[name] = measure(operation, args.operations, args.warmup, args.seed)
+        print(
+            f"{name:<28} {results[name]['ops_per_sec']:>10.0f} {results[name]['p50_ms']:>8.3f} ms "
+            f"{results[name]['p99_ms']:>8.3f} ms {results[name]['errors']:>7}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({
+                "python":   platform.python_version(),
+                "machine":  platform.machine(),
+                "args":     {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+                "results":  results,
+            }, file, indent=2)
+        print(f"\nSaved the baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+        regressions = compare(results, baseline["results"], args.tolerance, args.p99_tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} scenarios regressed: {', '.join(regressions)}")
+            raise SystemExit(1)
+        print("\nNo scenario regressed.")
+
+
+if __name__ == "__main__":
+    main()
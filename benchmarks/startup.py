@@ -0,0 +1,115 @@
+"""
+Boot time of the worker processes, for each bootstrap mode of create_server() (see app.bootstrap).
+
+Starts `--workers` fresh processes at once, like a pre-fork server starting its workers,
+and each of them imports the application and calls create_server().
+Reports the create_server() time of the workers, the time from the start of the processes
+until the last worker is ready (with the interpreter startup and the imports)
+and how many workers ran the bootstrap.
+
+By default the workers use the in-memory storage backend, where every process has its own
+empty database: the "lock" mode then runs the bootstrap in every worker.
+With `--mongo-host` the workers share a MongoDB, in the scratch database `--database`
+that is dropped before each mode and after the run. The "none" mode keeps the database
+bootstrapped by the previous mode, as after `flask --app server bootstrap` in a deployment.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --workers 16 --mongo-host localhost
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import time
+from typing import Any, Dict
+from pymongo import MongoClient
+from app.bootstrap import BOOTSTRAP_MODES
+from app.storage.storage_backend import MEMORY_BACKEND, MONGO_BACKEND
+
+
+def boot_worker(environment: Dict[str, str], results: multiprocessing.Queue) -> None:
+    os.environ.update(environment)
+
+    from app import create_server
+    server = create_server()
+    results.put({"ready_at": time.time(), **server.boot_stats})
+
+
+def boot_workers(workers: int, environment: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Start `workers` processes at once and wait for all of them to create their server.
+
+    Returns:
+        Dict[str, Any]: The boot times of the workers.
+    """
+    context   = multiprocessing.get_context("spawn")
+    results   = context.Queue()
+    processes = [context.Process(target=boot_worker, args=(environment, results)) for _ in range(workers)]
+
+    started = time.time()
+    for process in processes:
+        process.start()
+
+    stats = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    boot_ms = [s["boot_ms"] for s in stats]
+    return {
+        "workers":           workers,
+        "boot_p50_ms":       statistics.median(boot_ms),
+        "boot_max_ms":       max(boot_ms),
+        "all_ready_ms":      (max(s["ready_at"] for s in stats) - started) * 1000,
+        "bootstrap_runs":    sum(s["bootstrap"] == "ran" for s in stats),
+        "bootstrap_max_ms":  max(s["bootstrap_ms"] for s in stats),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--mode", nargs="+", choices=BOOTSTRAP_MODES, default=list(BOOTSTRAP_MODES))
+    parser.add_argument("--mongo-host", help="Boot the workers against this MongoDB instead of the memory backend.")
+    parser.add_argument("--mongo-port", type=int, default=27017)
+    parser.add_argument("--database", default="StartupBenchmark")
+    parser.add_argument("--scrypt-n", type=int, default=2 ** 15, help="The scrypt cost of the admin password.")
+    parser.add_argument("--save", metavar="PATH", help="Save the results as JSON.")
+    args = parser.parse_args()
+
+    environment = {
+        "STORAGE_BACKEND":   MONGO_BACKEND if args.mongo_host else MEMORY_BACKEND,
+        "MONGO_HOST":        args.mongo_host or "localhost",
+        "MONGO_PORT":        str(args.mongo_port),
+        "MONGO_DATABASE":    args.database,
+        "PASSWORD_SCRYPT_N": str(args.scrypt_n),
+    }
+    mongo_client = MongoClient(args.mongo_host, args.mongo_port) if args.mongo_host else None
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for mode in args.mode:
+            if mongo_client is not None and mode != "none":
+                mongo_client.drop_database(args.database)
+
+            results[mode] = boot_workers(args.workers, {**environment, "SERVER_BOOTSTRAP": mode})
+            result        = results[mode]
+            print(
+                f"{mode:<8} boot p50 {result['boot_p50_ms']:>8.1f} ms  max {result['boot_max_ms']:>8.1f} ms  "
+                f"all ready {result['all_ready_ms']:>8.1f} ms  "
+                f"bootstrap runs {result['bootstrap_runs']}/{result['workers']}"
+            )
+    finally:
+        if mongo_client is not None:
+            mongo_client.drop_database(args.database)
+            mongo_client.close()
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "save"}, "results": results}, file, indent=2)
+        print(f"Saved the results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,141 +1,301 @@
-from typing import List
+"""
+Generate a synthetic dataset of units, products and users.
+
+Every unit gets `--products-per-unit` products and `--users-per-unit` users
+(one supervisor and employees). The documents are generated lazily and written in
+`--batch-size` unordered insert_many batches through the insert_* methods of the repositories.
+The same `--seed` always generates the same dataset.
+
+The first supervisor is bw (password --password) in unit u1, the account of the development login.
+All the users share one password hash, hashing every password would dominate the load time.
+
+Usage:
+    python populatedb.py --drop
+    python populatedb.py --drop --units 1000 --products-per-unit 10000 --users-per-unit 20 --seed 7
+    python populatedb.py --categories Electronics=5,Book=3,Clothing=2 --price-distribution uniform
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
 from pymongo import MongoClient
-from pymongo.database import Collection
+from pymongo.errors import BulkWriteError
 from app.model.employee import Employee
 from app.model.product import Product
 from app.model.supervisor import Supervisor
 from app.model.unit import Unit
 from app.repositories.employee_repository import EmployeeRepository
+from app.repositories.indexes import create_indexes
 from app.repositories.product_repository import ProductRepository
 from app.repositories.supervisor_repository import SupervisorRepository
 from app.repositories.unit_repository import UnitRepository
-
-
-def add_employees(emp_repo: EmployeeRepository, user_collection: Collection):
-    employees_list = []
-
-    values = {
-        "name": ["John", "Mary", "Jim", "Pam", "Andrew", "Peter"],
-        "surname": ["Smith", "Jacobs", "Halpert", "Wesley", "Mathews", "Parker"],
-        "username": ["js", "mj", "jh", "pw", 'am', "pp"],
-        "password": ["12","12","12","12","12", "12"],
-        "unit_id": ["u1", "u1", "u2", "u2", "u3", "u3"],
-    }
-    employees_to_add = len(values["name"])
-
-    for i in range(employees_to_add):
-        employee = {}
-        for field in values.keys():
-            employee[field] = values[field][i]
-        employees_list.append(Employee.from_persistence_dict(employee))
-
-    result = emp_repo.insert_employees(employees_list)
-
-    print(f"Inserted {len(result.inserted_ids)} employees")
-
-
-def add_supervisors(sup_repo: SupervisorRepository):
-    supervisor_list = []
-
-    values = {
-        "name": ["Bruce", "Will", "Mary"],
-        "surname": ["Wayne", "Jacub", "Stokes"],
-        "username": ["bw", "wj", "ms"],
-        "password": ["12","12","12"],
-        "unit_id": ["u1", "u2", "u3"],
-        "unit_name": ["unit1", "unit2", "unit3",],
+from app.repositories.unit_stats_repository import UnitStatsRepository
+from app.utils.password_utils import get_password_hasher
+
+
+NAMES         = ["John", "Mary", "Jim", "Pam", "Andrew", "Peter", "Will", "Bruce"]
+SURNAMES      = ["Smith", "Jacobs", "Halpert", "Wesley", "Mathews", "Parker", "Jacub", "Stokes"]
+# the supervisors of the first units, bw in u1 is the account of the development login
+SUPERVISORS   = [("Bruce", "Wayne", "bw"), ("Will", "Jacub", "wj"), ("Mary", "Stokes", "ms")]
+MANUFACTURERS = ["Acme", "Globex", "Initech", "Umbrella", "Stark"]
+
+T = TypeVar("T")
+
+
+# the code of the write errors of a unique index
+DUPLICATE_KEY = 11000
+
+
+class BatchWriter(Generic[T]):
+    """
+    Collects models and writes them with `insert_many` every `batch_size` models.
+
+    Counts the written documents, the ones that were already in the database
+    and the time spent writing them.
+    """
+    written: int
+    duplicates: int
+    seconds: float
+
+    def __init__(self, insert_many: Callable[[List[T], bool], object], batch_size: int):
+        self.insert_many        = insert_many
+        self.batch_size: int    = batch_size
+        self.batch: List[T]     = []
+        self.written: int       = 0
+        self.duplicates: int    = 0
+        self.seconds: float     = 0.0
+
+
+    def add(self, model: T) -> None:
+        self.batch.append(model)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+
+    def flush(self) -> None:
+        if not self.batch:
+            return
+
+        duplicates = 0
+        start      = time.perf_counter()
+        try:
+            # unordered: the server may apply the batch in parallel, and inserts every document it can
+            self.insert_many(self.batch, False)
+        except BulkWriteError as error:
+            # without --drop the documents of a previous run are already in the database
+            errors = error.details["writeErrors"]
+            if any(write_error["code"] != DUPLICATE_KEY for write_error in errors):
+                raise
+            duplicates = len(errors)
+        self.seconds += time.perf_counter() - start
+
+        self.written    += len(self.batch) - duplicates
+        self.duplicates += duplicates
+        self.batch       = []
+
+
+def parse_categories(value: str) -> Dict[str, float]:
+    """
+    Parse a category distribution like "Electronics=5,Book=3,Clothing=2" into {category: weight}.
+    """
+    categories: Dict[str, float] = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        categories[name.strip()] = float(weight or 1)
+    return categories
+
+
+def generate_price(rng: random.Random, args: argparse.Namespace) -> Tuple[float, float]:
+    """
+    Returns:
+        Tuple[float, float]: A purchase price drawn from the price distribution
+            and a selling price with a uniform markup.
+    """
+    if args.price_distribution == "uniform":
+        purchase_price = rng.uniform(args.min_price, args.max_price)
+    else:
+        # lognormal around --price-mean, most products are cheap, a few are expensive
+        purchase_price = rng.lognormvariate(math.log(args.price_mean), args.price_sigma)
+        purchase_price = min(max(purchase_price, args.min_price), args.max_price)
+
+    markup = rng.uniform(args.min_markup, args.max_markup)
+    return round(purchase_price, 2), round(purchase_price * (1 + markup), 2)
+
+
+def generate_products(rng: random.Random, unit_id: str, args: argparse.Namespace) -> Iterator[Product]:
+    categories = list(args.categories.keys())
+    weights    = list(args.categories.values())
+
+    for i in range(args.products_per_unit):
+        category                      = rng.choices(categories, weights)[0]
+        purchase_price, selling_price = generate_price(rng, args)
+
+        yield Product(
+            id             = f"{unit_id}-p{i}",
+            name           = f"{category} {rng.randrange(args.products_per_unit * 10)}",
+            quantity       = rng.randint(0, args.max_quantity),
+            sold_quantity  = 0,
+            weight         = round(rng.uniform(0.1, args.max_weight), 2),
+            volume         = round(rng.uniform(0.01, args.max_volume), 3),
+            category       = category,
+            purchase_price = purchase_price,
+            selling_price  = selling_price,
+            manufacturer   = rng.choice(MANUFACTURERS),
+            unit_gain      = 0,
+            unit_id        = unit_id,
+        )
+
+
+def generate_users(
+    rng: random.Random, unit_index: int, unit_id: str, password_hash: str, args: argparse.Namespace
+) -> Iterator[Employee | Supervisor]:
+    # the first user of every unit is its supervisor
+    if args.users_per_unit > 0:
+        name, surname, username = SUPERVISORS[unit_index % len(SUPERVISORS)]
+        if unit_index >= len(SUPERVISORS):
+            username = f"{username}{unit_index // len(SUPERVISORS)}"
+        yield Supervisor(None, name, surname, username, password_hash, unit_id, None)
+
+    for i in range(1, args.users_per_unit):
+        yield Employee(None, rng.choice(NAMES), rng.choice(SURNAMES), f"e{i}", password_hash, unit_id, None)
+
+
+def populate(db, args: argparse.Namespace, password_hash: str) -> Dict[str, BatchWriter]:
+    """
+    Generate the dataset described by `args` and write it to `db`.
+
+    Args:
+        db (Database): The database to populate.
+        args (Namespace): The parsed command line arguments.
+        password_hash (str): The password hash of every user (see PasswordHasher.hash()).
+
+    Returns:
+        Dict[str, BatchWriter]: The writer of every collection, with its counters.
+    """
+    rng = random.Random(args.seed)
+
+    # the counters of `unit_stats` are incremented by the insertions of the products
+    prod_repo = ProductRepository(db["products"], unit_stats_repository=UnitStatsRepository(db["unit_stats"]))
+    emp_repo  = EmployeeRepository(db["users"])
+    sup_repo  = SupervisorRepository(db["users"])
+    unit_repo = UnitRepository(db["units"])
+
+    writers: Dict[str, BatchWriter] = {
+        "units":       BatchWriter(unit_repo.insert_units, args.batch_size),
+        "products":    BatchWriter(prod_repo.insert_products, args.batch_size),
+        "employees":   BatchWriter(emp_repo.insert_employees, args.batch_size),
+        "supervisors": BatchWriter(sup_repo.insert_supervisors, args.batch_size),
     }
-    supervisors_to_add = len(values["name"])
 
-    for i in range(supervisors_to_add):
-        supervisor = {}
-        for field in values.keys():
-            supervisor[field] = values[field][i]
-        supervisor_list.append(Supervisor.from_persistence_dict(supervisor))
+    for unit_index in range(args.units):
+        unit_id = f"u{unit_index + 1}"
 
-    result = sup_repo.insert_supervisors(supervisor_list)
+        # the occupied volume is counted while generating, so the units need no reconciliation
+        occupied_volume = 0.0
+        for product in generate_products(rng, unit_id, args):
+            occupied_volume += product.quantity * product.volume
+            writers["products"].add(product)
 
-    print(f"Inserted {len(result.inserted_ids)} supervisors")
+        for user in generate_users(rng, unit_index, unit_id, password_hash, args):
+            writers["supervisors" if isinstance(user, Supervisor) else "employees"].add(user)
 
+        volume = args.unit_volume or math.ceil(occupied_volume * (1 + args.free_space))
+        writers["units"].add(Unit(unit_id, f"unit_{unit_index + 1}", volume, occupied_volume))
 
-def add_units(unit_repo: UnitRepository):
-    unit_list = []
+        if (unit_index + 1) % args.report_every == 0:
+            report(writers, f"{unit_index + 1}/{args.units} units")
 
-    values = {
-        "id": ["u1", "u2", "u3"],
-        "name": ["unit_1", "unit_2", "unit_3"],
-        "volume": [100, 100, 100]
-    }
-
-    units_to_add = len(values["name"])
+    for writer in writers.values():
+        writer.flush()
 
-    for i in range(units_to_add):
-        unit = {}
-        for field in values.keys():
-            unit[field] = values[field][i]
-        unit_list.append(Unit.from_dict(unit))
+    return writers
 
-    result = unit_repo.insert_units(unit_list)
 
-    print(f"Inserted {len(result.inserted_ids)} units")
+def report(writers: Dict[str, BatchWriter], title: str) -> None:
+    print(title)
+    for name, writer in writers.items():
+        rate = writer.written / writer.seconds if writer.seconds else 0
+        print(f"  {name:<12} {writer.written:>12} docs {rate:>12.0f} docs/s", end="")
+        print(f" {writer.duplicates:>12} duplicates" if writer.duplicates else "")
 
 
-def add_products(prod_repo: ProductRepository):
-    prod_list = []
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse the command line arguments, or `argv` if it is not None.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
 
-    values = {
-        "id": ["p1", "p2", "p3", "p4", "p5"],
-        "name": ["pr1", "pr2", "pr3", "pr4", "pr5"],
-        "quantity": [4, 5, 6, 7, 8],
-        "sold_quantity": [1, 2, 3, 4, 5],
-        "weight": [12, 5, 3, 12, 12],
-        "volume": [3, 2, 1, 2, 3],
-        "category": ["Electronics", "Clothing", "Book", "Electronics", "Electronics"],
-        "purchase_price": [100, 20, 10, 30, 40],
-        "selling_price": [150, 50, 20, 40, 50],
-        "manufacturer": ["Acme", "Acme", "Acme", "Acme", "Acme"],
-        "unit_gain": [100, 100, 100, 100, 100],
-        "unit_id": ["u1", "u2", "u3", "u1", "u1"],
-    }
+    parser.add_argument("--mongo-host", default=os.environ.get("MONGO_HOST", "localhost"))
+    parser.add_argument("--mongo-port", type=int, default=int(os.environ.get("MONGO_PORT", 27017)))
+    parser.add_argument("--database", default=os.environ.get("MONGO_DATABASE", "LogisticsDB"))
+    parser.add_argument("--drop", action="store_true", help="Drop the units, products, unit stats and users first.")
 
-    products_to_add = len(values["name"])
+    parser.add_argument("--units", type=int, default=3)
+    parser.add_argument("--products-per-unit", type=int, default=20)
+    parser.add_argument("--users-per-unit", type=int, default=3, help="One supervisor and the rest employees.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the random generator.")
+    parser.add_argument("--password", default="12", help="The password of every generated user.")
 
-    for i in range(products_to_add):
-        product = {}
-        for field in values.keys():
-            product[field] = values[field][i]
-        prod_list.append(Product.from_dict(product))
+    parser.add_argument("--categories", type=parse_categories, default="Electronics=5,Clothing=3,Book=2",
+                        help="The categories and their weights, like Electronics=5,Book=3.")
+    parser.add_argument("--price-distribution", choices=["lognormal", "uniform"], default="lognormal")
+    parser.add_argument("--price-mean", type=float, default=30.0, help="The median of the lognormal prices.")
+    parser.add_argument("--price-sigma", type=float, default=0.8, help="The spread of the lognormal prices.")
+    parser.add_argument("--min-price", type=float, default=1.0)
+    parser.add_argument("--max-price", type=float, default=2000.0)
+    parser.add_argument("--min-markup", type=float, default=0.1, help="The minimum selling price markup.")
+    parser.add_argument("--max-markup", type=float, default=0.8, help="The maximum selling price markup.")
+    parser.add_argument("--max-quantity", type=int, default=100)
+    parser.add_argument("--max-weight", type=float, default=20.0)
+    parser.add_argument("--max-volume", type=float, default=3.0)
+    parser.add_argument("--unit-volume", type=float, default=None,
+                        help="The volume of every unit. By default it fits its products with --free-space to spare.")
+    parser.add_argument("--free-space", type=float, default=0.5, help="The free share of the default unit volume.")
 
+    parser.add_argument("--batch-size", type=int, default=5000, help="The documents of every insert_many.")
+    parser.add_argument("--report-every", type=int, default=100, help="Report progress every that many units.")
 
-    result = prod_repo.insert_products(prod_list)
-
-    print(f"Inserted {len(result.inserted_ids)} products")
+    return parser.parse_args(argv)
 
 
 def main():
-    # Connection for usage from the Lab
-    # client = pymongo.MongoClient("83.212.238.166", 27017)
-    client                = MongoClient("localhost", 27017)
-    db                    = client["LogisticsDB"]
-    user_collection       = db["users"]
-    unit_collection       = db["units"]
-    product_collection    = db["products"]
-
-
-    user_collection.drop()
-    unit_collection.drop()
-    product_collection.drop()
-
-
-    # repositories
-    emp_repo = EmployeeRepository(user_collection)
-    sup_repo = SupervisorRepository(user_collection)
-    unit_repo = UnitRepository(unit_collection)
-    prod_repo = ProductRepository(product_collection)
-
-    add_employees(emp_repo, user_collection)
-    add_supervisors(sup_repo)
-    add_units(unit_repo)
-    add_products(prod_repo)
-
-main()
+    args   = parse_args()
+    client = MongoClient(args.mongo_host, args.mongo_port)
+    db     = client[args.database]
+
+    if args.drop:
+        db["users"].drop()
+        db["units"].drop()
+        db["products"].drop()
+        db["unit_stats"].drop()
+
+    password_hash = get_password_hasher().hash(args.password)
+
+    start   = time.perf_counter()
+    writers = populate(db, args, password_hash)
+    elapsed = time.perf_counter() - start
+
+    report(writers, "Inserted")
+    total      = sum(writer.written for writer in writers.values())
+    duplicates = sum(writer.duplicates for writer in writers.values())
+    print(f"Total {total} docs in {elapsed:.1f} s, {total / elapsed:.0f} docs/s")
+
+    if duplicates:
+        print(
+            f"{duplicates} docs were not inserted, they are already in the database {args.database}. "
+            "Pass --drop to replace its data.",
+            file=sys.stderr,
+        )
+        raise SystemExit(1)
+
+    # building the indexes once after the load is faster than updating them on every insert
+    start = time.perf_counter()
+    create_indexes(db)
+    print(f"Created the indexes in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
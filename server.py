@@ -1,6 +1,14 @@
 from app import create_server
+from app.storage.storage_backend import MEMORY_BACKEND
+from app.utils.password_utils import get_password_hasher
+from populatedb import parse_args, populate
 
 server = create_server()
 
+# the memory backend starts empty, fill it with the default dataset of populatedb.py
+if server.config["STORAGE_BACKEND"] == MEMORY_BACKEND:
+    dataset = parse_args([])
+    populate(server.db, dataset, get_password_hasher().hash(dataset.password))
+
 if __name__ == "__main__":
     server.run(debug=True, host=server.config["SERVER_HOST"], port=server.config["SERVER_PORT"])